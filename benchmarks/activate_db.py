@@ -0,0 +1,89 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for recording activated files in the database
+
+Compares recording the files of a rules with one merge per file (the previous
+activation code) against the bulk insert used by RulesHandler.activate.
+
+Usage: python benchmarks/activate_db.py [number of files]
+"""
+
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.db.objects import File
+
+
+def merge_files(db, rules, filenames):
+    for filename in filenames:
+        db.session.merge(File(filename, rules))
+    db.session.commit()
+
+
+def insert_files(db, rules, filenames):
+    db.session.execute(
+            db.tables.files_table.insert().prefix_with("OR REPLACE"),
+            [{"filename": filename, "rules": rules} for filename in
+             filenames])
+    db.session.commit()
+
+
+def measure(name, func, db, rules, filenames):
+    start = time.time()
+    func(db, rules, filenames)
+    duration = time.time() - start
+    print "%-8s %8d rows in %7.3f s (%10.0f rows/s)" % (name, len(filenames),
+            duration, len(filenames) / duration)
+
+
+def main():
+    if len(sys.argv) > 1:
+        num = int(sys.argv[1])
+    else:
+        num = 20000
+    rootdir = tempfile.mkdtemp()
+    try:
+        rcfile = os.path.join(rootdir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nrootdir = %s\n" % rootdir)
+        f.close()
+        db = Db(Config([rcfile]))
+        filenames = ["/usr/local/share/bench/%d/file%d" % (i % 100, i) for i
+                     in range(num)]
+        measure("merge", merge_files, db, "bench-merge", filenames)
+        db.session.execute(db.tables.files_table.delete())
+        db.session.commit()
+        measure("bulk", insert_files, db, "bench-bulk", filenames)
+    finally:
+        shutil.rmtree(rootdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for logging during the activation of a rules
+
+Activates and deactivates a rules with many files with debug output
+disabled. The eager mode formats each log message before passing it to the
+logger like kaizen did before the messages were formatted lazily.
+
+Usage: python benchmarks/activate_log.py [number of files] [number of runs]
+"""
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import kaizen.logging
+
+from kaizen.config import Config
+from kaizen.rules.handler import RulesHandler
+
+RULES = """
+from kaizen.rules import Rules
+
+class BenchRules(Rules):
+
+    name = "bench"
+    version = "1.0"
+"""
+
+
+class EagerLogger(object):
+    """ Formats all messages before logging them """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, method, msg, args):
+        if args:
+            msg = msg % args
+        method(msg)
+
+    def debug(self, msg, *args):
+        self._log(self.logger.debug, msg, args)
+
+    def info(self, msg, *args):
+        self._log(self.logger.info, msg, args)
+
+    def warn(self, msg, *args):
+        self._log(self.logger.warn, msg, args)
+
+    def error(self, msg, *args):
+        self._log(self.logger.error, msg, args)
+
+
+def create_rules(root_dir, files):
+    rules_dir = os.path.join(root_dir, "rules")
+    os.makedirs(os.path.join(rules_dir, "bench"))
+    open(os.path.join(rules_dir, "bench", "__init__.py"), "w").close()
+    f = open(os.path.join(rules_dir, "bench", "rules.py"), "w")
+    f.write(RULES)
+    f.close()
+    prefix = os.path.join(root_dir, "prefix")
+    rcfile = os.path.join(root_dir, "kaizenrc")
+    f = open(rcfile, "w")
+    # every file is activated on its own instead of one directory link
+    f.write("[kaizen]\nprefix = %s\nrules = %s\nlinkdirectories = false\n"
+            % (prefix, rules_dir))
+    f.close()
+    config = Config([rcfile])
+
+    handler = RulesHandler(config, "bench")
+    for i in range(files):
+        filename = handler.dest_dir + prefix + "/share/bench/%d/file%d" % (
+                   i % 100, i)
+        dirname = os.path.dirname(filename)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        open(filename, "w").close()
+    return config
+
+
+def measure(name, config, runs, eager):
+    activate = 0
+    deactivate = 0
+    for i in range(runs):
+        handler = RulesHandler(config, "bench")
+        if eager:
+            handler.log = EagerLogger(handler.log)
+        start = time.time()
+        handler.activate()
+        activate += time.time() - start
+        start = time.time()
+        handler.deactivate()
+        deactivate += time.time() - start
+    print "  %-6s activate %.3f s, deactivate %.3f s" % (name,
+          activate / runs, deactivate / runs)
+
+
+def main():
+    files = 10000
+    runs = 3
+    if len(sys.argv) > 1:
+        files = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        runs = int(sys.argv[2])
+
+    kaizen.logging.getRootLogger().setLevel(kaizen.logging.ERROR)
+    root_dir = tempfile.mkdtemp()
+    try:
+        config = create_rules(root_dir, files)
+        print "%d files, debug disabled" % files
+        measure("lazy", config, runs, False)
+        measure("eager", config, runs, True)
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == "__main__":
+    main()
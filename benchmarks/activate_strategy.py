@@ -0,0 +1,161 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for the activation strategies
+
+Activates a rules with many headers with each activation strategy and
+measures the activation and the time to resolve and read all activated
+headers. If a c compiler is available the headers are also included by a
+preprocessor run against the activated prefix like during a compile run.
+The symlink strategy has to resolve the symlink of each file and the current
+symlink of the rules.
+
+Usage: python benchmarks/activate_strategy.py [number of headers] [runs]
+"""
+
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import kaizen.logging
+
+from kaizen.config import Config
+from kaizen.rules.handler import RulesHandler
+from kaizen.system.activate import STRATEGIES
+
+RULES = """
+from kaizen.rules import Rules
+
+class BenchRules(Rules):
+
+    name = "bench"
+    version = "1.0"
+"""
+
+
+def create_rules(root_dir, headers):
+    rules_dir = os.path.join(root_dir, "rules")
+    os.makedirs(os.path.join(rules_dir, "bench"))
+    open(os.path.join(rules_dir, "bench", "__init__.py"), "w").close()
+    f = open(os.path.join(rules_dir, "bench", "rules.py"), "w")
+    f.write(RULES)
+    f.close()
+    prefix = os.path.join(root_dir, "prefix")
+    rcfile = os.path.join(root_dir, "kaizenrc")
+    f = open(rcfile, "w")
+    # every header is activated on its own instead of one directory link
+    f.write("[kaizen]\nprefix = %s\nrules = %s\nlinkdirectories = false\n"
+            % (prefix, rules_dir))
+    f.close()
+    config = Config([rcfile])
+
+    handler = RulesHandler(config, "bench")
+    include_dir = handler.dest_dir + prefix + "/include/bench"
+    os.makedirs(include_dir)
+    for i in range(headers):
+        f = open(os.path.join(include_dir, "header%d.h" % i), "w")
+        f.write("#define BENCH_%d %d\n" % (i, i))
+        f.close()
+    source = os.path.join(root_dir, "bench.c")
+    f = open(source, "w")
+    for i in range(headers):
+        f.write("#include <bench/header%d.h>\n" % i)
+    f.close()
+    return (config, source)
+
+
+def find_compiler():
+    for path in os.environ.get("PATH", "").split(os.pathsep):
+        if os.path.isfile(os.path.join(path, "cc")):
+            return os.path.join(path, "cc")
+    return None
+
+
+def read_headers(include_dir):
+    for name in os.listdir(include_dir):
+        f = open(os.path.join(include_dir, name))
+        f.read()
+        f.close()
+
+
+def measure(strategy, config, source, runs, compiler):
+    config.config["activation"] = strategy
+    handler = RulesHandler(config, "bench")
+    start = time.time()
+    handler.activate()
+    activate = time.time() - start
+
+    prefix = config.get("prefix")
+    include_dir = os.path.join(prefix, "include", "bench")
+    devnull = open(os.devnull, "w")
+    read = 0
+    compile = 0
+    try:
+        for i in range(runs):
+            start = time.time()
+            read_headers(include_dir)
+            read += time.time() - start
+            if compiler:
+                start = time.time()
+                subprocess.check_call([compiler, "-E", "-I",
+                                       os.path.join(prefix, "include"),
+                                       source], stdout=devnull)
+                compile += time.time() - start
+    finally:
+        devnull.close()
+        handler.deactivate()
+
+    line = "  %-8s activate %.3f s, read %.3f s" % (strategy, activate,
+                                                    read / runs)
+    if compiler:
+        line += ", preprocess %.3f s" % (compile / runs)
+    print line
+
+
+def main():
+    headers = 5000
+    runs = 5
+    if len(sys.argv) > 1:
+        headers = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        runs = int(sys.argv[2])
+
+    kaizen.logging.getRootLogger().setLevel(kaizen.logging.ERROR)
+    compiler = find_compiler()
+    root_dir = tempfile.mkdtemp()
+    try:
+        (config, source) = create_rules(root_dir, headers)
+        print "%d headers, %d runs" % (headers, runs)
+        for strategy in STRATEGIES:
+            measure(strategy, config, source, runs, compiler)
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for the startup of the kaizen command line interface
+
+Runs kaizen commands in new python processes with a temporary home directory
+and prints the mean wall time, the number of imported modules and the
+slowest imports similar to python's -X importtime option. The eager mode
+imports all commands and their dependencies before running the command like
+kaizen did before commands were registered lazily.
+
+Usage: python benchmarks/cli_startup.py [number of runs]
+"""
+
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        os.pardir))
+
+COMMANDS = [
+    ["--version"],
+    ["list", "installed"],
+    ["show", "files", "bench"],
+]
+
+# runs kaizen and records the cumulative time of each import
+SCRIPT = """
+import sys
+import time
+import __builtin__
+
+times = {}
+builtin_import = __builtin__.__import__
+
+def timed_import(name, *args, **kwargs):
+    new = name not in sys.modules
+    start = time.time()
+    try:
+        return builtin_import(name, *args, **kwargs)
+    finally:
+        if new and name in sys.modules:
+            times[name] = time.time() - start
+
+__builtin__.__import__ = timed_import
+sys.path[0:0] = %(path)r
+sys.argv = ["kaizen"] + %(args)r
+start = time.time()
+if %(eager)r:
+    from kaizen.command import COMMANDS, load_command
+    for (name, path, description) in COMMANDS:
+        load_command(path)()
+    import kaizen.rules.create
+    import kaizen.cli.console
+from kaizen.console.main import main
+try:
+    main()
+except SystemExit:
+    pass
+duration = time.time() - start
+slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:5]
+sys.stderr.write("%%r\\n" %% ((duration, len(sys.modules), slowest),))
+"""
+
+
+def run(python, home_dir, args, eager):
+    env = dict(os.environ)
+    env["HOME"] = home_dir
+    path = [root_dir] + [p for p in os.environ.get("PYTHONPATH",
+                         "").split(os.pathsep) if p]
+    process = subprocess.Popen([python, "-c", SCRIPT % {"path": path,
+                                "args": args, "eager": eager}], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    start = time.time()
+    (out, err) = process.communicate()
+    wall_time = time.time() - start
+    (duration, modules, slowest) = eval(err.strip().splitlines()[-1])
+    return (wall_time, duration, modules, slowest)
+
+
+def main():
+    runs = 10
+    if len(sys.argv) > 1:
+        runs = int(sys.argv[1])
+
+    home_dir = tempfile.mkdtemp()
+    try:
+        config_dir = os.path.join(home_dir, ".kaizen")
+        os.mkdir(config_dir)
+        os.mkdir(os.path.join(home_dir, "rules"))
+        f = open(os.path.join(config_dir, "kaizenrc"), "w")
+        f.write("[kaizen]\nprefix = %s\nrules = %s\n" % (
+                os.path.join(home_dir, "prefix"),
+                os.path.join(home_dir, "rules")))
+        f.close()
+        # create the database before measuring
+        run(sys.executable, home_dir, ["list", "installed"], False)
+
+        for args in COMMANDS:
+            print "kaizen %s" % " ".join(args)
+            for (mode, eager) in [("lazy", False), ("eager", True)]:
+                results = [run(sys.executable, home_dir, args, eager) for
+                           i in range(runs)]
+                wall_time = sum([r[0] for r in results]) / runs
+                duration = sum([r[1] for r in results]) / runs
+                print "  %-6s %.3f s process, %.3f s main, %d modules" % (
+                      mode, wall_time, duration, results[-1][2])
+                for (name, seconds) in results[-1][3]:
+                    print "           import %-32s %.3f s" % (name, seconds)
+    finally:
+        shutil.rmtree(home_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for sorting dependencies
+
+Compares the previous recursive DependencyEvaluator with the current one
+based on Kahn's algorithm on a synthetic dependency graph and on a single
+chain of dependencies. The previous evaluator is stopped after a timeout.
+
+Usage: python benchmarks/depend_sort.py [number of nodes] [timeout in s]
+"""
+
+import os.path
+import random
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from kaizen.rules.depend import Dependency, DependencyEvaluator
+
+
+class RecursiveDependencyEvaluator(object):
+    """ The previous DependencyEvaluator """
+
+    def __init__(self, dependencies):
+        self.dependencies = dependencies
+        self.knowndeps = dict()
+        self.deps = []
+
+    def _evaluate_dependencies(self, dependencies):
+        for dependency in dependencies:
+            if not dependency.has_dependencies():
+                if not dependency.get_name() in self.knowndeps:
+                    self.deps.append(dependency)
+                    self.knowndeps[dependency.get_name()] = dependency
+            else:
+                self._evaluate_dependencies(dependency.get_dependencies())
+                if not dependency.get_name() in self.knowndeps:
+                    self.deps.append(dependency)
+                    self.knowndeps[dependency.get_name()] = dependency
+
+    def list(self):
+        self._evaluate_dependencies(self.dependencies)
+        return self.deps
+
+
+class Timeout(Exception):
+    pass
+
+
+def on_alarm(signum, frame):
+    raise Timeout()
+
+
+def create_graph(nodes, max_depends=3, window=50):
+    """ each node depends on up to max_depends of the previous window nodes
+    """
+    random.seed(nodes)
+    dependencies = []
+    for i in range(nodes):
+        dependency = Dependency("rules%d" % i, None, Dependency.SESSION)
+        start = max(0, i - window)
+        for j in random.sample(range(start, i), min(i - start, max_depends)):
+            dependency.add_dependency(dependencies[j])
+        dependencies.append(dependency)
+    # the graph is reachable from the last nodes
+    return dependencies[-window:]
+
+
+def create_chain(nodes):
+    dependencies = [Dependency("rules%d" % i, None, Dependency.SESSION) for
+                    i in range(nodes)]
+    for i in range(1, nodes):
+        dependencies[i].add_dependency(dependencies[i - 1])
+    return [dependencies[-1]]
+
+
+def measure(name, evaluator, roots, timeout):
+    signal.signal(signal.SIGALRM, on_alarm)
+    signal.alarm(timeout)
+    start = time.time()
+    try:
+        deps = evaluator(roots).list()
+        result = "%d dependencies in %.3f s" % (len(deps), time.time() - start)
+    except Timeout:
+        result = "not finished after %d s" % timeout
+    except RuntimeError, e:
+        result = "failed after %.3f s: %s" % (time.time() - start, e)
+    finally:
+        signal.alarm(0)
+    print "  %-10s %s" % (name, result)
+
+
+def main():
+    nodes = 10000
+    timeout = 20
+    if len(sys.argv) > 1:
+        nodes = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        timeout = int(sys.argv[2])
+
+    for (title, roots) in [("random graph", create_graph(nodes)),
+                           ("chain", create_chain(nodes))]:
+        print "%s with %d nodes" % (title, nodes)
+        measure("kahn", DependencyEvaluator, roots, timeout)
+        measure("recursive", RecursiveDependencyEvaluator, roots, timeout)
+        levels = DependencyEvaluator(roots).get_levels()
+        print "  %d levels, max %d dependencies per level" % (len(levels),
+                max([len(level) for level in levels]))
+
+
+if __name__ == "__main__":
+    main()
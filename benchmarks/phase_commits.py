@@ -0,0 +1,118 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for the phase tracking of the kaizen database
+
+Runs the set_phase/unset_phase workload of RulesHandler (merge or delete a
+phase, commit and reload the phases) with the sqlite defaults and with the
+configured db* settings and prints the commits per second of both.
+
+Usage: python benchmarks/phase_commits.py [number of rules]
+"""
+
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sqlalchemy import and_
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.db.objects import RulesPhase
+from kaizen.phase.phase import phases_list, DOWNLOADED, EXTRACTED, PATCHED, \
+                               CONFIGURED, BUILT, DESTROOTED, ACTIVATED
+
+PHASES = [DOWNLOADED, EXTRACTED, PATCHED, CONFIGURED, BUILT, DESTROOTED,
+          ACTIVATED]
+
+PROFILES = [
+    ("sqlite defaults", dict(dbjournalmode="delete", dbsynchronous="full",
+                             dbmmapsize="", dbcachesize="",
+                             dbtempstore="default")),
+    ("kaizen defaults", dict()),
+]
+
+
+def load_phases(db, rules):
+    return db.session.query(RulesPhase).filter(and_(RulesPhase.rules == rules,
+            RulesPhase.version == "1.0-0")).all()
+
+
+def run_workload(db, num):
+    commits = 0
+    for i in range(num):
+        rules = "rules%d" % i
+        for name in PHASES:
+            db.session.merge(RulesPhase(rules, "1.0-0",
+                                        phases_list.get(name)))
+            db.session.commit()
+            load_phases(db, rules)
+            commits += 1
+        for name in PHASES:
+            db.session.query(RulesPhase).filter(and_(
+                    RulesPhase.rules == rules,
+                    RulesPhase.phase == phases_list.get(name))).delete()
+            db.session.commit()
+            load_phases(db, rules)
+            commits += 1
+    return commits
+
+
+def measure(name, settings, num):
+    rootdir = tempfile.mkdtemp()
+    try:
+        rcfile = os.path.join(rootdir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nrootdir = %s\n" % rootdir)
+        for key, value in settings.items():
+            f.write("%s = %s\n" % (key, value))
+        f.close()
+        db = Db(Config([rcfile]))
+        start = time.time()
+        commits = run_workload(db, num)
+        duration = time.time() - start
+        print "%-16s %6d commits in %7.3f s (%8.0f commits/s)" % (name,
+                commits, duration, commits / duration)
+        db.session.close()
+    finally:
+        # Db is a singleton. Reset it for the next profile.
+        del Db._instance
+        clear_mappers()
+        shutil.rmtree(rootdir)
+
+
+def main():
+    if len(sys.argv) > 1:
+        num = int(sys.argv[1])
+    else:
+        num = 50
+    for name, settings in PROFILES:
+        measure(name, settings, num)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for accessing rules attributes
+
+Compares the access of substituted attributes and depends of a rules with
+and without caching the substituted values.
+
+Usage: python benchmarks/rules_attributes.py [number of accesses]
+"""
+
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from kaizen.rules.loader import RulesLoader
+from kaizen.rules.rules import SUBSTITUTED_ATTRIBUTES
+
+RULES = """
+from kaizen.rules import Rules
+
+class BenchRules(Rules):
+
+    name = "bench"
+    version = "1.0"
+    url = "http://example.org/%(name)s-%(version)s.tar.gz"
+    configure_args = ["--prefix=%(prefix)s", "--libdir=%(prefix)s/lib",
+                      "--datadir=%(prefix)s/share", "--with-%(name)s"]
+    depends = ["a", "b", "c"]
+"""
+
+ATTRIBUTES = ["url", "configure_args", "depends"]
+
+
+def create_uncached(rules_class):
+
+    class UncachedRules(rules_class):
+        """ Substitutes the attributes on every access like before """
+
+        __module__ = rules_class.__module__
+
+        def __getattribute__(self, name):
+            value = object.__getattribute__(self, name)
+            if name in SUBSTITUTED_ATTRIBUTES:
+                if not value:
+                    return value
+                if isinstance(value, list):
+                    shadow = self._Rules__shadow
+                    newlist = shadow.get(name)
+                    if not newlist:
+                        newlist = value[:]
+                        shadow[name] = newlist
+                    for i, listvalue in enumerate(newlist):
+                        newlist[i] = self.var_replace(listvalue)
+                    return newlist
+                return self.var_replace(value)
+            elif name == "depends":
+                deps = []
+                for cmd in [self.build_cmd, self.extract_cmd, self.patch_cmd,
+                            self.configure_cmd, self.destroot_cmd,
+                            self.clean_cmd, self.distclean_cmd]:
+                    if cmd:
+                        deps.extend(cmd.depends)
+                for group in self.groups:
+                    deps.extend(group.depends)
+                deps.extend(value[:])
+                for base in type(self).__bases__:
+                    superdeps = base.depends
+                    if superdeps:
+                        deps.extend(superdeps)
+                return list(set(deps))
+            return value
+
+    return UncachedRules
+
+
+def measure(name, rules, accesses):
+    print name
+    for attribute in ATTRIBUTES:
+        start = time.time()
+        for i in xrange(accesses):
+            getattr(rules, attribute)
+        duration = time.time() - start
+        print "  %-16s %.3f s, %.2f us per access" % (attribute, duration,
+                duration * 1000000 / accesses)
+
+
+def main():
+    accesses = 100000
+    if len(sys.argv) > 1:
+        accesses = int(sys.argv[1])
+
+    rules_dir = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(rules_dir, "bench"))
+        open(os.path.join(rules_dir, "bench", "__init__.py"), "w").close()
+        f = open(os.path.join(rules_dir, "bench", "rules.py"), "w")
+        f.write(RULES)
+        f.close()
+        config = {"rules": [rules_dir], "prefix": "/usr",
+                  "rootdir": rules_dir,
+                  "destroot": os.path.join(rules_dir, "destroot")}
+        rules_class = RulesLoader(config).load("bench")
+
+        measure("cached", rules_class(config, rules_dir, rules_dir,
+                                      rules_dir), accesses)
+        measure("uncached", create_uncached(rules_class)(config, rules_dir,
+                rules_dir, rules_dir), accesses)
+    finally:
+        shutil.rmtree(rules_dir)
+
+
+if __name__ == "__main__":
+    main()
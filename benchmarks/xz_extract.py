@@ -0,0 +1,141 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+"""
+Benchmark for extracting .tar.xz files
+
+Compares peak memory usage (RSS) and time of the previous XZFile
+implementation, which decompressed the whole archive into memory, with the
+streaming XZFile. Each extraction runs in its own process.
+
+Usage: python benchmarks/xz_extract.py [uncompressed size in MiB]
+"""
+
+import os.path
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from cStringIO import StringIO
+
+from kaizen.utils.xz import XZFile, lzma
+
+
+def extract_buffered(filename, dest_dir):
+    xz = lzma.LZMADecompressor()
+    infile = open(filename, "rb")
+    data = xz.decompress(infile.read())
+    infile.close()
+
+    outfile = StringIO(data)
+    tar = tarfile.open(fileobj=outfile, mode="r")
+    tar.extractall(dest_dir)
+    outfile.close()
+
+
+def extract_streaming(filename, dest_dir):
+    XZFile(filename).extractall(dest_dir)
+
+
+def create_archive(filename, size, tmp_dir):
+    words = ["".join([chr(random.randint(97, 122)) for i in range(8)])
+             for j in range(4096)]
+    src_dir = os.path.join(tmp_dir, "src")
+    os.mkdir(src_dir)
+    tar_name = os.path.join(tmp_dir, "source.tar")
+    tar = tarfile.open(tar_name, "w")
+    file_size = 1024 * 1024
+    for i in range(size):
+        name = os.path.join(src_dir, "file%d.txt" % i)
+        f = open(name, "wb")
+        # compresses roughly like source code
+        for j in range(file_size // (9 * 4096)):
+            f.write(" ".join(random.sample(words, 4096)))
+        f.close()
+        tar.add(name, "source/file%d.txt" % i)
+        os.remove(name)
+    tar.close()
+
+    compressor = lzma.LZMACompressor()
+    infile = open(tar_name, "rb")
+    outfile = open(filename, "wb")
+    while True:
+        data = infile.read(1024 * 1024)
+        if not data:
+            break
+        outfile.write(compressor.compress(data))
+    outfile.write(compressor.flush())
+    outfile.close()
+    infile.close()
+    os.remove(tar_name)
+
+
+def run(method, filename, dest_dir):
+    func = globals()["extract_" + method]
+    start = time.time()
+    func(filename, dest_dir)
+    print "%f" % (time.time() - start)
+
+
+def measure(method, filename, tmp_dir):
+    dest_dir = tempfile.mkdtemp(dir=tmp_dir)
+    output = subprocess.Popen([sys.executable, __file__, "--run", method,
+                               filename, dest_dir],
+                              stdout=subprocess.PIPE).communicate()[0]
+    shutil.rmtree(dest_dir)
+    # linux reports ru_maxrss in KiB
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (float(output), rss)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(*sys.argv[2:])
+        return
+    size = 100
+    if len(sys.argv) > 1:
+        size = int(sys.argv[1])
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, "source.tar.xz")
+        create_archive(filename, size, tmp_dir)
+        print "Extracting %d MiB (%.2f MiB compressed)" % (size,
+                os.path.getsize(filename) / 1024. / 1024)
+        # RUSAGE_CHILDREN reports the maximum of all children. Therefore
+        # measure the streaming extraction first.
+        for method in ["streaming", "buffered"]:
+            (duration, rss) = measure(method, filename, tmp_dir)
+            print "%-10s %8.2f s peak RSS %8.2f MiB" % (method, duration,
+                                                       rss / 1024.)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,10 +21,13 @@
 
 import os
 
-from kaizen.rules.manager import RulesManager, RulesList
+from kaizen.rules.manager import RulesManager, RulesList, DownloadResult
 from kaizen.rules.depend import Dependency, SystemProvider, DependencyEvaluator
+from kaizen.rules.index import RulesIndex
+from kaizen.rules.loader import RulesLoader
 from kaizen.system.patch import Quilt
 from kaizen.db.update.upgrade import Upgrade
+from kaizen.error import KaizenRuntimeError
 from kaizen.logging.out import out
 
 
@@ -43,7 +46,8 @@ class Console(object):
         out("Destroot:     %r" % self.config.get("destroot"))
         out("Buildroot:    %r" % self.config.get("buildroot"))
         out("Downloadroot: %r" % self.config.get("downloadroot"))
-        out("Buildjobs:    %r\n" % self.config.get("buildjobs"))
+        out("Buildjobs:    %r" % self.config.get("buildjobs"))
+        out("Installjobs:  %r\n" % self.config.get("installjobs"))
 
 
     def list_rules_files(self, rulesname):
@@ -97,6 +101,9 @@ class Console(object):
     def list_installed_rules(self):
         slist = RulesList(self.config)
         installed = slist.get_installed_rules()
+        if not installed:
+            print "No rules installed"
+            return
         max_length = max([len(s.rules) for s in installed])
         for s in installed:
             print "%s%s%s" % (s.rules, self._get_filler(s.rules,
@@ -105,11 +112,40 @@ class Console(object):
     def list_activated_rules(self):
         slist = RulesList(self.config)
         installed = slist.get_activated_rules()
+        if not installed:
+            print "No rules activated"
+            return
         max_length = max([len(s.rules) for s in installed])
         for s in installed:
             print "%s%s%s" % (s.rules, self._get_filler(s.rules,
                               max_length), s.version)
 
+    def list_available_rules(self):
+        index = RulesIndex(self.config)
+        loader = RulesLoader(self.config)
+        names = index.list_names()
+        if not names:
+            print "No rules available"
+            return
+        max_length = max([len(name) for name in names])
+        for name in names:
+            version = index.get_dist_version(name)
+            if not version:
+                # not indexed yet
+                rules = loader.load(name)
+                if not rules:
+                    continue
+                version = rules.get_dist_version()
+            print "%s%s%s" % (name, self._get_filler(name, max_length),
+                              version)
+
+    def index_rules(self, rebuild=False):
+        index = RulesIndex(self.config)
+        (updated, removed) = index.update(rebuild)
+        if not self.quiet:
+            print "Indexed %d rules, removed %d rules from the index" % (
+                  len(updated), len(removed))
+
     def build_rules(self, rulesname, force=False):
         manager = RulesManager(self.config, rulesname, force)
         manager.build()
@@ -130,9 +166,34 @@ class Console(object):
         manager = RulesManager(self.config, rulesname, force)
         manager.extract()
 
-    def download_rules(self, rulesname, download_all, force=False):
-        manager = RulesManager(self.config, rulesname, force)
-        manager.download(download_all)
+    def download_rules(self, rulesname, download_all, force=False, jobs=1):
+        manager = RulesManager(self.config, rulesname, force=force)
+        results = manager.download(download_all, jobs=jobs)
+        if download_all and not self.quiet:
+            self._print_download_results(results)
+        # the result of the requested rules is the last one
+        if results[-1].status == DownloadResult.FAILED:
+            raise results[-1].error
+        failed = [result.name for result in results if result.status ==
+                  DownloadResult.FAILED]
+        if failed:
+            raise KaizenRuntimeError("Could not download the sources of "
+                                     "rules %s" % ", ".join(failed))
+
+    def _print_download_results(self, results):
+        max_length = max([len(result.name) for result in results])
+        for result in results:
+            if result.status == DownloadResult.FAILED:
+                status = "failed: %s" % result.error
+            elif result.status == DownloadResult.PRESENT:
+                status = "already downloaded"
+            elif result.size is None:
+                status = "downloaded in %.1f s" % result.duration
+            else:
+                status = "downloaded %.2f KiB in %.1f s" % (
+                         result.size / 1024., result.duration)
+            print "%s%s%s" % (result.name, self._get_filler(result.name,
+                              max_length), status)
 
     def destroot_rules(self, rulesname, force=False):
         manager = RulesManager(self.config, rulesname, force)
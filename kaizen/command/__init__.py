@@ -19,13 +19,50 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
 # 02110-1301 USA
 
-from kaizen.command.command import BuildCommand, ActivateCommand, \
-                                DeactivateCommand, DeleteCommand, \
-                                ConfigureCommand, ShowCommand, \
-                                DependsCommand, ExtractCommand, \
-                                DownloadCommand, DestrootCommand, \
-                                InstallCommand, UninstallCommand, \
-                                CreateCommand, PatchCommand, \
-                                UnPatchCommand, ListCommand, \
-                                SystemProvidesCommand, QuiltCommand, \
-                                UpgradeCommand
+# Maps the names of the commands to the import paths of their classes and
+# their descriptions. Only the module of the used command is imported.
+COMMANDS = [
+    ("activate", "kaizen.command.command.ActivateCommand", "Activate rules"),
+    ("build", "kaizen.command.command.BuildCommand", "Run build process"),
+    ("configure", "kaizen.command.command.ConfigureCommand",
+     "Configure rules"),
+    ("create", "kaizen.command.command.CreateCommand", "Create new Rules"),
+    ("deactivate", "kaizen.command.command.DeactivateCommand",
+     "Deactivate rules"),
+    ("delete", "kaizen.command.command.DeleteCommand",
+     "Delete (parts of) rules"),
+    ("depends", "kaizen.command.command.DependsCommand",
+     "List dependencies of rules"),
+    ("destroot", "kaizen.command.command.DestrootCommand",
+     "Install rules into the destroot directory"),
+    ("download", "kaizen.command.command.DownloadCommand",
+     "Download sources of rules"),
+    ("extract", "kaizen.command.command.ExtractCommand",
+     "Extract downloaded sources"),
+    ("index", "kaizen.command.command.IndexCommand",
+     "Create or refresh the index of the available rules"),
+    ("install", "kaizen.command.command.InstallCommand", "Install rules"),
+    ("list", "kaizen.command.command.ListCommand",
+     "List installed, activated or available rules"),
+    ("patch", "kaizen.command.command.PatchCommand",
+     "Apply patches to sources"),
+    ("quilt", "kaizen.command.command.QuiltCommand",
+     "Manage patches for rules with quilt"),
+    ("show", "kaizen.command.command.ShowCommand",
+     "Show information about rules"),
+    ("systemprovide", "kaizen.command.command.SystemProvidesCommand",
+     "Add or remove software provided by the system"),
+    ("uninstall", "kaizen.command.command.UninstallCommand",
+     "Uninstall rules"),
+    ("unpatch", "kaizen.command.command.UnPatchCommand",
+     "Revert patches applied sources"),
+    ("upgrade", "kaizen.command.command.UpgradeCommand",
+     "Upgrade the current kaizen installation"),
+]
+
+
+def load_command(path):
+    """ Imports and returns the command class of the import path """
+    (module_name, class_name) = path.rsplit(".", 1)
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
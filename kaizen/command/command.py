@@ -19,11 +19,16 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
 # 02110-1301 USA
 
-from kaizen.rules.create import RulesCreator
-from kaizen.console.console import Console
 from kaizen.command.parser import NameVersionParser
 
 
+def get_console(config):
+    # the console is imported on use because it loads the database and rules
+    # modules
+    from kaizen.cli.console import Console
+    return Console(config)
+
+
 class Command(object):
 
     def __init__(self, name, func, aliases=[], description=""):
@@ -100,8 +105,8 @@ class BuildCommand(RulesNameCommand):
         super(BuildCommand, self).__init__("build", description)
 
     def main(self, options, config):
-        Console(config).build_rules(options.rulesname[0],
-                                      options.force)
+        get_console(config).build_rules(options.rulesname[0],
+                                          options.force)
 
 
 class PatchCommand(RulesNameCommand):
@@ -111,8 +116,8 @@ class PatchCommand(RulesNameCommand):
         super(PatchCommand, self).__init__("patch", description)
 
     def main(self, options, config):
-        Console(config).patch_rules(options.rulesname[0],
-                                      options.force)
+        get_console(config).patch_rules(options.rulesname[0],
+                                          options.force)
 
 
 class UnPatchCommand(RulesNameCommand):
@@ -122,8 +127,8 @@ class UnPatchCommand(RulesNameCommand):
         super(UnPatchCommand, self).__init__("unpatch", description)
 
     def main(self, options, config):
-        Console(config).unpatch_rules(options.rulesname[0],
-                                        options.force)
+        get_console(config).unpatch_rules(options.rulesname[0],
+                                            options.force)
 
 
 class ConfigureCommand(RulesNameCommand):
@@ -134,8 +139,8 @@ class ConfigureCommand(RulesNameCommand):
                                                ["conf"])
 
     def main(self, options, config):
-        Console(config).configure_rules(options.rulesname[0],
-                                          options.force)
+        get_console(config).configure_rules(options.rulesname[0],
+                                              options.force)
 
 
 class ExtractCommand(RulesNameCommand):
@@ -145,8 +150,8 @@ class ExtractCommand(RulesNameCommand):
         super(ExtractCommand, self).__init__("extract", description, [])
 
     def main(self, options, config):
-        Console(config).extract_rules(options.rulesname[0],
-                                        options.force)
+        get_console(config).extract_rules(options.rulesname[0],
+                                            options.force)
 
 
 class DownloadCommand(RulesNameCommand):
@@ -157,13 +162,17 @@ class DownloadCommand(RulesNameCommand):
                                               ["fetch"])
 
     def main(self, options, config):
-        Console(config).download_rules(options.rulesname[0],
-                                         options.all, options.force)
+        get_console(config).download_rules(options.rulesname[0],
+                                             options.all, options.force,
+                                             options.jobs)
 
     def add_parser(self, parser):
         subparser = super(DownloadCommand, self).add_parser(parser)
         subparser.add_argument("--all", action="store_true",
                                help="download also sources from dependencies")
+        subparser.add_argument("--jobs", "-j", type=int, default=1,
+                               metavar="N", help="number of parallel "
+                               "downloads used with --all")
 
 
 class DestrootCommand(RulesNameCommand):
@@ -174,8 +183,8 @@ class DestrootCommand(RulesNameCommand):
                                               ["dest"])
 
     def main(self, options, config):
-        Console(config).destroot_rules(options.rulesname[0],
-                                         options.force)
+        get_console(config).destroot_rules(options.rulesname[0],
+                                             options.force)
 
 
 class InstallCommand(RulesNameCommand):
@@ -186,8 +195,8 @@ class InstallCommand(RulesNameCommand):
                                              ["inst"])
 
     def main(self, options, config):
-        Console(config).install_rules(options.rulesname[0],
-                                        options.force)
+        get_console(config).install_rules(options.rulesname[0],
+                                            options.force)
 
 
 class UninstallCommand(RulesNameCommand):
@@ -202,9 +211,9 @@ class UninstallCommand(RulesNameCommand):
         return parser
 
     def main(self, options, config):
-        Console(config).uninstall_rules(options.rulesname[0],
-                                          options.version,
-                                          options.force)
+        get_console(config).uninstall_rules(options.rulesname[0],
+                                              options.version,
+                                              options.force)
 
 
 class ActivateCommand(RulesNameCommand):
@@ -214,8 +223,8 @@ class ActivateCommand(RulesNameCommand):
         super(ActivateCommand, self).__init__("activate", description)
 
     def main(self, options, config):
-        Console(config).activate_rules(options.rulesname[0],
-                                         options.force)
+        get_console(config).activate_rules(options.rulesname[0],
+                                             options.force)
 
 
 class DeactivateCommand(RulesNameCommand):
@@ -225,8 +234,8 @@ class DeactivateCommand(RulesNameCommand):
         super(DeactivateCommand, self).__init__("deactivate", description)
 
     def main(self, options, config):
-        Console(config).deactivate_rules(options.rulesname[0],
-                                                options.force)
+        get_console(config).deactivate_rules(options.rulesname[0],
+                                                    options.force)
 
 
 class DeleteCommand(RulesNameCommand):
@@ -253,7 +262,7 @@ class DeleteCommand(RulesNameCommand):
         return subparser
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         rulesname = options.rulesname[0]
         force = options.force
         if options.distclean:
@@ -278,7 +287,7 @@ class DependsCommand(RulesNameCommand):
                                              ["deps"])
 
     def main(self, options, config):
-        Console(config).list_rules_dependencies(options.rulesname[0])
+        get_console(config).list_rules_dependencies(options.rulesname[0])
 
 
 class CreateCommand(Command):
@@ -309,6 +318,7 @@ class CreateCommand(Command):
                                "new rules")
 
     def main(self, options, config):
+        from kaizen.rules.create import RulesCreator
         creator = RulesCreator(config, options.url[0], options.keep)
         if options.name:
             creator.set_name(options.name)
@@ -344,7 +354,7 @@ class ShowCommand(CommandWithSubCommands):
         self._add_args(cmd)
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         rules_name = options.rulesname[0]
         if options.subcommand == "phases":
             console.list_rules_phases(rules_name)
@@ -358,10 +368,10 @@ class ShowCommand(CommandWithSubCommands):
 class ListCommand(CommandWithSubCommands):
 
     def __init__(self):
-        description = ""
+        description = "List installed, activated or available rules"
         name = "list"
         usage = "%(prog)s [global options] " + name + \
-                " <installed|activated>"
+                " <installed|activated|available>"
         super(ListCommand, self).__init__(name, usage, description)
 
     def add_cmds(self, subparser):
@@ -371,13 +381,18 @@ class ListCommand(CommandWithSubCommands):
         usage = "%(prog)s [global options] " + self.name +  "activated"
         cmd = subparser.add_parser("activated", help="show activated rules",
                                    usage=usage)
+        usage = "%(prog)s [global options] " + self.name +  "available"
+        cmd = subparser.add_parser("available", help="show available rules",
+                                   usage=usage)
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         if options.subcommand == "installed":
             console.list_installed_rules()
         elif options.subcommand == "activated":
             console.list_activated_rules()
+        elif options.subcommand == "available":
+            console.list_available_rules()
 
 
 class SystemProvidesCommand(CommandWithSubCommands):
@@ -409,7 +424,7 @@ class SystemProvidesCommand(CommandWithSubCommands):
                                    "the system", usage=self.usage)
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         if options.subcommand == "list":
             console.list_system_provides()
             return
@@ -446,7 +461,7 @@ class QuiltCommand(CommandWithSubCommands):
         super(QuiltCommand, self).__init__(name, usage, description)
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         rules_name = options.rulesname[0]
 
     def _get_usage(self, cmd, extra=None):
@@ -515,7 +530,7 @@ class QuiltCommand(CommandWithSubCommands):
                 "to patch")
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         subcmd = options.subcommand
         rulesname = options.rulesname[0]
         if subcmd == "push":
@@ -547,5 +562,25 @@ class UpgradeCommand(Command):
         return subparser
 
     def main(self, options, config):
-        console = Console(config)
+        console = get_console(config)
         console.upgrade()
+
+
+class IndexCommand(Command):
+
+    def __init__(self):
+        description = "Create or refresh the index of the available rules"
+        super(IndexCommand, self).__init__("index", self.main, [],
+                                           description)
+
+    def add_parser(self, parser):
+        usage = "%(prog)s [global options] " + self.name + " {arguments}"
+        subparser = super(IndexCommand, self).add_parser(parser, usage)
+        subparser.add_argument("--rebuild", action="store_true",
+                               help="index all rules again even if they "
+                               "haven't been changed")
+        return subparser
+
+    def main(self, options, config):
+        console = get_console(config)
+        console.index_rules(options.rebuild)
@@ -21,11 +21,14 @@
 
 import kaizen
 
-from argparse import ArgumentParser as ArgParser, ArgumentError
+from argparse import ArgumentParser as ArgParser, ArgumentError, SUPPRESS
 
 
 class ArgumentParser(ArgParser):
 
+    # default of the global options
+    global_default = None
+
     def __init__(self, usage=None, create_late=False, **kwargs):
         if not usage:
             usage = "%(prog)s [options] command {arguments}"
@@ -39,13 +42,13 @@ class ArgumentParser(ArgParser):
                                              description=description,
                                              add_help=add_help, **kwargs)
         self.group = self.add_argument_group("global options")
-        self.group.add_argument("--config", dest="config",
+        self._add_global_argument("--config", dest="config",
                           help="path to the config file")
-        self.group.add_argument("--rules", help="path to rules")
-        self.group.add_argument("-d", "--debug", action="store_true",
+        self._add_global_argument("--rules", help="path to rules")
+        self._add_global_argument("-d", "--debug", action="store_true",
                           dest="debug",
                           help="enable debug output")
-        self.group.add_argument("--settings", action="store_true",
+        self._add_global_argument("--settings", action="store_true",
                           help="print kaizen settings")
         if not create_late:
             self._add_additional_arguments()
@@ -55,17 +58,29 @@ class ArgumentParser(ArgParser):
             return
         version = "%(prog)s " + kaizen.__version__
         self.group.add_argument("--version", action="version", version=version)
-        self.group.add_argument("-v", "--verbose", action="store_true",
+        self._add_global_argument("-v", "--verbose", action="store_true",
                           dest="verbose",
                           help="enable verbose output")
-        self.group.add_argument("-f", "--force", action="store_true",
+        self._add_global_argument("-f", "--force", action="store_true",
                           dest="force",
                           help="force an action e.g. re-download sources")
-        self.group.add_argument("--buildjobs", type=int, metavar="JOBS",
+        self._add_global_argument("--buildjobs", type=int, metavar="JOBS",
                           help="set number of build jobs")
+        self._add_global_argument("--installjobs", type=int, metavar="JOBS",
+                          help="set number of dependencies to install in "
+                          "parallel")
         self.set_help()
         self.args_added = True
 
+    def _add_global_argument(self, *args, **kwargs):
+        if self.global_default is SUPPRESS:
+            kwargs["default"] = SUPPRESS
+        self.group.add_argument(*args, **kwargs)
+
+    def add_subparsers(self, **kwargs):
+        kwargs.setdefault("parser_class", CommandParser)
+        return super(ArgumentParser, self).add_subparsers(**kwargs)
+
     def parse_known_args(self, args=None, namespace=None):
         args = super(ArgumentParser, self).parse_known_args(args, namespace)
         self._add_additional_arguments()
@@ -77,6 +92,17 @@ class ArgumentParser(ArgParser):
                         "for a command use 'command --help'")
 
 
+class CommandParser(ArgumentParser):
+    """ Parser of a command
+
+    The global options of a command are only set if they are passed after
+    the command. Otherwise the values parsed before the command would be
+    overwritten by the defaults.
+    """
+
+    global_default = SUPPRESS
+
+
 class NameVersionParser(object):
 
     def __init__(self):
@@ -41,6 +41,8 @@ class Config(object):
     * debug - Bool: debug is enabled/disabled (default is False)
     * verbose - Bool: commands should print it's output (default is False)
     * debugdb - Bool: database queries are printed (default is False)
+    * checkphases - Bool: compare the cached phases of a rules with the
+                          database after each change (default is False)
     * prefix - String: absolute path to the prefix (default is /usr/local)
     * rootdir - String: path to the rootdir (default is %(prefix)s/kaizen)
     * downloadroot - String: path to the directory to put in downloaded source
@@ -59,6 +61,53 @@ class Config(object):
     * buildjobs - Integer: number of jobs that should be used to build the
                            source e.g. started via make -j.
                            0 or empty for auto detection.
+    * installjobs - Integer: number of independent dependencies that may be
+                             installed at the same time. The buildjobs are
+                             shared between these installations.
+                             (default is 1)
+    * activatejobs - Integer: number of threads creating the symlinks of the
+                              activated files. More threads help especially
+                              on network filesystems. (default is 4)
+    * activation - String: how the files of a rules are activated in the
+                           prefix. Either symlink, hardlink or reflink. A
+                           rules may override it with its activation
+                           attribute. (default is symlink)
+    * linkdirectories - Boolean: activate directories named after a rules
+                                 which no other rules installs into as one
+                                 symlink instead of linking each file. Only
+                                 used with the symlink activation.
+                                 (default is true)
+    * downloadchunksize - Integer: number of bytes read at once while
+                                   downloading sources
+                                   (default is 1048576)
+    * extractbackend - String: how source archives are extracted. auto uses
+                               external multi-threaded decompressors like
+                               pigz, lbzip2, pbzip2, xz and zstd if available.
+                               python always uses the python modules.
+                               (default is auto)
+    * sourcecache - String: path to the cache of extracted sources
+                            (default is %(rootdir)s/sourcecache)
+    * sourcecachesize - Integer: max number of bytes of the source cache.
+                                 0 disables the cache. Without reflink
+                                 support the cached sources are copied.
+                                 (default is 0)
+    * sourcecacheclone - String: how cached sources are cloned. Either auto,
+                                 reflink, hardlink or copy. auto uses reflinks
+                                 if supported and copies otherwise.
+                                 (default is auto)
+    * dbjournalmode - String: sqlite journal mode of the kaizen database
+                              (default is wal)
+    * dbsynchronous - String: sqlite synchronous setting of the kaizen
+                              database (default is normal)
+    * dbmmapsize - Integer: max number of bytes of the kaizen database mapped
+                            into memory. 0 disables memory mapping.
+                            (default is 67108864)
+    * dbcachesize - Integer: sqlite cache size of the kaizen database. A
+                             negative value is the size in KiB, a positive
+                             value the number of pages. (default is -16000)
+    * dbtempstore - String: where sqlite stores temporary tables and indices.
+                            Either default, file or memory.
+                            (default is memory)
     """
 
     def __init__(self, files=[], options={}):
@@ -72,6 +121,19 @@ class Config(object):
         defaults["verbose"] = False
         defaults["prefix"] = "/usr/local"
         defaults["buildjobs"] = 1
+        defaults["installjobs"] = 1
+        defaults["activatejobs"] = 4
+        defaults["activation"] = "symlink"
+        defaults["linkdirectories"] = True
+        defaults["downloadchunksize"] = 1048576
+        defaults["extractbackend"] = "auto"
+        defaults["sourcecachesize"] = 0
+        defaults["sourcecacheclone"] = "auto"
+        defaults["dbjournalmode"] = "wal"
+        defaults["dbsynchronous"] = "normal"
+        defaults["dbmmapsize"] = 67108864
+        defaults["dbcachesize"] = -16000
+        defaults["dbtempstore"] = "memory"
 
         # use preferred values from options
         for key in defaults.keys() + ["rules"]:
@@ -96,9 +158,37 @@ class Config(object):
         self.config["downloadroot"] = self._get("downloadroot")
         self.config["buildroot"] = self._get("buildroot")
         self.config["debugdb"] = self._getbool("debugdb", False)
+        self.config["checkphases"] = self._getbool("checkphases", False)
+        self.config["downloadchunksize"] = self._getint("downloadchunksize",
+                                                defaults["downloadchunksize"])
+        self.config["extractbackend"] = self._get("extractbackend",
+                                                  defaults["extractbackend"])
+        self.config["sourcecache"] = self._get("sourcecache")
+        self.config["sourcecachesize"] = self._getint("sourcecachesize",
+                                                defaults["sourcecachesize"])
+        self.config["sourcecacheclone"] = self._get("sourcecacheclone",
+                                                defaults["sourcecacheclone"])
+        self.config["dbjournalmode"] = self._get("dbjournalmode",
+                                                 defaults["dbjournalmode"])
+        self.config["dbsynchronous"] = self._get("dbsynchronous",
+                                                 defaults["dbsynchronous"])
+        self.config["dbmmapsize"] = self._getint("dbmmapsize",
+                                                 defaults["dbmmapsize"])
+        self.config["dbcachesize"] = self._getint("dbcachesize",
+                                                  defaults["dbcachesize"])
+        self.config["dbtempstore"] = self._get("dbtempstore",
+                                               defaults["dbtempstore"])
         self.config["system"] = self._get("system")
         self.config["buildjobs"] = self._getint("buildjobs",
                                                 defaults["buildjobs"])
+        self.config["installjobs"] = self._getint("installjobs",
+                                                  defaults["installjobs"])
+        self.config["activatejobs"] = self._getint("activatejobs",
+                                                   defaults["activatejobs"])
+        self.config["activation"] = self._get("activation",
+                                              defaults["activation"])
+        self.config["linkdirectories"] = self._getbool("linkdirectories",
+                                                defaults["linkdirectories"])
 
         kaizen_package_path = os.path.abspath(os.path.join(os.path.dirname(__file__),
                                                         os.path.pardir))
@@ -116,12 +206,18 @@ class Config(object):
             self.config["rules"] = [os.path.join(kaizen_dir, "rules")]
         if not self.config.get("destroot", None):
             self.config["destroot"] = os.path.join(kaizen_dir, "destroot")
+        if not self.config.get("sourcecache", None):
+            self.config["sourcecache"] = os.path.join(kaizen_dir, "sourcecache")
         if not self.config.get("buildroot", None):
             self.config["buildroot"] = os.path.join(kaizen_dir, "cache")
         if not self.config.get("appsdir", None):
             self.config["appsdir"] = os.path.join(prefix, "Applications")
         if not self.config.get("buildjobs") > 0:
             self.config["buildjobs"] = get_number_of_cpus() + 1
+        if not self.config.get("downloadchunksize") > 0:
+            self.config["downloadchunksize"] = defaults["downloadchunksize"]
+        if not self.config.get("installjobs") > 0:
+            self.config["installjobs"] = defaults["installjobs"]
 
     def _get(self, value, default=None):
         if value in self.preferred:
@@ -20,4 +20,3 @@
 # 02110-1301 USA
 
 from kaizen.console.main import main
-from kaizen.console.console import Console
@@ -22,12 +22,14 @@
 
 import sys
 
-import kaizen.command
+import kaizen.logging
 
+from argparse import REMAINDER
+
+from kaizen.command import COMMANDS, load_command
 from kaizen.config import Config, KAIZEN_CONFIG_FILES
-from kaizen.utils import Loader
 from kaizen.command.parser import ArgumentParser
-from kaizen.logging.out import out
+
 
 class Main(object):
 
@@ -41,39 +43,32 @@ class Main(object):
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
 
-        parser = ArgumentParser(create_late=True)
         all_args = sys.argv[1:]
-        args = parser.parse_known_args(all_args)
-        options = args[0]
 
-        if options.config:
-            configfiles.append(options.config)
+        parser = ArgumentParser(create_late=True)
+        options = parser.parse_known_args(all_args)[0]
 
         if options.settings:
+            self.config = self.create_config(options)
             self.print_settings()
             return
 
-        # parse config for debug option
-        config = Config(KAIZEN_CONFIG_FILES, vars(options))
-
-        if config.get("debug"):
-            self.logger.setLevel(kaizen.logging.DEBUG)
-        else:
-            self.logger.setLevel(kaizen.loggin.ERROR)
-
-        subparsers = parser.add_subparsers(dest="command", title="commands",
-                                           description="valid commands",
-                                           metavar="")
-
-        for command in Loader().classes(kaizen.command, all=True):
-            command().add_parser(subparsers)
+        # find out the used command first. Only the module of this command is
+        # imported and only its parser is created.
+        self.add_commands(parser)
+        options = parser.parse_known_args(all_args)[0]
 
+        parser = ArgumentParser()
+        self.add_commands(parser, options.command)
         options = parser.parse_args(all_args)
 
-        self.config = Config(KAIZEN_CONFIG_FILES, vars(options))
+        self.config = self.create_config(options)
 
         if self.config.get("debug"):
+            self.logger.setLevel(kaizen.logging.DEBUG)
             self.print_settings()
+        else:
+            self.logger.setLevel(kaizen.logging.ERROR)
 
         if not hasattr(options, "func"):
             parser.print_help()
@@ -81,6 +76,34 @@ class Main(object):
 
         options.func(options, self.config)
 
+    def create_config(self, options):
+        configfiles = KAIZEN_CONFIG_FILES[:]
+        if options.config:
+            configfiles.append(options.config)
+        return Config(configfiles, vars(options))
+
+    def add_commands(self, parser, name=None):
+        """ Adds the parser of the command name
+
+        The other commands are only added with their description.
+        """
+        subparsers = parser.add_subparsers(dest="command", title="commands",
+                                           description="valid commands",
+                                           metavar="")
+        for (command_name, path, description) in COMMANDS:
+            if command_name == name:
+                load_command(path)().add_parser(subparsers)
+            else:
+                # create_late avoids handling --help of the command here
+                subparser = subparsers.add_parser(command_name,
+                                                  help=description,
+                                                  create_late=True)
+                subparser.add_argument("args", nargs=REMAINDER)
+
+    def print_settings(self):
+        from kaizen.cli.console import Console
+        Console(self.config).list_settings()
+
 
 def main():
     Main().main()
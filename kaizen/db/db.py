@@ -20,18 +20,68 @@
 # 02110-1301 USA
 
 import os.path
+import threading
 
 import kaizen.logging
 
-from sqlalchemy import String, create_engine
+from sqlalchemy import String, create_engine, event
 from sqlalchemy.orm import mapper, sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from kaizen.error import KaizenRuntimeError
 from kaizen.db.tables import Tables
 from kaizen.db.objects import Info, Installed, File, Directory, RulesPhase, \
-        UpdateVersion, InstallDirectories, SchemaVersion
+        UpdateVersion, InstallDirectories, SchemaVersion, RulesIndexEntry, \
+        Activation, DirectoryLink
 
 CURRENT_DB_SCHEMA = 0
 
+JOURNAL_MODES = ["delete", "truncate", "persist", "memory", "wal", "off"]
+SYNCHRONOUS_MODES = ["off", "normal", "full", "extra"]
+TEMP_STORES = ["default", "file", "memory"]
+
+
+class SqlitePragmas(object):
+    """
+    Applies pragmas to each new sqlite connection
+
+    The values are taken from the db* config settings. An empty value keeps
+    the sqlite default.
+    """
+
+    def __init__(self, config):
+        self.log = kaizen.logging.getLogger(self)
+        self.pragmas = []
+        self._add("journal_mode", config.get("dbjournalmode"), JOURNAL_MODES)
+        self._add("synchronous", config.get("dbsynchronous"),
+                  SYNCHRONOUS_MODES)
+        self._add("mmap_size", config.get("dbmmapsize"))
+        self._add("cache_size", config.get("dbcachesize"))
+        self._add("temp_store", config.get("dbtempstore"), TEMP_STORES)
+
+    def _add(self, name, value, choices=None):
+        if value is None or value == "":
+            return
+        if choices is None:
+            value = int(value)
+        else:
+            value = str(value).lower()
+            if value not in choices:
+                raise KaizenRuntimeError("Invalid value %r for sqlite pragma "
+                                         "%s. Valid values are %s" % (value,
+                                         name, ", ".join(choices)))
+        self.pragmas.append((name, value))
+
+    def __call__(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for (name, value) in self.pragmas:
+                self.log.debug("Setting sqlite pragma %s=%s", name, value)
+                cursor.execute("PRAGMA %s=%s" % (name, value))
+        finally:
+            cursor.close()
+
+
 class Db(object):
 
     def __new__(type, *args):
@@ -49,8 +99,15 @@ class Db(object):
             db_path = os.path.join(rootdir, "kaizen.db")
             if not os.path.exists(rootdir):
                 os.makedirs(rootdir)
+            # the session may be used from several install threads. Access
+            # is serialized with self.lock. A single connection is kept open
+            # so that the pragmas are only applied once.
             self.engine = create_engine("sqlite:///%s" % db_path,
-                                        echo=debug_db)
+                                        echo=debug_db, connect_args={
+                                            "check_same_thread": False},
+                                        poolclass=StaticPool)
+            self.lock = threading.RLock()
+            event.listen(self.engine, "connect", SqlitePragmas(config))
             self.tables = Tables(self)
             self.tables.create()
             SqlAlchemySession = sessionmaker()
@@ -59,10 +116,13 @@ class Db(object):
             mapper(Installed, self.tables.installed_table)
             mapper(File, self.tables.files_table)
             mapper(Directory, self.tables.dirs_table)
+            mapper(Activation, self.tables.activations_table)
+            mapper(DirectoryLink, self.tables.directory_links_table)
             mapper(RulesPhase, self.tables.phases_table)
             mapper(SchemaVersion, self.tables.dbversion_table)
             mapper(UpdateVersion, self.tables.updates_table)
             mapper(InstallDirectories, self.tables.install_directories_table)
+            mapper(RulesIndexEntry, self.tables.rules_index_table)
             self._init_schema()
             self._already_init = True
 
@@ -75,5 +135,5 @@ class Db(object):
             self.schema = SchemaVersion(CURRENT_DB_SCHEMA)
             self.session.add(self.schema)
             self.session.commit()
-        self.log.debug("Current database schema version is %r" % \
+        self.log.debug("Current database schema version is %r",
                        self.schema.version)
@@ -53,6 +53,21 @@ class Directory(object):
         self.rules = rules
 
 
+class DirectoryLink(object):
+
+    def __init__(self, directory, rules):
+        self.directory = directory
+        self.rules = rules
+
+
+class Activation(object):
+
+    def __init__(self, rules, strategy, source=None):
+        self.rules = rules
+        self.strategy = strategy
+        self.source = source
+
+
 class RulesPhase(object):
 
     def __init__(self, rules, version, phase):
@@ -103,3 +118,25 @@ class InstallDirectories(object):
                "download=%r source=%r build=%r destroot=%r>" % (id(self),
                        self.rules, self.version, self.download, self.source,
                        self.build, self.destroot)
+
+
+class RulesIndexEntry(object):
+
+    def __init__(self, name, path, mtime, version=None, revision=None,
+                 depends=None, runtime_depends=None, url=None, hash=None,
+                 vars=None):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.version = version
+        self.revision = revision
+        self.depends = depends
+        self.runtime_depends = runtime_depends
+        self.url = url
+        self.hash = hash
+        self.vars = vars
+
+    def __repr__(self):
+        return "<RulesIndexEntry id='0x%x' name=%r path=%r version=%r " \
+               "revision=%r>" % (id(self), self.name, self.path,
+                                 self.version, self.revision)
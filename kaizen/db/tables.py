@@ -22,7 +22,7 @@
 from kaizen.phase.phase import Phases, Phase
 
 from sqlalchemy import MetaData, Table, Column, String, \
-        ForeignKey, TypeDecorator, DateTime, Integer
+        ForeignKey, TypeDecorator, DateTime, Integer, Index, Float
 
 
 class PhaseType(TypeDecorator):
@@ -81,6 +81,24 @@ class Tables(object):
                                  ForeignKey(self.info_table.c.rules),
                                  primary_key=True))
 
+        # directories which are activated as one symlink. The symlink is also
+        # recorded in the files table.
+        self.directory_links_table = Table("directory_links", self.metadata,
+                          Column("directory", String, primary_key=True),
+                          Column("rules", String,
+                                 ForeignKey(self.info_table.c.rules),
+                                 nullable=False))
+
+        # activation strategy and activated destroot directory of the
+        # activated rules. Rules without an entry are activated with
+        # symlinks.
+        self.activations_table = Table("activations", self.metadata,
+                          Column("rules", String,
+                                 ForeignKey(self.info_table.c.rules),
+                                 primary_key=True),
+                          Column("strategy", String, nullable=False),
+                          Column("source", String))
+
         self.phases_table = Table("phases", self.metadata,
                        Column('rules', String,
                               ForeignKey(self.info_table.c.rules),
@@ -106,6 +124,40 @@ class Tables(object):
                 Column("build", String),
                 Column("destroot", String),)
 
+        # index of the available rules. The list values are stored as json.
+        self.rules_index_table = Table("rules_index", self.metadata,
+                Column("name", String, primary_key=True),
+                Column("path", String, nullable=False),
+                Column("mtime", Float, nullable=False),
+                Column("version", String),
+                Column("revision", String),
+                Column("depends", String),
+                Column("runtime_depends", String),
+                Column("url", String),
+                Column("hash", String),
+                Column("vars", String),)
+
+        # indexes for the columns used to look up the files, directories and
+        # phases of a rules. Primary keys are already indexed by sqlite.
+        # Existing databases get these indexes via the indexes update.
+        self.indexes = [
+                Index("ix_files_rules", self.files_table.c.rules),
+                Index("ix_directories_rules", self.dirs_table.c.rules),
+                Index("ix_phases_rules_phase", self.phases_table.c.rules,
+                      self.phases_table.c.phase),
+                Index("ix_phases_phase", self.phases_table.c.phase),
+                ]
+
+        # temporary tables only exist for the connection they are created
+        # with. Therefore they use their own metadata and are not created
+        # by create().
+        self.temp_metadata = MetaData()
+
+        self.activate_files_table = Table("activate_files",
+                self.temp_metadata,
+                Column("filename", String, primary_key=True),
+                prefixes=["TEMPORARY"])
+
     def create(self):
         self.metadata.create_all()
 
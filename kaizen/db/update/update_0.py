@@ -19,8 +19,12 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
 # 02110-1301 USA
 
+from sqlalchemy.engine.reflection import Inspector
+
 from kaizen.db.update.update import Update as RootUpdate
+from kaizen.db.update.error import UpdateError
 from kaizen.db.objects import RulesPhase, InstallDirectories
+from kaizen.rules.error import RulesError
 from kaizen.rules.handler import RulesHandler
 from kaizen.utils.helpers import real_path
 
@@ -35,8 +39,8 @@ class UpdateForInstallDirs(Update):
     name = "installdirs"
 
     def run(self):
-        self.log.info("Running update %r %r" % (self.version, self.name))
-        db = self.db.rules
+        self.log.info("Running update %r %r", self.version, self.name)
+        db = self.db.session
 
         query = db.query(RulesPhase.rules, RulesPhase.version).distinct( \
                 RulesPhase.rules, RulesPhase.version)
@@ -44,16 +48,44 @@ class UpdateForInstallDirs(Update):
             rules_name = rulesphase[0]
             rules_version = rulesphase[1]
             handler = RulesHandler(self.config, rules_name, rules_version)
-            rules = handler.rules
+            try:
+                rules = handler.rules
+            except RulesError, e:
+                # e.g. the rules have been removed
+                db.rollback()
+                raise UpdateError("Could not update the install directories. "
+                                  "%s" % e)
             install_directories = InstallDirectories(rules_name,
                                                      rules_version)
             install_directories.build = real_path(rules.build_path)
             install_directories.source = real_path(rules.src_path)
             install_directories.destroot = real_path(rules.destroot_path)
-            self.log.debug("Update install_directories %r" % install_directories)
+            self.log.debug("Update install_directories %r", install_directories)
             db.merge(install_directories)
 
         db.commit()
         return True
 
-updates = [UpdateForInstallDirs]
+
+class UpdateForIndexes(Update):
+
+    name = "indexes"
+
+    def run(self):
+        self.log.info("Running update %r %r", self.version, self.name)
+        connection = self.db.session.connection()
+        inspector = Inspector.from_engine(connection)
+        for index in self.db.tables.indexes:
+            table_name = index.table.name
+            names = [existing["name"] for existing in
+                     inspector.get_indexes(table_name)]
+            if index.name in names:
+                self.log.debug("Index %r on table %r already exists",
+                               index.name, table_name)
+                continue
+            self.log.debug("Creating index %r on table %r", index.name,
+                           table_name)
+            index.create(connection)
+        return True
+
+updates = [UpdateForInstallDirs, UpdateForIndexes]
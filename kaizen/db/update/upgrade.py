@@ -47,21 +47,21 @@ class Upgrade(object):
         cur_updates = updates.get(version)
         if not cur_updates:
             self.log.debug("No updates for database scheme version"
-                           " %r available" % version)
+                           " %r available", version)
             return
 
         for update in cur_updates:
             if self.db.session.query(
                     UpdateVersion).filter(UpdateVersion.update ==
                             update.name).first():
-                    self.log.debug("Update %r already applied." % update.name)
+                    self.log.debug("Update %r already applied.", update.name)
                     continue
             update = update(self.config, self.db)
             try:
-                self.log.debug("Running update %r" % update.name)
+                self.log.debug("Running update %r", update.name)
                 success = update.run()
                 if success:
                     update.finish()
             except UpdateError, e:
-                self.log.error("Error while running update %r. %s" % update.name,
-                               e)
+                self.log.error("Error while running update %r. %s",
+                               update.name, e)
@@ -20,7 +20,7 @@
 # 02110-1301 USA
 
 from kaizen.logging.log import Color, getLogger, getRootLogger, out, \
-                            ColorStreamHandler
+                            ColorStreamHandler, Lazy
 
 from logging import DEBUG, INFO, WARNING, ERROR, CRITICAL, NOTSET, \
                     Formatter
@@ -38,6 +38,25 @@ def getRootLogger():
 def out(message, fg=0, bg=0):
     print "%s%s%s" % (Color.start(fg, bg), message, Color.reset())
 
+class Lazy(object):
+    """ Argument of a log message which is computed on formatting
+
+    The loggers format a message with its arguments only if the message is
+    logged. Lazy also defers computing an argument, e.g.
+    log.debug("Running %s", Lazy(" ".join, cmd)).
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self):
+        return repr(self.func(*self.args, **self.kwargs))
+
 class Color(object):
 
     BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(30, 38)
@@ -112,14 +112,15 @@ class RulesCreator(object):
         if not os.path.isdir(self.dir):
             os.makedirs(self.dir)
         self.tmp_dir = mkdtemp(prefix="tmp-rules-", dir=self.dir)
-        self.log.debug("Created temporary directory '%s'" % self.tmp_dir)
+        self.log.debug("Created temporary directory '%s'", self.tmp_dir)
         downloader = UrlDownloader(None, self.url)
         source = downloader.copy(self.tmp_dir)
         hashcalc = Hash(source)
+        hashcalc.calculate(["md5", "sha1"])
         md5 = hashcalc.md5()
-        self.log.debug("md5 hash is '%s'" % md5)
+        self.log.debug("md5 hash is '%s'", md5)
         sha1 = hashcalc.sha1()
-        self.log.debug("sha1 hash is '%s'" % sha1)
+        self.log.debug("sha1 hash is '%s'", sha1)
 
         filename = os.path.basename(source)
         if not "-" in filename and (not self.name or not self.version):
@@ -128,7 +129,8 @@ class RulesCreator(object):
                     "version from file '%s'" % filename)
 
         if "-" in filename:
-            suffixes = [".tar.gz", ".tar.bz2", ".tgz", "tbz2", ".zip"]
+            suffixes = [".tar.gz", ".tar.bz2", ".tar.xz", ".tar.zst", ".tgz",
+                        "tbz2", ".txz", ".tzst", ".zip"]
             for suffix in suffixes:
                 if filename.endswith(suffix):
                     index = filename.rfind(suffix)
@@ -154,15 +156,15 @@ class RulesCreator(object):
                     break
             if not template:
                 self.log.info("Could not detected template for '%s'. "
-                              "Using default." % name)
+                              "Using default.", name)
                 template = Template("default.template")
         else:
             template = Template(self.templatename + ".template")
 
-        self.log.debug("Detected rules name is '%s'" % detected_name)
-        self.log.debug("Detected rules version is '%s'" % detected_version)
-        self.log.info("Rules name is '%s'" % name)
-        self.log.info("Rules version is '%s'" % version)
+        self.log.debug("Detected rules name is '%s'", detected_name)
+        self.log.debug("Detected rules version is '%s'", detected_version)
+        self.log.info("Rules name is '%s'", name)
+        self.log.info("Rules version is '%s'", version)
 
         vars = dict()
         vars["name"] = name
@@ -191,7 +193,7 @@ class RulesCreator(object):
             try:
                 rulesfile = os.path.join(new_rules_dir, "rules.py")
                 f = open(rulesfile, "w")
-                self.log.info("Creating new rules file '%s'" % rulesfile)
+                self.log.info("Creating new rules file '%s'", rulesfile)
                 f.write(template.replace(vars))
             finally:
                 f.close()
@@ -200,6 +202,6 @@ class RulesCreator(object):
 
     def clean(self):
         if self.tmp_dir and not self.keep:
-            self.log.debug("Deleteing temporary directory '%s'" % self.tmp_dir)
+            self.log.debug("Deleteing temporary directory '%s'", self.tmp_dir)
             shutil.rmtree(self.tmp_dir)
 
@@ -26,6 +26,7 @@ import kaizen.logging
 from ConfigParser import RawConfigParser
 
 from kaizen.rules.handler import RulesHandler
+from kaizen.rules.index import RulesIndex
 from kaizen.rules.error import RulesError
 
 class UnresolvedDependencies(RulesError):
@@ -42,27 +43,58 @@ class UnresolvedDependencies(RulesError):
         super(UnresolvedDependencies, self).__init__(rules_name, value)
 
 
-class DependencyAnalyser(object):
+class CyclicDependencies(RulesError):
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        value = "Cyclic dependency found: %s" % " -> ".join(cycle)
+        super(CyclicDependencies, self).__init__(cycle[0], value)
 
-    dependency_field = "depends"
-    dependency_fields = ["depends"]
 
-    def __init__(self, config, rules):
+class DependencyResolver(object):
+    """
+    Resolves the build and runtime dependencies of a rules
+
+    All rules reachable via depends and runtime_depends are loaded in a
+    single traversal. Each rules gets one RulesHandler which is shared by all
+    dependency graphs created by the resolver. The system provided
+    dependencies are read only once.
+    """
+
+    fields = ["depends", "runtime_depends"]
+
+    def __init__(self, config, rules, systemprovider=None):
         self.config = config
         self.rules = rules
-        self.dependencies = dict()
-        self.missing = dict()
-        self.systemprovider = SystemProvider(config)
         self.log = kaizen.logging.getLogger(self)
-        self.systemprovider.load()
-
-    def analyse_rules(self, rules, dependency_fields):
-        dependencies = []
-        depends = []
-        for dependency_field in dependency_fields:
-            depends.extend(getattr(rules.rules, dependency_field, []))
-        if not depends:
-            return dependencies
+        if not systemprovider:
+            systemprovider = SystemProvider(config)
+            systemprovider.load()
+        self.systemprovider = systemprovider
+        self.index = RulesIndex(config)
+        self.handlers = dict()
+        self.handlers[(rules.rules_name, None)] = rules
+        # name -> dict with a list of (name, version) tuples per field for
+        # rules, SystemDependency for system provided software and None for
+        # missing rules
+        self.nodes = None
+        self.root = None
+        self.graphs = dict()
+
+    def get_handler(self, name, version=None):
+        """ Returns the shared RulesHandler for name and version """
+        key = (name, version)
+        handler = self.handlers.get(key)
+        if not handler:
+            handler = RulesHandler(self.config, name, version)
+            self.handlers[key] = handler
+        return handler
+
+    def _get_depends(self, handler, field):
+        depends = self.index.get_depends(handler.rules_name, [field])
+        if depends is None:
+            depends = getattr(handler.rules, field, [])
+        result = []
         for depend in depends:
             name = depend
             version = None
@@ -70,36 +102,114 @@ class DependencyAnalyser(object):
                 name = depend[0]
                 version = depend[1]
             if not name:
-                self.log.warn("Rules '%s' has an empty dependency" %
-                              rules.name)
+                self.log.warn("Rules '%s' has an empty dependency",
+                              handler.rules_name)
                 continue
             if name == self.rules.rules_name:
                 self.log.warn("Cyclic dependency found.")
                 continue
-            if name in self.dependencies:
-                dependency = self.dependencies[name]
-            elif self.systemprovider and self.systemprovider.provides(name):
-                dependency = self.systemprovider.get(name)
-                self.dependencies[name] = dependency
+            result.append((name, version))
+        return result
+
+    def _get_node(self, handler):
+        return dict([(field, self._get_depends(handler, field)) for field in
+                     self.fields])
+
+    def resolve(self):
+        """ Loads all rules reachable from the rules """
+        if self.nodes is not None:
+            return
+        self.root = self._get_node(self.rules)
+        self.nodes = dict()
+        stack = []
+        for field in self.fields:
+            stack.extend(reversed(self.root[field]))
+        while stack:
+            (name, version) = stack.pop()
+            if name in self.nodes:
+                continue
+            if self.systemprovider.provides(name):
+                self.nodes[name] = self.systemprovider.get(name)
+                continue
+            try:
+                handler = self.get_handler(name)
+                node = self._get_node(handler)
+            except RulesError, e:
+                self.log.error("Error while loading dependency '%s': %s",
+                               name, e)
+                self.nodes[name] = None
+                continue
+            node["handler"] = handler
+            self.nodes[name] = node
+            for field in self.fields:
+                stack.extend(reversed(node[field]))
+
+    def get_dependencies(self, root_fields, fields):
+        """ Returns the dependencies of the rules
+
+        The direct dependencies are taken from root_fields and the
+        dependencies of dependencies from fields. Returns a tuple of the list
+        of Dependency objects and a dict of the missing dependencies.
+        """
+        key = (tuple(root_fields), tuple(fields))
+        if key in self.graphs:
+            return self.graphs[key]
+        self.resolve()
+
+        dependencies = dict()
+        missing = dict()
+        order = []
+
+        def get_dependency(name, version):
+            dependency = dependencies.get(name)
+            if dependency:
+                return dependency
+            node = self.nodes[name]
+            if node is None:
+                dependency = Dependency(name)
+                missing[name] = dependency
+            elif isinstance(node, Dependency):
+                dependency = node
             else:
-                try:
-                    depend_rules = RulesHandler(self.config, name)
-                    dependency = RulesDependency(depend_rules, name, version)
-                    self.dependencies[name] = dependency
-                    cur_deps = self.analyse_rules(depend_rules,
-                                                  self.dependency_fields)
-                    dependency.add_dependencies(cur_deps)
-                except RulesError, e:
-                    self.log.error("Error while loading dependency '%s': %s" % \
-                                   (name, e))
-                    dependency = Dependency(name)
-                    self.missing[name] = dependency
-                    self.dependencies[name] = dependency
-            dependencies.append(dependency)
-        return dependencies
+                dependency = RulesDependency(node["handler"], name, version)
+                order.append(dependency)
+            dependencies[name] = dependency
+            return dependency
+
+        def get_children(node, node_fields):
+            children = []
+            for field in node_fields:
+                for (name, version) in node[field]:
+                    children.append(get_dependency(name, version))
+            return children
+
+        result = get_children(self.root, root_fields)
+        # order grows while the dependencies of the rules are added
+        for dependency in order:
+            node = self.nodes[dependency.get_name()]
+            dependency.add_dependencies(get_children(node, fields))
+        self.graphs[key] = (result, missing)
+        return (result, missing)
+
+
+class DependencyAnalyser(object):
+
+    dependency_field = "depends"
+    dependency_fields = ["depends"]
+
+    def __init__(self, config, rules, resolver=None):
+        self.config = config
+        self.rules = rules
+        self.missing = dict()
+        if not resolver:
+            resolver = DependencyResolver(config, rules)
+        self.resolver = resolver
+        self.log = kaizen.logging.getLogger(self)
 
     def analyse(self):
-        return self.analyse_rules(self.rules, [self.dependency_field])
+        (dependencies, self.missing) = self.resolver.get_dependencies(
+                [self.dependency_field], self.dependency_fields)
+        return dependencies
 
     def get_missing(self):
         return self.missing
@@ -176,14 +286,14 @@ class SystemProvider(object):
             filename = self.config.get("system")
         if not filename or not os.path.isfile(filename):
             self.log.debug("no config file found for system povided "\
-                           "dependencies. Config file %r will be created" % \
+                           "dependencies. Config file %r will be created",
                            filename)
         else:
-            self.log.debug("Reading system provide file %s" % filename)
+            self.log.debug("Reading system provide file %s", filename)
             self.configparser.read(filename)
         if not self.configparser.has_section("provides"):
             self.log.debug("system config file '%s' has to provides section. "\
-                           "Section will be created." % filename)
+                           "Section will be created.", filename)
             self.configparser.add_section("provides")
 
     def provides(self, name):
@@ -226,24 +336,115 @@ class SystemProvider(object):
 
 
 class DependencyEvaluator(object):
+    """
+    Sorts dependencies topologically
+
+    The dependency graph is converted into adjacency lists of integer ids and
+    sorted with Kahn's algorithm. Therefore sorting takes linear time and
+    doesn't recurse. Cycles are reported with their full path. A dependency is
+    always listed before the dependencies requiring it. Dependencies with the
+    same name are evaluated only once.
+
+    The dependencies are grouped into levels. All dependencies of a level
+    only depend on dependencies of lower levels and can be installed in
+    parallel.
+    """
 
     def __init__(self, dependencies):
         self.dependencies = dependencies
-        self.knowndeps = dict()
-        self.deps = []
-
-    def _evaluate_dependencies(self, dependencies):
-        for dependency in dependencies:
-            if not dependency.has_dependencies():
-                if not dependency.get_name() in self.knowndeps:
-                    self.deps.append(dependency)
-                    self.knowndeps[dependency.get_name()] = dependency
-            else:
-                self._evaluate_dependencies(dependency.get_dependencies())
-                if not dependency.get_name() in self.knowndeps:
-                    self.deps.append(dependency)
-                    self.knowndeps[dependency.get_name()] = dependency
+        self.deps = None
+        self.levels = None
+
+    def _build_graph(self):
+        """ Returns the nodes in depth first post order and their children """
+        nodes = []
+        ids = dict()
+        children = []
+        postorder = []
+
+        def add_node(dependency):
+            id = len(nodes)
+            ids[dependency.get_name()] = id
+            nodes.append(dependency)
+            children.append([])
+            return id
+
+        for root in self.dependencies:
+            if root.get_name() in ids:
+                continue
+            stack = [(add_node(root), 0)]
+            while stack:
+                (id, index) = stack[-1]
+                dependencies = nodes[id].get_dependencies()
+                if index == len(dependencies):
+                    stack.pop()
+                    postorder.append(id)
+                    continue
+                stack[-1] = (id, index + 1)
+                name = dependencies[index].get_name()
+                child = ids.get(name)
+                if child is None:
+                    child = add_node(dependencies[index])
+                    stack.append((child, 0))
+                children[id].append(child)
+        # remove duplicate edges
+        for (id, child_ids) in enumerate(children):
+            if len(child_ids) > 1:
+                seen = set()
+                children[id] = [child for child in child_ids if not (child in
+                                seen or seen.add(child))]
+        return (nodes, children, postorder)
+
+    def _find_cycle(self, nodes, children, pending):
+        # each unsorted node has at least one unsorted child. Following
+        # these children from the first found node must end in a cycle.
+        start = [id for id in range(len(nodes)) if pending[id]][0]
+        path = [start]
+        positions = {start: 0}
+        while True:
+            id = [child for child in children[path[-1]] if pending[child]][0]
+            if id in positions:
+                return [nodes[i].get_name() for i in path[positions[id]:]] + \
+                       [nodes[id].get_name()]
+            positions[id] = len(path)
+            path.append(id)
+
+    def _evaluate(self):
+        (nodes, children, postorder) = self._build_graph()
+        parents = [[] for id in nodes]
+        pending = [len(ids) for ids in children]
+        for (id, ids) in enumerate(children):
+            for child in ids:
+                parents[child].append(id)
+
+        level = [0] * len(nodes)
+        ready = [id for id in postorder if not pending[id]]
+        for id in ready:
+            for parent in parents[id]:
+                level[parent] = max(level[parent], level[id] + 1)
+                pending[parent] -= 1
+                if not pending[parent]:
+                    ready.append(parent)
+
+        if len(ready) < len(nodes):
+            raise CyclicDependencies(self._find_cycle(nodes, children,
+                                                      pending))
+
+        levels = [[] for i in range(max(level) + 1 if level else 0)]
+        for id in postorder:
+            levels[level[id]].append(nodes[id])
+        return ([nodes[id] for id in postorder], levels)
+
+    def get_levels(self):
+        """ Returns a list of lists of dependencies grouped by level """
+        if self.levels is None:
+            (self.deps, self.levels) = self._evaluate()
+        return self.levels
 
     def list(self):
-        self._evaluate_dependencies(self.dependencies)
+        """ Returns all dependencies in install order
+
+        The order is the depth first post order of the dependencies.
+        """
+        self.get_levels()
         return self.deps
@@ -24,24 +24,51 @@ import shutil
 
 import kaizen.logging
 
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, select
 
 from kaizen.db.db import Db
-from kaizen.db.objects import File, Directory, RulesPhase, InstallDirectories
+from kaizen.db.objects import File, Directory, RulesPhase, \
+                              InstallDirectories, Activation, DirectoryLink
 from kaizen.phase.phase import phases_list, DOWNLOADED, EXTRACTED, PATCHED, \
                             CONFIGURED, BUILT, DESTROOTED, ACTIVATED
 from kaizen.phase.sequence import DOWNLOAD, EXTRACT, PATCH, CONFIGURE, BUILD, \
                                DESTROOT, ACTIVATE, DEACTIVATE, DELETE_SOURCE, \
                                DELETE_DOWNLOAD, DELETE_BUILD, DELETE_DESTROOT, \
                                UNPATCH, DISTCLEAN, SetSequence, UnSetSequence
+from kaizen.rules.index import RulesIndex
 from kaizen.rules.loader import RulesLoader
+from kaizen.rules.rules import Rules
 from kaizen.rules.error import RulesError
+from kaizen.rules.groups import Group
 from kaizen.rules.validator import RulesValidator
+from kaizen.system.activate import ActivationPlan, RollbackLog, SYMLINK, \
+                                   LINK_MIN_DEPTH, check_strategy, \
+                                   get_all_directories, in_directories, \
+                                   is_clone
+from kaizen.system.cache import SourceCache
 from kaizen.utils import real_path, list_dir, list_subdir
 from kaizen.utils.signals import Signal
 
 
 class RulesHandler(object):
+    """ Handles the phases of a rules
+
+    The handler is initialised lazily. The rules module is only imported, the
+    sequences and directories are only set up and the database is only
+    queried or changed when they are used first. Therefore read-only queries
+    like get_installed_files are cheap.
+    """
+
+    # attributes which are set up on first access by the named method
+    _lazy_attributes = dict(
+        [(name, "_init_directories") for name in ["download_cache_dir",
+         "cache_dir", "destroot_dir", "data_dir", "src_dir", "build_dir",
+         "dest_dir"]] +
+        [(name, "_init_sequences") for name in ["sequences", "download_seq",
+         "extract_seq", "patch_seq", "configure_seq", "build_seq",
+         "destroot_seq", "activate_seq", "deactivate_seq",
+         "delete_destroot_seq", "delete_build_seq", "distclean_seq",
+         "unpatch_seq", "delete_source_seq", "delete_download_seq"]])
 
     def __init__(self, config, rules_name, dist_version=None, force=False):
         self.log = kaizen.logging.getLogger(self)
@@ -51,19 +78,44 @@ class RulesHandler(object):
         self.db = Db(config)
         self._rules_class = None
         self._rules = None
+        self._rules_dist_version = dist_version
+        self._install_directories = None
+        self._phases = None
 
-        self.install_directories = None
-
-        if not dist_version:
-            # if version is not provided use version from current rules
-            self.rules_dist_version = self.rules_class.get_dist_version()
-        else:
-            self.rules_dist_version = dist_version
-        self._init_directories()
         self._init_signals()
-        self._init_sequences()
-        self._load_install_directories()
-        self._load_phases()
+
+    def __getattr__(self, name):
+        # only called if the attribute isn't set up yet
+        init = self._lazy_attributes.get(name)
+        if not init:
+            raise AttributeError("%r object has no attribute %r" %
+                                 (self.__class__.__name__, name))
+        getattr(self, init)()
+        return self.__dict__[name]
+
+    @property
+    def rules_dist_version(self):
+        if not self._rules_dist_version:
+            # if version is not provided use version from current rules. The
+            # index avoids importing the rules module.
+            dist_version = RulesIndex(self.config).get_dist_version(
+                                                            self.rules_name)
+            if not dist_version:
+                dist_version = self.rules_class.get_dist_version()
+            self._rules_dist_version = dist_version
+        return self._rules_dist_version
+
+    @property
+    def install_directories(self):
+        if not self._install_directories:
+            self._load_install_directories()
+        return self._install_directories
+
+    @property
+    def phases(self):
+        if self._phases is None:
+            self._load_phases()
+        return self._phases
 
     @property
     def rules_class(self):
@@ -88,7 +140,7 @@ class RulesHandler(object):
         return rules
 
     def _init_rules(self):
-        self.log.debug("Init rules %r" % self.rules_name)
+        self.log.debug("Init rules %r", self.rules_name)
         rules = self.rules_class
         validator = RulesValidator()
         if not validator.validate(rules):
@@ -98,23 +150,37 @@ class RulesHandler(object):
                                "\n".join(validator.errors)))
         return rules(self.config, self.src_dir, self.build_dir, self.dest_dir)
 
+    def _query_install_directories(self):
+        with self.db.lock:
+            query = self.db.session.query(InstallDirectories).filter(and_( \
+                    InstallDirectories.rules == self.rules_name,
+                    InstallDirectories.version == self.rules_dist_version))
+            return query.first()
+
     def _load_install_directories(self):
-        if self.install_directories:
+        if self._install_directories:
             return
-        query = self.db.session.query(InstallDirectories).filter(and_( \
-                InstallDirectories.rules == self.rules_name,
-                InstallDirectories.version == self.rules_dist_version))
-        install_directories = query.first()
-        if not install_directories:
-            install_directories = InstallDirectories(self.rules_name,
-                                                     self.rules_dist_version)
-            self.db.session.add(install_directories)
+        with self.db.lock:
+            install_directories = self._query_install_directories()
+            if not install_directories:
+                install_directories = InstallDirectories(self.rules_name,
+                                                        self.rules_dist_version)
+                self.db.session.add(install_directories)
+                self.db.session.commit()
+        self._install_directories = install_directories
+
+    def _get_install_directory(self, name):
+        # reading may refresh the expired instance with a query of the shared
+        # session
+        with self.db.lock:
+            return getattr(self.install_directories, name)
+
+    def _update_install_directories(self, **values):
+        with self.db.lock:
+            for (name, value) in values.items():
+                setattr(self.install_directories, name, value)
+            self.db.session.add(self.install_directories)
             self.db.session.commit()
-        self.install_directories = install_directories
-
-    def _update_install_directories(self):
-        self.db.session.add(self.install_directories)
-        self.db.session.commit()
 
     def _init_directories(self):
         version = self.rules_dist_version
@@ -241,6 +307,16 @@ class RulesHandler(object):
             method = getattr(group, methodname)
             method()
 
+    def _overrides_pre_activate(self):
+        """ Returns True if the rules or one of its groups implements
+        pre_activate """
+        if self.rules.pre_activate.im_func is not Rules.pre_activate.im_func:
+            return True
+        for group in self.rules._groups:
+            if group.pre_activate.im_func is not Group.pre_activate.im_func:
+                return True
+        return False
+
     def _get_download(self, file, dir):
         if isinstance(file, list):
             file_source = file[0]
@@ -250,64 +326,265 @@ class RulesHandler(object):
             file_dest = dir
         return file_source, file_dest
 
-    def _check_installed_files(self, files):
-        query = self.db.session.query(File).filter(and_(File.filename.in_(
-                                      [x for (x, y) in files]),
-                                       File.rules != self.rules_name))
-        if query.count():
+    def _check_installed_files(self, filenames):
+        """ Logs all files which are already installed by a different rules
+
+        The filenames are inserted into a temporary table and joined with the
+        files table. This avoids sqlite's limit of variables per query and
+        needs only one select.
+        """
+        if not filenames:
+            return []
+        tables = self.db.tables
+        files_table = tables.files_table
+        activate_table = tables.activate_files_table
+        connection = self.db.session.connection()
+        activate_table.create(connection, checkfirst=True)
+        try:
+            connection.execute(activate_table.delete())
+            connection.execute(activate_table.insert(),
+                               [{"filename": filename} for filename in
+                                filenames])
+            query = select([files_table.c.filename, files_table.c.rules],
+                           and_(files_table.c.filename ==
+                                activate_table.c.filename,
+                                files_table.c.rules != self.rules_name))
+            conflicts = connection.execute(query).fetchall()
+        finally:
+            activate_table.drop(connection)
+        if conflicts:
             self.log.error("The following files are already installed by a " \
                            "different rules:")
-            for file in query:
-                self.log.error("Rules: '%s', Filename: '%s'" % (file.rules,
-                                                                 file.filename))
-                return
+            for (filename, rules) in conflicts:
+                self.log.error("Rules: '%s', Filename: '%s'", rules,
+                               filename)
+        return conflicts
+
+    def _is_shared_directory(self, directory):
+        """ Returns True if another rules has installed a file or directory
+        at or below directory
+        """
+        tables = self.db.tables
+        connection = self.db.session.connection()
+        # all paths below directory are in this range. "0" follows "/".
+        # Comparing the primary key with a range uses its index.
+        start = directory + "/"
+        end = directory + "0"
+        for column in [tables.files_table.c.filename,
+                       tables.dirs_table.c.directory]:
+            rules = column.table.c.rules
+            query = select([column], and_(or_(column == directory,
+                                              and_(column > start,
+                                                   column < end)),
+                                          rules != self.rules_name)).limit(1)
+            if connection.execute(query).first():
+                return True
+        return False
+
+    def _get_linked_directories(self, dirs, files):
+        """ Returns the set of the topmost directories of the destroot
+        which can be activated as one symlink
+
+        A directory is linked if it is named after the rules e.g. share/doc/foo
+        or include/foo-1.0 for rules foo, it doesn't exist in the prefix yet,
+        no other rules has installed anything below it and it is at least
+        LINK_MIN_DEPTH levels below the prefix. Shared directories like
+        share/info or lib/pkgconfig must stay real directories. Otherwise files
+        written into them later would end up in the destroot of the rules.
+        """
+        prefix = self.config.get("prefix")
+        linked_dirs = set()
+        # parent directories are sorted before their subdirectories
+        for subdir in sorted(get_all_directories(dirs, files)):
+            if in_directories(os.path.dirname(subdir), linked_dirs):
+                continue
+            name = os.path.basename(subdir)
+            if name != self.rules_name and \
+                    not name.startswith(self.rules_name + "-"):
+                continue
+            dir = os.path.join("/", subdir)
+            relative_dir = os.path.relpath(dir, prefix)
+            if relative_dir.startswith(os.pardir) or \
+                    relative_dir.count(os.sep) + 1 < LINK_MIN_DEPTH:
+                continue
+            if os.path.lexists(dir) or self._is_shared_directory(dir):
+                continue
+            self.log.debug("Linking directory '%s'", dir)
+            linked_dirs.add(subdir)
+        return linked_dirs
+
+    def _link_directories(self, dirs, files, linked_dirs):
+        """ Replaces the files and directories below linked_dirs by the
+        linked directories
+
+        Returns the (dirs, files) to activate and to record in db. The linked
+        directories are activated like files and their parent directories are
+        recorded to be deleted at deactivation if empty.
+        """
+        new_dirs = set([subdir for subdir in dirs if not
+                        in_directories(subdir, linked_dirs)])
+        new_dirs.update([os.path.dirname(subdir) for subdir in linked_dirs])
+        new_files = [file for file in files if not
+                     in_directories(os.path.dirname(file), linked_dirs)]
+        new_files.extend(linked_dirs)
+        return (sorted(new_dirs), new_files)
+
+    def _unfold_directories(self, dirs, files, rollback_log):
+        """ Unfolds the directory links of other rules which contain
+        directories or files of this rules
+        """
+        links = self.db.session.query(DirectoryLink).filter(
+                DirectoryLink.rules != self.rules_name).all()
+        if not links:
+            return
+        paths = set([os.path.join("/", path) for path in
+                     get_all_directories(dirs, files)])
+        for link in links:
+            if link.directory in paths:
+                self._unfold_directory(link, rollback_log)
+
+    def _unfold_directory(self, link, rollback_log):
+        """ Replaces the directory link of another rules by a directory with
+        symlinks to each of its files
+        """
+        directory = link.directory
+        self.log.info("Unfolding directory '%s' of rules %r", directory,
+                      link.rules)
+        if os.path.islink(directory):
+            target = os.readlink(directory)
+            (dirs, files) = list_subdir(target)
+            rollback_log.add_replaced(directory, target)
+            os.remove(directory)
+            ActivationPlan([(os.path.join(directory, file),
+                             os.path.join(target, file)) for file in files],
+                           directories=[directory] +
+                           [os.path.join(directory, subdir) for subdir in
+                            dirs]).run(rollback_log,
+                                       self.config.get("activatejobs"))
+            tables = self.db.tables
+            self.db.session.execute(
+                    tables.dirs_table.insert().prefix_with("OR REPLACE"),
+                    [{"directory": dir, "rules": link.rules} for dir in
+                     [directory] + [os.path.join(directory, subdir) for
+                                    subdir in dirs]])
+            if files:
+                self.db.session.execute(
+                        tables.files_table.insert().prefix_with("OR REPLACE"),
+                        [{"filename": os.path.join(directory, file),
+                          "rules": link.rules} for file in files])
+        else:
+            self.log.warn("Directory link '%s' of rules %r doesn't exist "
+                          "anymore", directory, link.rules)
+        # the link has been replaced. Its file and directory link rows are
+        # deleted right away so that later activations don't unfold it again.
+        self.db.session.query(File).filter(File.filename ==
+                directory).delete(synchronize_session=False)
+        self.db.session.query(DirectoryLink).filter(DirectoryLink.directory ==
+                directory).delete(synchronize_session=False)
+        self.db.session.expunge(link)
+
+    def _query_phases(self):
+        with self.db.lock:
+            phases = self.db.session.query(RulesPhase).filter(
+                                                and_(RulesPhase.rules ==
+                                                     self.rules_name,
+                                                RulesPhase.version ==
+                                                self.rules_dist_version)
+                                                ).all()
+            return [phase.phase for phase in phases]
 
     def _load_phases(self):
-        phases = self.db.session.query(RulesPhase).filter(
-                                            and_(RulesPhase.rules ==
-                                                 self.rules_name,
-                                            RulesPhase.version ==
-                                            self.rules_dist_version)
-                                            ).all()
-        self.phases = [phase.phase for phase in phases]
+        self._phases = self._query_phases()
+
+    def _check_phases(self):
+        """ Compares the cached phases with the phases in the database
+
+        Only used if checkphases is enabled in the config. On a mismatch an
+        error is logged and the phases from the database are used.
+        """
+        phases = self._query_phases()
+        if set(phases) != set(self.phases):
+            self.log.error("Cached phases %r of rules %r differ from the "
+                           "phases %r in the database", self.phases,
+                           self.rules_name, phases)
+            self._phases = phases
 
     def get_phases(self):
         return self.phases
 
     def set_phase(self, phase):
-        rulesphase = RulesPhase(self.rules_name,
-                                    self.rules_dist_version, phase)
-        rulesphase = self.db.session.merge(rulesphase)
-        self.db.session.commit()
-        self._load_phases()
+        # the phases are cached in self.phases. Only write the change to the
+        # database instead of querying all phases again.
+        table = self.db.tables.phases_table
+        with self.db.lock:
+            self.db.session.execute(table.insert().prefix_with("OR IGNORE"),
+                                    {"rules": self.rules_name,
+                                     "version": self.rules_dist_version,
+                                     "phase": phase})
+            self.db.session.commit()
+        if phase not in self.phases:
+            self.phases.append(phase)
+        if self.config.get("checkphases"):
+            self._check_phases()
 
     def unset_phase(self, phase):
         if phase in self.phases:
-            self.db.session.query(RulesPhase).filter(
-                    and_(RulesPhase.rules == self.rules_name,
-                    RulesPhase.version == self.rules_dist_version,
-                    RulesPhase.phase == phase)).delete()
-            self.db.session.commit()
-            self._load_phases()
+            with self.db.lock:
+                self.db.session.query(RulesPhase).filter(
+                        and_(RulesPhase.rules == self.rules_name,
+                        RulesPhase.version == self.rules_dist_version,
+                        RulesPhase.phase == phase)).delete(
+                                synchronize_session=False)
+                self.db.session.commit()
+            self.phases.remove(phase)
+            if self.config.get("checkphases"):
+                self._check_phases()
+
+    def get_download_file(self):
+        with self.db.lock:
+            if self._install_directories:
+                install_directories = self._install_directories
+            else:
+                # don't insert the install directories for a query
+                install_directories = self._query_install_directories()
+                if not install_directories:
+                    return None
+            return install_directories.download
 
     def get_installed_files(self):
-        query = self.db.session.query(File).filter(File.rules ==
-                                                   self.rules_name)
-        return query.all()
-
-    def build_depends(self):
+        with self.db.lock:
+            query = self.db.session.query(File).filter(File.rules ==
+                                                       self.rules_name)
+            return query.all()
+
+    def get_installed_filenames(self, batch_size=1000):
+        """ Returns an iterator over the filenames of all installed files
+
+        Only the filename column is queried and the rows are fetched in
+        batches of batch_size.
+        """
+        query = self.db.session.query(File.filename).filter(File.rules ==
+                                                            self.rules_name)
+        for (filename,) in query.yield_per(batch_size):
+            yield filename
+
+    def build_depends(self, resolver=None):
         from kaizen.rules.depend import DependencyAnalyser
-        return DependencyAnalyser(self.config, self).analyse()
+        return DependencyAnalyser(self.config, self, resolver).analyse()
 
-    def runtime_depends(self):
+    def runtime_depends(self, resolver=None):
         from kaizen.rules.depend import RuntimeDependencyAnalyser
-        return RuntimeDependencyAnalyser(self.config, self).analyse()
+        return RuntimeDependencyAnalyser(self.config, self,
+                                         resolver).analyse()
 
     def depends(self):
-        return (self.build_depends(), self.runtime_depends())
+        from kaizen.rules.depend import DependencyResolver
+        # resolve the build and runtime dependencies in one traversal
+        resolver = DependencyResolver(self.config, self)
+        return (self.build_depends(resolver), self.runtime_depends(resolver))
 
     def patch(self):
-        self.log.info("Patching rules %r" % self.rules_name)
+        self.log.info("Patching rules %r", self.rules_name)
         self._groups_call("pre_patch")
         self.rules.pre_patch()
         patchsys = self.rules.patch_cmd(self.rules.src_path,
@@ -318,17 +595,17 @@ class RulesHandler(object):
         self.rules.post_patch()
 
     def unpatch(self):
-        self.log.info("Unpatching rules %r" % self.rules_name)
+        self.log.info("Unpatching rules %r", self.rules_name)
         patchsys = self.rules.patch_cmd(self.rules.src_path,
                 self.rules.patch_path, self.rules.patches,
                 self.config.get("verbose"))
         patchsys.unapply()
 
     def delete_destroot(self):
-        self.log.info("Deleting destroot of rules %r" % self.rules_name)
-        dest_dir = self.install_directories.destroot
+        self.log.info("Deleting destroot of rules %r", self.rules_name)
+        dest_dir = self._get_install_directory("destroot")
         if dest_dir and os.path.exists(dest_dir):
-            self.log.debug("Deleting destroot directory '%s'" % dest_dir)
+            self.log.debug("Deleting destroot directory '%s'", dest_dir)
             shutil.rmtree(dest_dir)
 
         current_dir = os.path.join(self.destroot_dir, "current")
@@ -340,53 +617,66 @@ class RulesHandler(object):
         #    os.remove(self.destroot_dir)
 
     def delete_build(self):
-        self.log.info("Deleting build of rules %r" % self.rules_name)
-        build_dir = self.install_directories.build
+        self.log.info("Deleting build of rules %r", self.rules_name)
+        build_dir = self._get_install_directory("build")
         if build_dir and os.path.exists(build_dir):
-            self.log.debug("Deleting build directory '%s'" % build_dir)
+            self.log.debug("Deleting build directory '%s'", build_dir)
             shutil.rmtree(build_dir)
 
     def delete_source(self):
-        self.log.info("Deleting source of rules %r" % self.rules_name)
-        src_dir = self.install_directories.source
+        self.log.info("Deleting source of rules %r", self.rules_name)
+        src_dir = self._get_install_directory("source")
         if src_dir and os.path.exists(src_dir):
-            self.log.debug("Deleting source directory '%s'" % src_dir)
+            self.log.debug("Deleting source directory '%s'", src_dir)
             shutil.rmtree(src_dir)
 
     def delete_download(self):
-        self.log.info("Delete download of rules %r" % self.rules_name)
-        download = self.install_directories.download
+        self.log.info("Delete download of rules %r", self.rules_name)
+        download = self._get_install_directory("download")
         if download and os.path.exists(download):
-            self.log.debug("Deleting download file '%s'" % download)
+            self.log.debug("Deleting download file '%s'", download)
             os.remove(download)
         if os.path.exists(self.data_dir) and not os.listdir(self.data_dir):
-            self.log.debug("Deleting download directory '%s'" % self.data_dir)
+            self.log.debug("Deleting download directory '%s'", self.data_dir)
             os.rmdir(self.data_dir)
 
     def download(self):
-        self.log.info("Download of rules %r" % self.rules_name)
+        self.log.info("Download of rules %r", self.rules_name)
         if not os.path.exists(self.data_dir):
-            self.log.debug("Creating download directory %r" % self.data_dir)
+            self.log.debug("Creating download directory %r", self.data_dir)
             os.makedirs(self.data_dir)
         if self.rules.url and self.rules.download_cmd:
-            self.log.info("Copying source file from '%s'." % self.rules.url)
+            self.log.info("Copying source file from '%s'.", self.rules.url)
             (archive_source, archive_dest) = self._get_download(self.rules.url,
                                                                 self.data_dir)
             dl = self.rules.download_cmd(self.rules, archive_source)
             download_file = dl.copy(archive_dest, self.force)
             dl.verify(self.rules.hash)
-            self.install_directories.download = real_path(download_file)
-            self.db.session.add(self.install_directories)
-            self.db.session.commit()
+            self._update_install_directories(
+                    download=real_path(download_file))
 
     def activate(self):
-        self.log.info("Activation of rules %r" % self.rules_name)
+        # activation changes files in the shared prefix. Therefore only one
+        # rules may be activated at a time.
+        with self.db.lock:
+            return self._activate()
+
+    def _activate(self):
+        self.log.info("Activation of rules %r", self.rules_name)
 
         if self.is_activated():
-            self.log.debug("Rules %r is already activated" % \
+            self.log.debug("Rules %r is already activated",
                            self.rules_name)
             return self.already_activated()
 
+        strategy = self.get_activation_strategy()
+        rollback_log = RollbackLog(os.path.join(self.destroot_dir,
+                                                "activate.log"))
+        if rollback_log.exists():
+            self.log.warn("Undoing previous incomplete activation of rules "
+                          "%r", self.rules_name)
+            rollback_log.rollback()
+
         current_dir = os.path.join(self.destroot_dir, "current")
 
         # lexists -> returns True also for broken links
@@ -394,102 +684,168 @@ class RulesHandler(object):
             os.remove(current_dir)
         os.symlink(self.dest_dir, current_dir)
 
-        (dirs, files) = list_subdir(self.dest_dir)
-        # create necessary directories and run pre_activate
-        # in pre_activate a rules may create directories, files, etc.
-        for subdir in dirs:
-            dir = os.path.join("/", subdir)
-            if not os.path.exists(dir):
-                os.makedirs(dir)
-                self.log.debug("Creating directory '%s'" % dir)
-
-        self.log.debug("Running pre-activate")
-        self._groups_call("pre_activate")
-        self.rules.pre_activate()
-
-        (dirs, files) = list_subdir(self.dest_dir)
-        activate_files = []
-        check_files = []
-        i = 0
-        for file in files:
-            file_path = os.path.join("/", file)
-            destdir_file_path = os.path.join(current_dir, file)
-            check_files.append((file_path, destdir_file_path))
-            # sqlite has a limit for max variables in a sql query
-            # therefore split this up in several queries
-            i += 1
-            if i > 100:
-                i = 0
-                self._check_installed_files(check_files)
-                activate_files.extend(check_files)
-                check_files = []
-
-        if check_files:
-            self._check_installed_files(check_files)
-            activate_files.extend(check_files)
-
-        # record created directories in db
-        for subdir in dirs:
-            dir = os.path.join("/", subdir)
-            dbdir = Directory(self.rules_name, dir)
-            dbdir = self.db.session.merge(dbdir)
-            self.db.session.add(dbdir)
-        self.db.session.commit()
-
-        # create symlinks and record installed files in db
-        for (file_path, destdir_file_path) in activate_files:
-            self.log.debug("Activating '%s' from '%s'" % (file_path,
-                           destdir_file_path))
-            if os.path.lexists(file_path):
-                os.remove(file_path)
-            os.symlink(destdir_file_path, file_path)
-            dbfile = File(file_path, self.rules_name)
-            dbfile = self.db.session.merge(dbfile)
-            self.db.session.add(dbfile)
-        self.db.session.commit()
+        # unfolding directory links of other rules and creating the files
+        # change the prefix. Both are recorded in the rollback log and the
+        # created directories, installed files and directory links are
+        # recorded in db in a single transaction with one executemany per
+        # table. Existing rows are replaced like a merge would do. If
+        # anything fails the changes are undone.
+        try:
+            (dirs, files) = list_subdir(self.dest_dir)
+            self._unfold_directories(dirs, files, rollback_log)
+            linked_dirs = set()
+            if strategy == SYMLINK and self.config.get("linkdirectories"):
+                linked_dirs = self._get_linked_directories(dirs, files)
+
+            # create necessary directories and run pre_activate
+            # in pre_activate a rules may create directories, files, etc.
+            ActivationPlan([], directories=[os.path.join("/", subdir) for
+                                            subdir in dirs if not
+                                            in_directories(subdir,
+                                                           linked_dirs)]
+                           ).create_directories(rollback_log)
+
+            self.log.debug("Running pre-activate")
+            self._groups_call("pre_activate")
+            self.rules.pre_activate()
+
+            # the destroot has to be scanned again only if pre_activate may
+            # have changed it
+            if self._overrides_pre_activate():
+                (dirs, files) = list_subdir(self.dest_dir)
+                self._unfold_directories(dirs, files, rollback_log)
+                linked_dirs = set([subdir for subdir in linked_dirs if
+                                   os.path.isdir(os.path.join(self.dest_dir,
+                                                              subdir)) and
+                                   not os.path.lexists(os.path.join("/",
+                                                                subdir))])
+            if linked_dirs:
+                (dirs, files) = self._link_directories(dirs, files,
+                                                       linked_dirs)
+
+            # clones are created from the destroot directly. Symlinks point
+            # to the current symlink of the rules.
+            if strategy == SYMLINK:
+                source_dir = current_dir
+            else:
+                source_dir = self.dest_dir
+            activate_files = [(os.path.join("/", file),
+                               os.path.join(source_dir, file)) for file in
+                              files]
+            self._check_installed_files([file_path for (file_path,
+                                         destdir_file_path) in
+                                         activate_files])
+
+            ActivationPlan(activate_files, strategy).run(rollback_log,
+                    self.config.get("activatejobs"))
+            tables = self.db.tables
+            self.db.session.merge(Activation(self.rules_name, strategy,
+                                             self.dest_dir))
+            if linked_dirs:
+                self.db.session.execute(
+                        tables.directory_links_table.insert().prefix_with(
+                            "OR REPLACE"),
+                        [{"directory": os.path.join("/", subdir),
+                          "rules": self.rules_name} for subdir in
+                         linked_dirs])
+            if dirs:
+                self.db.session.execute(
+                        tables.dirs_table.insert().prefix_with("OR REPLACE"),
+                        [{"directory": os.path.join("/", subdir),
+                          "rules": self.rules_name} for subdir in dirs])
+            if activate_files:
+                self.db.session.execute(
+                        tables.files_table.insert().prefix_with("OR REPLACE"),
+                        [{"filename": file_path, "rules": self.rules_name} for
+                         (file_path, destdir_file_path) in activate_files])
+            self.db.session.commit()
+        except:
+            self.db.session.rollback()
+            rollback_log.rollback()
+            raise
+        rollback_log.remove()
         self.log.debug("Running post-activate")
         self.rules.post_activate()
         self._groups_call("post_activate")
 
     def deactivate(self):
-        self.log.info("Deactivation of rules %r" % self.rules_name)
+        with self.db.lock:
+            return self._deactivate()
+
+    def _deactivate(self):
+        self.log.info("Deactivation of rules %r", self.rules_name)
         if not self.is_activated():
             self.log.warn("'%s' is not recognized as active but should be" \
                           " deactivated. Either deactivation was forced or"\
-                          " the database may be currupted" % self.rules_name)
+                          " the database may be currupted", self.rules_name)
 
         self.log.debug("Running pre-deactivate")
         self._groups_call("pre_deactivate")
         self.rules.pre_deactivate()
 
-        # delete activated files
-        for file in self.get_installed_files():
-            file_path = file.filename
-            if os.path.lexists(file_path):
-                self.log.debug("Deactivating '%s'" % file_path)
+        # delete activated files. Only the filenames are loaded in batches
+        # and all rows are deleted with one statement afterwards. A file
+        # activated as symlink which isn't a symlink anymore and a hardlink or
+        # reflink which isn't a clone of its source in the activated destroot
+        # anymore have been replaced or modified by someone else and are
+        # kept. If the source doesn't exist anymore the file is removed.
+        activation = self.db.session.query(Activation).get(self.rules_name)
+        source_dir = self.dest_dir
+        if activation:
+            strategy = activation.strategy
+            if activation.source:
+                source_dir = activation.source
+        else:
+            strategy = SYMLINK
+        for file_path in self.get_installed_filenames():
+            if strategy == SYMLINK and os.path.exists(file_path) and \
+                    not os.path.islink(file_path):
+                self.log.warn("File '%s' isn't deactivated because it has "\
+                              "been replaced", file_path)
+            elif strategy != SYMLINK and os.path.lexists(file_path) and \
+                    os.path.lexists(source_dir + file_path) and \
+                    not is_clone(file_path, source_dir + file_path):
+                self.log.warn("File '%s' isn't deactivated because it has "\
+                              "been modified", file_path)
+            elif os.path.lexists(file_path):
+                self.log.debug("Deactivating '%s'", file_path)
                 os.remove(file_path)
             else:
                 self.log.warn("File '%s' couldn't be deactivated because it "\
-                              "doesn't exist anymore" % file_path)
-            self.db.session.delete(file)
-        self.db.session.commit()
-
-        # delete empty directories
-        query = self.db.session.query(Directory).filter(Directory.rules ==
-                                                        self.rules_name)
-        for directory in query.all():
-            dir = directory.directory
+                              "doesn't exist anymore", file_path)
+        self.db.session.query(File).filter(File.rules ==
+                self.rules_name).delete(synchronize_session=False)
+        self.db.session.query(DirectoryLink).filter(DirectoryLink.rules ==
+                self.rules_name).delete(synchronize_session=False)
+        if activation:
+            self.db.session.delete(activation)
+
+        # delete empty directories. Deepest directories first so that a
+        # parent directory is already empty when it is checked.
+        query = self.db.session.query(Directory.directory).filter(
+                Directory.rules == self.rules_name)
+        dirs = [directory for (directory,) in query]
+        dirs.sort(key=lambda dir: dir.count(os.sep), reverse=True)
+        prefix = self.config.get("prefix")
+        for dir in dirs:
             if os.path.exists(dir) and not os.listdir(dir) and not \
-                dir == self.config.get("prefix"):
+                dir == prefix:
                 os.rmdir(dir)
-                self.log.debug("Deleting directory '%s'" % dir)
-            self.db.session.delete(directory)
+                self.log.debug("Deleting directory '%s'", dir)
+        self.db.session.query(Directory).filter(Directory.rules ==
+                self.rules_name).delete(synchronize_session=False)
         self.db.session.commit()
 
         self.log.debug("Running post-deactivate")
         self.rules.post_deactivate()
         self._groups_call("post_deactivate")
 
+    def get_activation_strategy(self):
+        """ Returns the strategy for activating the files of the rules """
+        strategy = self.rules.activation or self.config.get("activation")
+        check_strategy(strategy)
+        return strategy
+
     def is_activated(self, exact=False):
         db = self.db.session
         if exact:
@@ -505,13 +861,14 @@ class RulesHandler(object):
                 RulesPhase.phase ==
                 phases_list.get("Activated")
                 ))
-        return query.count() > 0
+        with self.db.lock:
+            return query.count() > 0
 
     def configure(self):
-        self.log.info("Configuration of rules %r" % self.rules_name)
+        self.log.info("Configuration of rules %r", self.rules_name)
         build_path = self.rules.build_path
         if not os.path.exists(build_path):
-            self.log.debug("Creating build dir '%s'" % build_path)
+            self.log.debug("Creating build dir '%s'", build_path)
             os.makedirs(build_path)
         self._groups_call("pre_configure")
         self.rules.pre_configure()
@@ -520,22 +877,21 @@ class RulesHandler(object):
         self._groups_call("post_configure")
 
     def build(self):
-        self.log.info("Build rules %r" % self.rules_name)
+        self.log.info("Build rules %r", self.rules_name)
         self._groups_call("pre_build")
         self.rules.pre_build()
         self.rules.build()
         self.rules.post_build()
-        self.install_directories.build = real_path(self.rules.build_path)
-        self._update_install_directories()
+        self._update_install_directories(
+                build=real_path(self.rules.build_path))
         self._groups_call("post_build")
 
     def destroot(self):
-        self.log.info("Destrooting rules %r" % self.rules_name)
+        self.log.info("Destrooting rules %r", self.rules_name)
         if not os.path.exists(self.dest_dir):
-            self.log.debug("Creating destroot dir '%s'" % self.dest_dir)
+            self.log.debug("Creating destroot dir '%s'", self.dest_dir)
             os.makedirs(self.dest_dir)
-        self.install_directories.destroot = self.dest_dir
-        self._update_install_directories()
+        self._update_install_directories(destroot=self.dest_dir)
         self._groups_call("pre_destroot")
         self.rules.pre_destroot()
         self.rules.destroot()
@@ -543,7 +899,7 @@ class RulesHandler(object):
         self._groups_call("post_destroot")
 
     def clean(self):
-        self.log.info("Clean rules %r" % self.rules_name)
+        self.log.info("Clean rules %r", self.rules_name)
         self._groups_call("pre_clean")
         self.rules.pre_clean()
         self.rules.clean()
@@ -551,16 +907,28 @@ class RulesHandler(object):
         self._groups_call("post_clean")
 
     def distclean(self):
-        self.log.info("Distclean rules %r" % self.rules_name)
+        self.log.info("Distclean rules %r", self.rules_name)
         self.rules.distclean()
 
     def extract(self):
-        self.log.info("Extracting rules %r" % self.rules_name)
+        self.log.info("Extracting rules %r", self.rules_name)
         if self.rules.extract_cmd:
             extractor = self.rules.extract_cmd(self.rules.url)
-            extractor.extract(self.data_dir, self.src_dir)
-        self.install_directories.source = real_path(self.rules.src_path)
-        self._update_install_directories()
+            extractor.config = self.config
+            cache = None
+            key = None
+            if getattr(extractor, "cacheable", False):
+                cache = SourceCache(self.config)
+                key = cache.get_key(self.rules.hash)
+            if key and cache.restore(key, self.src_dir):
+                self.log.info("Using cached source of rules %r",
+                              self.rules_name)
+            else:
+                extractor.extract(self.data_dir, self.src_dir)
+                if key:
+                    cache.store(key, self.src_dir)
+        self._update_install_directories(
+                source=real_path(self.rules.src_path))
 
     def get_version(self):
         return self.rules_dist_version
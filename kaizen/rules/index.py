@@ -0,0 +1,268 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import json
+import os
+import os.path
+
+import kaizen.logging
+
+from kaizen.db.db import Db
+from kaizen.db.objects import RulesIndexEntry
+from kaizen.rules.loader import RulesLoader
+from kaizen.rules.validator import RulesValidator
+from kaizen.utils import real_path
+
+# variables of a rules derived from the config. They aren't stored in the
+# index but set from the current config when an entry is read.
+CONFIG_VARS = frozenset(["prefix", "rootdir", "package_path", "apps_dir",
+                         "src_dir", "build_dir", "dest_path", "src_path",
+                         "build_path", "patch_path", "configure_path"])
+
+
+class RulesIndex(object):
+    """
+    Index of the available rules stored in the kaizen database
+
+    Each entry contains the path of the rules file, the modification time of
+    the rules directory and the version, revision, depends, runtime_depends,
+    url and hash of the rules. An entry is only used if no file in the rules
+    directory has been modified since the entry has been created. Therefore
+    these values can be looked up without importing the rules module.
+
+    The url is stored unsubstituted together with the variables of the rules
+    which don't depend on the config. It is substituted with the current
+    config when the entry is read.
+
+    The index is created and refreshed by update.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.log = kaizen.logging.getLogger(self)
+        self.db = Db(config)
+        self.loader = RulesLoader(config)
+
+    def list_names(self):
+        """ Returns the names of all rules in the rules paths """
+        names = set()
+        for path in self.loader.paths:
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if os.path.isfile(os.path.join(path, name, "rules.py")):
+                    names.add(name)
+        return sorted(names)
+
+    def get_mtime(self, path):
+        """ Returns the latest modification time of the directory of the rules
+        file path and all files and directories below it
+
+        Compiled python files are ignored because they are written when the
+        rules are loaded.
+        """
+        rules_dir = os.path.dirname(path)
+        mtime = os.path.getmtime(rules_dir)
+        for (dirpath, dirnames, filenames) in os.walk(rules_dir):
+            for name in dirnames + filenames:
+                if name.endswith((".pyc", ".pyo")):
+                    continue
+                mtime = max(mtime, os.lstat(os.path.join(dirpath,
+                                                         name)).st_mtime)
+        return mtime
+
+    def _is_current(self, entry, path):
+        return entry.path == path and entry.mtime == self.get_mtime(path)
+
+    def get(self, name):
+        """ Returns a dict with the indexed values of name
+
+        Returns None if name isn't in the index or if the rules file has been
+        changed since the entry has been created.
+        """
+        with self.db.lock:
+            entry = self.db.session.query(RulesIndexEntry).get(name)
+            if not entry:
+                return None
+            values = self.get_values(entry)
+        path = self.loader.find_path(name)
+        if not path or path != values["path"] or \
+           self.get_mtime(path) != values["mtime"]:
+            self.log.debug("Index entry of rules %r is outdated", name)
+            return None
+        values["url"] = self._substitute(values["url"],
+                                         self._get_vars(values))
+        return values
+
+    def get_dist_version(self, name):
+        values = self.get(name)
+        if not values:
+            return None
+        return values["version"] + "-" + values["revision"]
+
+    def get_depends(self, name, fields):
+        """ Returns the dependencies of name listed in fields
+
+        Returns None if name has no current entry.
+        """
+        values = self.get(name)
+        if not values:
+            return None
+        depends = []
+        for field in fields:
+            for depend in values[field] or []:
+                # json doesn't know tuples
+                if isinstance(depend, list):
+                    depend = tuple(depend)
+                depends.append(depend)
+        return depends
+
+    def get_values(self, entry):
+        """ Returns a dict with the decoded values of entry """
+        values = dict()
+        for field in ["name", "path", "mtime", "version", "revision"]:
+            values[field] = getattr(entry, field)
+        for field in ["depends", "runtime_depends", "url", "hash", "vars"]:
+            values[field] = self.decode(getattr(entry, field))
+        return values
+
+    def _get_vars(self, values):
+        """ Returns the variables of the rules of values for the current
+        config
+
+        The path variables are set to the defaults of a rules.
+        """
+        vars = dict(values["vars"] or {})
+        name = values["name"]
+        version = values["version"] + "-" + values["revision"]
+        cache_dir = os.path.join(self.config.get("buildroot"), name, version)
+        vars["prefix"] = self.config.get("prefix")
+        vars["rootdir"] = self.config.get("rootdir")
+        vars["package_path"] = self.config.get("packagepath")
+        vars["apps_dir"] = self.config.get("appsdir")
+        vars["src_dir"] = os.path.join(cache_dir, "source")
+        vars["build_dir"] = os.path.join(cache_dir, "build")
+        vars["dest_path"] = os.path.join(self.config.get("destroot"), name,
+                                         version) + vars["prefix"]
+        vars["src_path"] = real_path(os.path.join(vars["src_dir"],
+                                                  vars.get("name", name) +
+                                                  "-" + values["version"]))
+        vars["build_path"] = real_path(vars["build_dir"])
+        vars["patch_path"] = real_path(os.path.join(os.path.dirname(
+                                       values["path"]), "patches"))
+        vars["configure_path"] = vars["src_path"]
+        return vars
+
+    def _substitute(self, value, vars):
+        """ Replaces the variables in value like a rules does
+
+        Returns None if value uses an unknown variable.
+        """
+        if isinstance(value, list):
+            return [self._substitute(item, vars) for item in value]
+        if isinstance(value, basestring):
+            try:
+                return value % vars
+            except (KeyError, ValueError, TypeError), e:
+                self.log.debug("Could not substitute '%s': %s", value, e)
+                return None
+        return value
+
+    def decode(self, value):
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def encode(self, value):
+        return json.dumps(value)
+
+    def _create_rules(self, name, rules_class):
+        # use the same directories as RulesHandler. Otherwise values like
+        # the url may differ.
+        version = rules_class.get_dist_version()
+        cache_dir = os.path.join(self.config.get("buildroot"), name, version)
+        dest_dir = os.path.join(self.config.get("destroot"), name, version)
+        return rules_class(self.config, os.path.join(cache_dir, "source"),
+                           os.path.join(cache_dir, "build"), dest_dir)
+
+    def _create_entry(self, name, path, mtime):
+        rules_class = self.loader.load(name)
+        if not rules_class:
+            return None
+        validator = RulesValidator()
+        if not validator.validate(rules_class):
+            self.log.error("Rules %r is invalid: %s", name,
+                           "\n".join(validator.errors))
+            return None
+        rules = self._create_rules(name, rules_class)
+        vars = dict([(key, value) for (key, value) in rules.vars.items() if
+                     key not in CONFIG_VARS and isinstance(value,
+                                                           basestring)])
+        # the version is taken from the class like in RulesHandler. The url
+        # is stored unsubstituted.
+        return RulesIndexEntry(name, path, mtime, rules_class.get_version(),
+                               rules_class.revision,
+                               self.encode(rules.depends),
+                               self.encode(rules.runtime_depends),
+                               self.encode(rules_class.url),
+                               self.encode(rules.hash),
+                               self.encode(vars))
+
+    def update(self, force=False):
+        """ Refreshes the index
+
+        Only the entries of rules which have been changed since the last
+        update are recreated unless force is True. Entries of removed rules
+        are deleted. Returns a tuple with the names of the updated and the
+        removed rules.
+        """
+        updated = []
+        removed = []
+        with self.db.lock:
+            session = self.db.session
+            entries = dict([(entry.name, entry) for entry in
+                            session.query(RulesIndexEntry)])
+            names = self.list_names()
+            for name in names:
+                path = self.loader.find_path(name)
+                if not path:
+                    continue
+                mtime = self.get_mtime(path)
+                entry = entries.get(name)
+                if entry and not force and self._is_current(entry, path):
+                    continue
+                self.log.debug("Indexing rules %r", name)
+                try:
+                    new_entry = self._create_entry(name, path, mtime)
+                except Exception, e:
+                    self.log.error("Could not index rules %r: %s", name, e)
+                    new_entry = None
+                if new_entry:
+                    session.merge(new_entry)
+                    updated.append(name)
+                elif entry:
+                    session.delete(entry)
+                    removed.append(name)
+            for name in set(entries.keys()) - set(names):
+                session.delete(entries[name])
+                removed.append(name)
+            session.commit()
+        return (updated, sorted(removed))
@@ -19,12 +19,28 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
 # 02110-1301 USA
 
+import imp
+import os.path
+import threading
+
 import kaizen.logging
 
 from kaizen.utils import Loader, real_path
 from kaizen.rules.rules import Rules
 
 class RulesLoader(Loader):
+    """
+    Loads rules classes from the rules paths
+
+    Loaded rules classes are cached for the whole process by the path and
+    modification time of their rules file. Therefore each rules module is
+    imported only once unless it has been changed or the cache is
+    invalidated.
+    """
+
+    # path -> (mtime, rules class)
+    _cache = {}
+    _cache_lock = threading.RLock()
 
     def __init__(self, config):
         super(RulesLoader, self).__init__()
@@ -40,13 +56,52 @@ class RulesLoader(Loader):
             return None
         return self.classes(module, Rules)
 
+    def find_path(self, rulesname):
+        """ Returns the path of the rules file of rulesname or None """
+        paths = [os.path.join(path, rulesname) for path in self.paths]
+        try:
+            file, pathname, description = imp.find_module("rules", paths)
+        except ImportError:
+            return None
+        if file:
+            file.close()
+        return pathname
+
     def load(self, rulesname):
-        rulestring = rulesname + ".rules"
-        rules = self.rules(rulestring)
-        if not rules:
-            self.log.warn("Could not load any rules with name '%s'" %
-                          rulesname)
+        path = self.find_path(rulesname)
+        if not path:
+            self.log.warn("Could not find rules with name '%s'", rulesname)
             return None
-        rules = rules[0]
-        self.log.debug("Loaded rules class '%s'" % rules.__name__)
+        mtime = os.path.getmtime(path)
+
+        with self._cache_lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == mtime:
+                self.log.debug("Using cached rules class '%s'",
+                               cached[1].__name__)
+                return cached[1]
+
+            rulestring = rulesname + ".rules"
+            rules = self.rules(rulestring)
+            if not rules:
+                self.log.warn("Could not load any rules with name '%s'",
+                              rulesname)
+                return None
+            rules = rules[0]
+            self._cache[path] = (mtime, rules)
+        self.log.debug("Loaded rules class '%s'", rules.__name__)
         return rules
+
+    def invalidate(self, rulesname=None):
+        """ Removes rulesname from the cache of loaded rules
+
+        If rulesname is None all loaded rules are removed. The rules are
+        imported again on the next load.
+        """
+        with self._cache_lock:
+            if rulesname is None:
+                self._cache.clear()
+                return
+            path = self.find_path(rulesname)
+            if path:
+                self._cache.pop(path, None)
@@ -20,20 +20,36 @@
 # 02110-1301 USA
 
 import os.path
+import time
 
 import kaizen.logging
 
 from kaizen.rules.error import RulesError
 from kaizen.rules.handler import RulesHandler
-from kaizen.rules.depend import DependencyAnalyser, Dependency, \
-                               UnresolvedDependencies, DependencyEvaluator, \
-                               RuntimeDependencyAnalyser
+from kaizen.rules.depend import DependencyAnalyser, UnresolvedDependencies, \
+                               RuntimeDependencyAnalyser, DependencyResolver
+from kaizen.rules.scheduler import DependencyScheduler
 from kaizen.phase.phase import phases_list
 from kaizen.db.db import Db
 from kaizen.db.objects import Installed, RulesPhase
+from kaizen.utils import run_parallel
 from kaizen.utils.signals import ForwardSignal
 
 
+class DownloadResult(object):
+
+    DOWNLOADED, PRESENT, FAILED = range(3)
+
+    def __init__(self, name, status, filename=None, size=None, duration=0,
+                 error=None):
+        self.name = name
+        self.status = status
+        self.filename = filename
+        self.size = size
+        self.duration = duration
+        self.error = error
+
+
 class RulesManager(object):
 
     url = []
@@ -45,9 +61,18 @@ class RulesManager(object):
         self.rules_name = name
         self.log = kaizen.logging.getLogger(self)
         self.handler = RulesHandler(config, name, version, force)
+        self.resolver = None
         self.db = Db(config)
         self._init_signals()
+
+    def __getattr__(self, name):
+        # the sequences are taken from the handler on first use. Otherwise
+        # the rules would always be loaded.
+        if not name.endswith("_seq") or "install_seq" in self.__dict__:
+            raise AttributeError("%r object has no attribute %r" %
+                                 (self.__class__.__name__, name))
         self.init_sequences()
+        return getattr(self, name)
 
     def init_sequences(self):
         self.download_seq = self.handler.download_seq
@@ -89,44 +114,111 @@ class RulesManager(object):
         missing = depanalyzer.get_missing()
         if missing:
             raise UnresolvedDependencies(self.rules_name, missing)
-        for dependency in DependencyEvaluator(dependencies).list():
-            if not dependency.get_type() == Dependency.SESSION:
-                continue
-            if not phases_list.get("Activated") in \
-                dependency.rules.get_phases():
-                self.install_seq(dependency.rules)
+        scheduler = DependencyScheduler(self.config, dependencies)
+        if scheduler.jobs == 1:
+            def install(dependency):
+                if not phases_list.get("Activated") in \
+                    dependency.rules.get_phases():
+                    self.install_seq(dependency.rules)
+        else:
+            buildjobs = scheduler.get_buildjobs()
+            def install(dependency):
+                handler = dependency.rules
+                if not phases_list.get("Activated") in handler.get_phases():
+                    handler.rules.buildjobs = buildjobs
+                    # use the sequences of the dependency. The sequences of
+                    # this rules are not thread safe.
+                    handler.activate_seq(handler)
+        scheduler.run(install)
+
+    def get_resolver(self):
+        """ Returns the DependencyResolver shared by all dependency analyses
+        of this manager
+        """
+        if not self.resolver:
+            self.resolver = DependencyResolver(self.config, self.handler)
+        return self.resolver
 
     def install_dependencies(self):
-        depanalyzer = DependencyAnalyser(self.config, self.handler)
+        depanalyzer = DependencyAnalyser(self.config, self.handler,
+                                         self.get_resolver())
         self._install_dependencies(depanalyzer)
 
     def install_runtime_dependencies(self):
         depanalyzer = RuntimeDependencyAnalyser(self.config,
-                                                self.handler)
+                                                self.handler,
+                                                self.get_resolver())
         self._install_dependencies(depanalyzer)
 
-    def download(self, all=False, resume_on_error=True):
-        if all:
-            dependencies = self.handler.build_depends()
-            for dependency in dependencies.itervalues():
-                if not dependency.get_type() == Dependency.SESSION:
-                    continue
-                if not resume_on_error:
-                    self.download_seq(dependency.rules)
-                else:
-                    try:
-                        self.download_seq(dependency.rules)
-                    except Error, e:
-                        self.log.err("Error while downloading " + 
-                                     "rules '%s': %s" %\
-                                     (dependency.name, e))
-        self.download_seq(self.handler, self.force)
+    def _is_downloaded(self, handler, force=False):
+        return not force and phases_list.get("Downloaded") in \
+               handler.get_phases()
+
+    def _download_handler(self, handler, force=False):
+        name = handler.rules_name
+        if self._is_downloaded(handler, force):
+            return DownloadResult(name, DownloadResult.PRESENT,
+                                  handler.get_download_file())
+        start = time.time()
+        try:
+            # each handler uses its own sequence. The sequences of this rules
+            # are not thread safe.
+            handler.download_seq(handler, force)
+        except Exception, e:
+            self.log.error("Error while downloading rules '%s': %s", name,
+                           e)
+            return DownloadResult(name, DownloadResult.FAILED,
+                                  duration=time.time() - start, error=e)
+        filename = handler.get_download_file()
+        size = None
+        if filename and os.path.isfile(filename):
+            size = os.path.getsize(filename)
+        return DownloadResult(name, DownloadResult.DOWNLOADED, filename, size,
+                              time.time() - start)
+
+    def download(self, all=False, resume_on_error=True, jobs=1):
+        """ Downloads the sources of the rules
+
+        If all is True the sources of all build dependencies are downloaded
+        too. The dependency closure is resolved once and the sources are
+        downloaded and verified with up to jobs threads. Returns a list of
+        DownloadResult for all rules. The result of this rules is the last
+        one.
+
+        If resume_on_error is True a failed download doesn't stop the other
+        downloads and the caller must check the results for failures.
+        Otherwise the first error is raised after all downloads have finished.
+        If all is False errors are always raised.
+        """
+        if not all:
+            if self._is_downloaded(self.handler, self.force):
+                status = DownloadResult.PRESENT
+            else:
+                status = DownloadResult.DOWNLOADED
+            self.download_seq(self.handler, self.force)
+            return [DownloadResult(self.rules_name, status,
+                                   self.handler.get_download_file())]
+
+        dependencies = self.handler.build_depends(self.get_resolver())
+        handlers = [dependency.rules for dependency in
+                    DependencyScheduler(self.config, dependencies).list()]
+
+        def download(handler):
+            return self._download_handler(handler, handler is self.handler
+                                          and self.force)
+
+        results = run_parallel(download, handlers + [self.handler], jobs)
+        if not resume_on_error:
+            for result in results:
+                if result.error:
+                    raise result.error
+        return results
 
     def extract(self):
         self.extract_seq(self.handler, self.force)
 
     def archive(self):
-        self.log.info("%s:phase:archive" % self.rules_name)
+        self.log.info("%s:phase:archive", self.rules_name)
 
     def configure(self):
         self.install_dependencies()
@@ -142,12 +234,12 @@ class RulesManager(object):
 
     def install(self):
         self.install_dependencies()
-        self.log.info("%s:running install" % self.rules_name)
+        self.log.info("%s:running install", self.rules_name)
         self.install_seq(self.handler, self.force)
         self.common_activate()
 
     def uninstall(self):
-        self.log.info("%s:running uninstall" % self.rules_name)
+        self.log.info("%s:running uninstall", self.rules_name)
         self.uninstall_seq(self.handler, self.force)
         self.common_deactivate()
 
@@ -190,7 +282,9 @@ class RulesManager(object):
         self.distclean_seq(self.handler, self.force)
 
     def depends(self):
-        return self.handler.depends()
+        resolver = self.get_resolver()
+        return (self.handler.build_depends(resolver),
+                self.handler.runtime_depends(resolver))
 
     def delete_destroot(self):
         self.delete_destroot_seq(self.handler, self.force)
@@ -30,6 +30,64 @@ from kaizen.system.patch import Simple
 from kaizen.system.extract import ArchiveFile
 
 
+# attributes which may contain variables like %(prefix)s. The variables are
+# replaced when the attribute is accessed.
+SUBSTITUTED_ATTRIBUTES = frozenset([
+        "src_path", "build_path", "configure_args", "url",
+        "build_args", "patches", "configure_path", "patch_path",
+        "configure_cflags", "configure_ldflags", "configure_cc",
+        "configure_cpp", "configure_cppflags", "configure_libs",
+        "configure_cxx", "configure_cxxflags", "configure_cpath",
+        "configure_library_path", "build_cflags", "build_ldflags",
+        "build_cc", "build_cpp", "build_cppflags", "build_libs",
+        "build_cxx", "build_cxxflags", "build_cpath",
+        "build_library_path",
+        ])
+
+
+class Vars(dict):
+    """
+    Dict of the variables of a rules
+
+    Counts its modifications to be able to detect outdated substitutions.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Vars, self).__init__(*args, **kwargs)
+        self.changes = 0
+
+    def __setitem__(self, key, value):
+        super(Vars, self).__setitem__(key, value)
+        self.changes += 1
+
+    def __delitem__(self, key):
+        super(Vars, self).__delitem__(key)
+        self.changes += 1
+
+    def clear(self):
+        super(Vars, self).clear()
+        self.changes += 1
+
+    def pop(self, key, *args):
+        if key in self:
+            self.changes += 1
+        return super(Vars, self).pop(key, *args)
+
+    def popitem(self):
+        item = super(Vars, self).popitem()
+        self.changes += 1
+        return item
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.changes += 1
+        return super(Vars, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super(Vars, self).update(*args, **kwargs)
+        self.changes += 1
+
+
 class Rules(object):
     """
     Base Class for all Rules
@@ -39,6 +97,9 @@ class Rules(object):
     method must not expect that the post_activate method has created a specific
     symlink. In that case the post_deactivate method must check for the
     existance of this sysmlink before removing it.
+
+    Substituted attributes and depends are cached. The cache is invalidated if
+    the vars are changed or an attribute is set.
     """
 
     depends = []
@@ -53,6 +114,8 @@ class Rules(object):
     build_path = None
     patch_path = None
     parallel = True
+    # activation strategy. None uses the activation setting of the config.
+    activation = None
 
     configure_args = []
     configure_path = None
@@ -109,6 +172,8 @@ class Rules(object):
     groups = []
 
     def __init__(self, config, src_dir, build_dir, dest_dir):
+        # name -> (raw value, vars changes, value)
+        self.__cache = dict()
         self.config = config
         self.build_dir = build_dir
         self.src_dir = src_dir
@@ -141,7 +206,7 @@ class Rules(object):
         if not self.name:
             self.name = self.rules_name
 
-        self.vars = dict()
+        self.vars = Vars()
         self.vars["prefix"] = self.config.get("prefix")
         self.vars["rootdir"] = self.config.get("rootdir")
         self.vars["version"] = self.get_version()
@@ -215,18 +280,18 @@ class Rules(object):
                 raise
             self.__dict__[name] = value
             return value
-        if name in ["src_path", "build_path", "configure_args", "url",
-                    "build_args", "patches", "configure_path", "patch_path",
-                    "configure_cflags", "configure_ldflags", "configure_cc",
-                    "configure_cpp", "configure_cppflags", "configure_libs",
-                    "configure_cxx", "configure_cxxflags", "configure_cpath",
-                    "configure_library_path", "build_cflags", "build_ldflags",
-                    "build_cc", "build_cpp", "build_cppflags", "build_libs",
-                    "build_cxx", "build_cxxflags", "build_cpath",
-                    "build_library_path",
-                    ]:
+        if name in SUBSTITUTED_ATTRIBUTES:
             if not value:
                 return value
+            cache = object.__getattribute__(self, "_Rules__cache")
+            changes = object.__getattribute__(self, "vars").changes
+            cached = cache.get(name)
+            if cached and cached[0] is value and cached[1] == changes:
+                result = cached[2]
+                # callers must not change the cached list
+                if isinstance(result, list):
+                    return result[:]
+                return result
             if isinstance(value, list):
                 newlist = self.__shadow.get(name)
                 if not newlist:
@@ -235,10 +300,18 @@ class Rules(object):
                 for i, listvalue in enumerate(newlist):
                     replaced_value = self.var_replace(listvalue)
                     newlist[i] = replaced_value
-                return newlist
+                result = newlist
             else:
-                return self.var_replace(value)
+                result = self.var_replace(value)
+            cache[name] = (value, changes, result)
+            if isinstance(result, list):
+                return result[:]
+            return result
         elif name == "depends":
+            cache = object.__getattribute__(self, "_Rules__cache")
+            cached = cache.get(name)
+            if cached and cached[0] is value:
+                return cached[2][:]
             deps = []
             if self.build_cmd:
                 deps.extend(self.build_cmd.depends)
@@ -262,9 +335,21 @@ class Rules(object):
                 superdeps = base.depends
                 if superdeps:
                     deps.extend(superdeps)
-            return list(set(deps))
+            deps = list(set(deps))
+            cache[name] = (value, None, deps)
+            return deps[:]
         return value
 
+    def __setattr__(self, name, value):
+        if name == "vars" and not isinstance(value, Vars):
+            value = Vars(value)
+        object.__setattr__(self, name, value)
+        # e.g. a new build_cmd changes depends
+        try:
+            object.__getattribute__(self, "_Rules__cache").clear()
+        except AttributeError:
+            pass
+
     def init(self):
         pass
 
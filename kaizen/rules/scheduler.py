@@ -0,0 +1,139 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import sys
+import threading
+
+import kaizen.logging
+
+from kaizen.error import KaizenRuntimeError
+from kaizen.rules.depend import Dependency, DependencyEvaluator
+
+# max seconds to wait for a worker at once. Without a timeout the wait can't
+# be interrupted by KeyboardInterrupt in python 2.
+WAIT_TIMEOUT = 1
+
+
+class DependencyScheduler(object):
+    """
+    Runs a function for each rules dependency in dependency order
+
+    A dependency is only started after all of its own rules dependencies
+    have finished. Independent dependencies are run concurrently in up to
+    jobs worker threads. The global buildjobs budget is split between the
+    workers so that the total number of build jobs stays the same.
+    """
+
+    def __init__(self, config, dependencies, jobs=None):
+        self.config = config
+        self.dependencies = dependencies
+        self.log = kaizen.logging.getLogger(self)
+        buildjobs = config.get("buildjobs")
+        if not jobs:
+            jobs = config.get("installjobs")
+        self.jobs = max(1, min(jobs, buildjobs))
+        self.buildjobs = max(1, buildjobs // self.jobs)
+
+    def _get_rules_dependencies(self, dependency):
+        return [dep.get_name() for dep in dependency.get_dependencies() if
+                dep.get_type() == Dependency.SESSION]
+
+    def list(self):
+        """ Returns all rules dependencies in serial install order """
+        return [dependency for dependency in
+                DependencyEvaluator(self.dependencies).list() if
+                dependency.get_type() == Dependency.SESSION]
+
+    def get_buildjobs(self):
+        """ Returns the number of build jobs available for a single rules """
+        return self.buildjobs
+
+    def run(self, func):
+        dependencies = self.list()
+        if self.jobs == 1 or len(dependencies) < 2:
+            for dependency in dependencies:
+                func(dependency)
+            return
+        self._run_parallel(dependencies, func)
+
+    def _run_parallel(self, dependencies, func):
+        names = set([dependency.get_name() for dependency in dependencies])
+        waiting = []
+        for dependency in dependencies:
+            required = set(self._get_rules_dependencies(dependency)) & names
+            waiting.append((dependency, required))
+        done = set()
+        running = set()
+        errors = []
+        condition = threading.Condition()
+
+        def worker(dependency):
+            error = None
+            try:
+                func(dependency)
+            except Exception:
+                # keep the traceback of the worker
+                error = sys.exc_info()
+            condition.acquire()
+            try:
+                running.discard(dependency.get_name())
+                if error:
+                    errors.append(error)
+                else:
+                    done.add(dependency.get_name())
+                condition.notify()
+            finally:
+                condition.release()
+
+        condition.acquire()
+        try:
+            while waiting or running:
+                # waiting keeps the serial order. Therefore the frontier is
+                # started in the same order as without parallel jobs.
+                while not errors and len(running) < self.jobs:
+                    ready = None
+                    for i, (dependency, required) in enumerate(waiting):
+                        if required <= done:
+                            ready = i
+                            break
+                    if ready is None:
+                        break
+                    dependency, required = waiting.pop(ready)
+                    name = dependency.get_name()
+                    self.log.debug("Scheduling dependency '%s'", name)
+                    running.add(name)
+                    thread = threading.Thread(target=worker, args=(dependency,),
+                                              name=name)
+                    thread.daemon = True
+                    thread.start()
+                if not running:
+                    break
+                condition.wait(WAIT_TIMEOUT)
+        finally:
+            condition.release()
+
+        if errors:
+            (error_type, error, traceback) = errors[0]
+            raise error_type, error, traceback
+        if waiting:
+            raise KaizenRuntimeError("Could not schedule dependencies %s" %
+                    ", ".join([dependency.get_name() for (dependency, required)
+                               in waiting]))
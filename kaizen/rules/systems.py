@@ -40,7 +40,7 @@ class RulesCmd(object):
 class MakeCmd(RulesCmd):
 
     def build(self):
-        j = self.rules.config.get("buildjobs")
+        j = self.rules.buildjobs
 
         if self.rules.parallel and j > 1:
             build_args = ["-j" + str(j)] + self.rules.build_args
@@ -329,22 +329,22 @@ class PythonDevelopRules(PythonRules):
         finally:
             f.close()
 
-        self.log.debug("Current kaizen-rules.pth entries are %r" % self.entries)
+        self.log.debug("Current kaizen-rules.pth entries are %r", self.entries)
 
     def add_kaizen_pth_entry(self):
         if self.python_path not in self.entries:
-            self.log.debug("adding kaizen-rules.pth entry '%s'" % \
+            self.log.debug("adding kaizen-rules.pth entry '%s'",
                            self.python_path)
             self.entries.append(self.python_path)
 
     def delete_kaizen_pth(self):
         if self.python_path in self.entries:
-            self.log.debug("removing kaizen-rules.pth entry '%s'" % \
+            self.log.debug("removing kaizen-rules.pth entry '%s'",
                            self.python_path)
             self.entries.remove(self.python_path)
 
     def write_kaizen_pth(self):
-        self.log.debug("writing kaizen-rules.pth to '%s'" % \
+        self.log.debug("writing kaizen-rules.pth to '%s'",
                         self.get_kaizen_pth_path())
         with open(self.get_kaizen_pth_path(), "w") as f:
             num = len(self.entries)
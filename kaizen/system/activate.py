@@ -0,0 +1,414 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import errno
+import json
+import os
+import os.path
+import shutil
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import kaizen.logging
+
+from kaizen.error import KaizenError
+from kaizen.utils import run_parallel
+
+SYMLINK = "symlink"
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+
+STRATEGIES = [SYMLINK, HARDLINK, REFLINK]
+
+# max number of files activated by one job
+BATCH_SIZE = 256
+
+# min depth below the prefix of a directory linked as a whole. The top level
+# directories like bin, lib and share are always shared.
+LINK_MIN_DEPTH = 2
+
+# linux ioctl to clone a file with copy on write
+FICLONE = 0x40049409
+
+# errors of FICLONE if the filesystem doesn't support reflinks
+REFLINK_ERRORS = [errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY]
+
+
+class ActivationError(KaizenError):
+    pass
+
+
+def _load_libc():
+    """ Returns the symlinkat and unlinkat functions of the c library or None
+    if they are not available
+    """
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        symlinkat = libc.symlinkat
+        unlinkat = libc.unlinkat
+    except (ImportError, OSError, AttributeError):
+        return None
+    symlinkat.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p]
+    symlinkat.restype = ctypes.c_int
+    unlinkat.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+    unlinkat.restype = ctypes.c_int
+    return (symlinkat, unlinkat, ctypes.get_errno)
+
+_libc = None
+if hasattr(os, "O_DIRECTORY"):
+    _libc = _load_libc()
+
+
+def _encode(path):
+    if isinstance(path, unicode):
+        return path.encode(sys.getfilesystemencoding() or "utf-8")
+    return path
+
+
+def get_all_directories(dirs, files):
+    """ Returns a set of dirs, the directories of files and all of their
+    parent directories
+    """
+    all_dirs = set()
+    for path in dirs + [os.path.dirname(file) for file in files]:
+        while path and path != os.sep and path not in all_dirs:
+            all_dirs.add(path)
+            path = os.path.dirname(path)
+    return all_dirs
+
+def in_directories(path, directories):
+    """ Returns True if path or one of its parent directories is in the set
+    directories
+    """
+    while path and path != os.sep:
+        if path in directories:
+            return True
+        path = os.path.dirname(path)
+    return False
+
+def check_strategy(strategy):
+    if strategy not in STRATEGIES:
+        raise ActivationError("Invalid activation strategy '%s'. Valid "
+                              "values are %s." % (strategy,
+                              ", ".join(STRATEGIES)))
+
+def clone_file(source, path, strategy):
+    """ Creates path as a hard link or a reflink of source
+
+    Symlinks are copied as symlinks. If the filesystem doesn't support
+    reflinks the file is copied.
+    """
+    if os.path.islink(source):
+        os.symlink(os.readlink(source), path)
+    elif strategy == HARDLINK:
+        try:
+            os.link(source, path)
+        except OSError, e:
+            if e.errno != errno.EXDEV:
+                raise
+            raise ActivationError("Can't hard link '%s' to '%s'. They are on "
+                                  "different filesystems." % (source, path))
+    else:
+        reflink_file(source, path)
+
+def reflink_file(source, path):
+    src = open(source, "rb")
+    try:
+        dest = os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                                 0600), "wb")
+        try:
+            try:
+                if not fcntl:
+                    raise IOError(errno.EOPNOTSUPP, "No reflink support")
+                fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+            except IOError, e:
+                if e.errno not in REFLINK_ERRORS:
+                    raise
+                shutil.copyfileobj(src, dest)
+            dest.close()
+            shutil.copystat(source, path)
+        except:
+            dest.close()
+            os.remove(path)
+            raise
+    finally:
+        src.close()
+
+def is_clone(path, source):
+    """ Returns True if path is still a clone of source created by
+    clone_file
+
+    Hard links are compared by inode, reflinks and copies by size and
+    modification time.
+    """
+    if os.path.islink(source):
+        return os.path.islink(path) and \
+               os.readlink(path) == os.readlink(source)
+    if os.path.islink(path) or not os.path.isfile(path) or \
+            not os.path.isfile(source):
+        return False
+    if os.path.samefile(path, source):
+        return True
+    path_stat = os.stat(path)
+    source_stat = os.stat(source)
+    return path_stat.st_size == source_stat.st_size and \
+           int(path_stat.st_mtime) == int(source_stat.st_mtime)
+
+
+class RollbackLog(object):
+    """
+    Log of the changes of an activation
+
+    Each change is written to the log file before it is done. If an
+    activation fails or kaizen is interrupted the changes can be undone with
+    rollback, also by a later kaizen run.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.log = kaizen.logging.getLogger(self)
+        self.lock = threading.Lock()
+        self.file = None
+
+    def _write(self, entries):
+        with self.lock:
+            if not self.file:
+                self.file = open(self.filename, "a")
+            for entry in entries:
+                self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def add_directory(self, path):
+        self._write([["dir", path]])
+
+    def add_links(self, links, strategy=SYMLINK):
+        """ Records the files which are activated with strategy
+
+        links is a list of (path, target) tuples. target is the target of the
+        symlink or the source of the clone.
+        """
+        if strategy == SYMLINK:
+            kind = "link"
+        else:
+            kind = "clone"
+        self._write([[kind, path, target] for (path, target) in links])
+
+    def add_replaced(self, path, target):
+        """ Records a file which is replaced by an activated file
+
+        target is the target of the replaced symlink or None if the replaced
+        file was not a symlink. Only replaced symlinks can be restored.
+        """
+        self._write([["replaced", path, target]])
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def get_entries(self):
+        if not self.exists():
+            return []
+        entries = []
+        f = open(self.filename, "r")
+        try:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # incomplete last line of an interrupted activation
+                    break
+        finally:
+            f.close()
+        return entries
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def remove(self):
+        self.close()
+        if self.exists():
+            os.remove(self.filename)
+
+    def rollback(self):
+        """ Undoes the logged changes
+
+        First the activated files are removed, then the created directories
+        are removed and at last the replaced symlinks are restored. A
+        replaced symlink may be a directory link which has been replaced by
+        a created directory.
+        """
+        self.close()
+        entries = self.get_entries()
+        for entry in entries:
+            path = entry[1]
+            # the file may not have been created yet or replaced by
+            # something else
+            if entry[0] == "link" and os.path.islink(path) and \
+                    os.readlink(path) == entry[2]:
+                self.log.debug("Removing symlink '%s'", path)
+                os.remove(path)
+            elif entry[0] == "clone" and is_clone(path, entry[2]):
+                self.log.debug("Removing file '%s'", path)
+                os.remove(path)
+        # deepest directories first
+        for entry in reversed(entries):
+            path = entry[1]
+            if entry[0] == "dir" and os.path.isdir(path) and \
+                    not os.listdir(path):
+                self.log.debug("Removing directory '%s'", path)
+                os.rmdir(path)
+        for entry in entries:
+            path = entry[1]
+            if entry[0] == "replaced" and entry[2] is not None and \
+                    not os.path.lexists(path):
+                self.log.debug("Restoring symlink '%s' to '%s'", path,
+                               entry[2])
+                os.symlink(entry[2], path)
+        self.remove()
+
+
+class ActivationPlan(object):
+    """
+    Plan for creating the activated files
+
+    The files are grouped by their directory. The directories are created
+    once and the files are created by up to jobs threads. The strategy is
+    one of
+
+    * symlink - the files are symlinks to the destroot. Each job opens its
+                directory once and creates its symlinks relative to the
+                directory with symlinkat if available.
+    * hardlink - the files are hard links of the destroot files. Requires the
+                 destroot and the prefix on the same filesystem.
+    * reflink - the files are copy on write clones of the destroot files.
+                The files are copied if the filesystem doesn't support
+                reflinks.
+
+    Existing files are replaced.
+    """
+
+    def __init__(self, files, strategy=SYMLINK, directories=()):
+        """ files is a list of (path, target) tuples. target is the target
+        of the symlink or the source of the clone. directories are additional
+        directories to create e.g. empty ones.
+        """
+        check_strategy(strategy)
+        self.log = kaizen.logging.getLogger(self)
+        self.strategy = strategy
+        self.directories = dict()
+        for directory in directories:
+            self.directories.setdefault(directory, [])
+        for (path, target) in files:
+            (directory, name) = os.path.split(path)
+            self.directories.setdefault(directory, []).append((name, target))
+
+    def get_directories(self):
+        return sorted(self.directories.keys())
+
+    def get_batches(self):
+        """ Returns (directory, links) tuples of up to BATCH_SIZE links
+        sorted by directory
+        """
+        batches = []
+        for directory in self.get_directories():
+            links = self.directories[directory]
+            for i in range(0, len(links), BATCH_SIZE):
+                batches.append((directory, links[i:i + BATCH_SIZE]))
+        return batches
+
+    def create_directories(self, rollback_log):
+        # sorted directories create the parent directories first
+        for directory in self.get_directories():
+            missing = []
+            path = directory
+            while not os.path.isdir(path):
+                missing.append(path)
+                path = os.path.dirname(path)
+            for path in reversed(missing):
+                rollback_log.add_directory(path)
+                self.log.debug("Creating directory '%s'", path)
+                os.mkdir(path)
+
+    def run(self, rollback_log, jobs=1):
+        self.create_directories(rollback_log)
+
+        def link(batch):
+            self._link(batch[0], batch[1], rollback_log)
+
+        run_parallel(link, self.get_batches(), jobs)
+
+    def _link(self, directory, links, rollback_log):
+        rollback_log.add_links([(os.path.join(directory, name), target) for
+                                (name, target) in links], self.strategy)
+        dir_fd = None
+        if _libc and self.strategy == SYMLINK:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for (name, target) in links:
+                path = os.path.join(directory, name)
+                self.log.debug("Activating '%s' from '%s'", path, target)
+                try:
+                    self._create(dir_fd, directory, name, target)
+                except OSError, e:
+                    if e.errno != errno.EEXIST:
+                        raise
+                    if os.path.islink(path):
+                        rollback_log.add_replaced(path, os.readlink(path))
+                    else:
+                        rollback_log.add_replaced(path, None)
+                    self._unlink(dir_fd, directory, name)
+                    self._create(dir_fd, directory, name, target)
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+    def _call(self, func, path, *args):
+        if func(*args) != 0:
+            error = _libc[2]()
+            raise OSError(error, os.strerror(error), path)
+
+    def _create(self, dir_fd, directory, name, target):
+        if self.strategy == SYMLINK:
+            self._symlink(dir_fd, directory, name, target)
+        else:
+            clone_file(target, os.path.join(directory, name), self.strategy)
+
+    def _symlink(self, dir_fd, directory, name, target):
+        if dir_fd is None:
+            os.symlink(target, os.path.join(directory, name))
+        else:
+            self._call(_libc[0], os.path.join(directory, name),
+                       _encode(target), dir_fd, _encode(name))
+
+    def _unlink(self, dir_fd, directory, name):
+        if dir_fd is None:
+            os.remove(os.path.join(directory, name))
+        else:
+            self._call(_libc[1], os.path.join(directory, name), dir_fd,
+                       _encode(name), 0)
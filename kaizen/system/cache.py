@@ -0,0 +1,270 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import re
+import shutil
+import subprocess
+import tempfile
+
+import kaizen.logging
+
+from kaizen.error import KaizenError
+
+AUTO = "auto"
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+CLONE_METHODS = [AUTO, REFLINK, HARDLINK, COPY]
+
+# hash types used as cache key. The strongest available hash is preferred.
+KEY_HASHES = ["sha512", "sha384", "sha256", "sha224", "sha1", "md5"]
+
+
+class SourceCacheError(KaizenError):
+    pass
+
+
+class SourceCache(object):
+    """
+    Cache of extracted source trees
+
+    The extracted trees are stored by the hash of their archive. Restoring a
+    tree clones the cached files instead of extracting the archive again.
+    The clone method is one of
+
+    * reflink - copy on write clone of the files. Requires a filesystem
+                supporting reflinks e.g. btrfs or xfs.
+    * hardlink - the cached files are hard linked. Changes to a file in the
+                 source dir e.g. by a build in source also modify the cached
+                 file.
+    * copy - the files are copied
+    * auto - reflink if supported by the filesystem, otherwise copy
+
+    If the total size of the cache exceeds the max size the least recently
+    used trees are removed.
+    """
+
+    def __init__(self, config):
+        self.log = kaizen.logging.getLogger(self)
+        self.cache_dir = config.get("sourcecache")
+        self.max_size = config.get("sourcecachesize")
+        self.method = config.get("sourcecacheclone")
+        if self.method not in CLONE_METHODS:
+            raise SourceCacheError("Invalid sourcecacheclone '%s'. Valid "
+                                   "values are %s." % (self.method,
+                                   ", ".join(CLONE_METHODS)))
+
+    def is_enabled(self):
+        return self.max_size > 0
+
+    def get_key(self, hashes):
+        """ Returns the cache key for the hashes of an archive
+
+        Returns None if the archive has no usable hash.
+        """
+        if not hashes:
+            return None
+        types = [type for type in KEY_HASHES if type in hashes]
+        if not types:
+            types = sorted(hashes.keys())
+        type = types[0]
+        value = hashes[type].lower()
+        # the key is used as a directory name
+        if not re.match("^[0-9a-z]+$", value):
+            return None
+        return "%s-%s" % (type, value)
+
+    def _get_entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key, dest_dir):
+        """ Clones the cached tree for key to dest_dir
+
+        Returns False if the tree isn't cached or dest_dir isn't empty.
+        """
+        if not self.is_enabled():
+            return False
+        entry_dir = self._get_entry_dir(key)
+        tree_dir = os.path.join(entry_dir, "tree")
+        if not os.path.isdir(tree_dir):
+            return False
+        if os.path.exists(dest_dir) and os.listdir(dest_dir):
+            self.log.debug("Not using cached source for '%s'. '%s' is not "
+                           "empty.", key, dest_dir)
+            return False
+        if os.path.exists(dest_dir):
+            os.rmdir(dest_dir)
+        parent_dir = os.path.dirname(dest_dir)
+        if not os.path.exists(parent_dir):
+            os.makedirs(parent_dir)
+
+        self.log.debug("Cloning cached source '%s' to '%s'", tree_dir,
+                       dest_dir)
+        try:
+            self._clone(tree_dir, dest_dir)
+        except EnvironmentError, e:
+            self.log.warning("Could not restore cached source '%s': %s",
+                             key, e)
+            if os.path.exists(dest_dir):
+                shutil.rmtree(dest_dir)
+            return False
+        # mark entry as recently used
+        os.utime(os.path.join(entry_dir, "size"), None)
+        return True
+
+    def store(self, key, src_dir):
+        """ Adds a clone of the tree src_dir to the cache """
+        if not self.is_enabled():
+            return
+        entry_dir = self._get_entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        size = get_tree_size(src_dir)
+        if size > self.max_size:
+            self.log.debug("Not caching source '%s'. Size %d exceeds max "
+                           "cache size.", key, size)
+            return
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        tmp_dir = tempfile.mkdtemp(prefix="tmp-", dir=self.cache_dir)
+        try:
+            self._clone(src_dir, os.path.join(tmp_dir, "tree"))
+            f = open(os.path.join(tmp_dir, "size"), "w")
+            f.write(str(size))
+            f.close()
+            # the rename is atomic. A concurrent store of the same tree fails
+            # here
+            os.rename(tmp_dir, entry_dir)
+        except EnvironmentError, e:
+            if os.path.exists(entry_dir):
+                self.log.debug("Source '%s' has been cached already", key)
+            else:
+                self.log.warning("Could not cache source '%s': %s", key, e)
+            shutil.rmtree(tmp_dir, True)
+            return
+        self.log.debug("Cached source '%s' (%d bytes)", key, size)
+        self.evict(keep=key)
+
+    def get_entries(self):
+        """ Returns a list of (last used, size, key) tuples of the cached
+        trees
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for key in os.listdir(self.cache_dir):
+            if key.startswith("tmp-"):
+                continue
+            size_file = os.path.join(self.cache_dir, key, "size")
+            try:
+                f = open(size_file)
+                size = int(f.read())
+                f.close()
+                entries.append((os.path.getmtime(size_file), size, key))
+            except (EnvironmentError, ValueError):
+                continue
+        return entries
+
+    def evict(self, keep=None):
+        """ Removes the least recently used trees until the total size of the
+        cache doesn't exceed the max size
+        """
+        entries = sorted(self.get_entries())
+        total = sum([size for (used, size, key) in entries])
+        for (used, size, key) in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            self.log.debug("Removing cached source '%s'", key)
+            shutil.rmtree(self._get_entry_dir(key), True)
+            total -= size
+
+    def _clone(self, src_dir, dest_dir):
+        method = self.method
+        if method in [AUTO, REFLINK]:
+            if reflink_tree(src_dir, dest_dir):
+                return
+            if method == REFLINK:
+                raise OSError("Reflinks are not supported for '%s'" %
+                              dest_dir)
+            self.log.debug("Reflinks are not supported. Copying '%s'.",
+                           src_dir)
+            # remove partial clone
+            if os.path.exists(dest_dir):
+                shutil.rmtree(dest_dir)
+            method = COPY
+        if method == HARDLINK:
+            hardlink_tree(src_dir, dest_dir)
+        else:
+            shutil.copytree(src_dir, dest_dir, symlinks=True)
+
+
+def get_tree_size(path):
+    size = 0
+    for (dirpath, dirnames, filenames) in os.walk(path):
+        for filename in filenames:
+            size += os.lstat(os.path.join(dirpath, filename)).st_size
+    return size
+
+def reflink_tree(src_dir, dest_dir):
+    """ Clones src_dir to dest_dir with reflinks. Returns False if not
+    supported
+    """
+    devnull = open(os.devnull, "w")
+    try:
+        return subprocess.call(["cp", "-a", "--reflink=always", src_dir,
+                                dest_dir], stdout=devnull,
+                                stderr=devnull) == 0
+    except OSError:
+        return False
+    finally:
+        devnull.close()
+
+def hardlink_tree(src_dir, dest_dir):
+    """ Creates the directories of src_dir in dest_dir and hard links all
+    files
+    """
+    os.mkdir(dest_dir)
+    dirs = [(src_dir, dest_dir)]
+    for (dirpath, dirnames, filenames) in os.walk(src_dir):
+        dest = os.path.join(dest_dir, os.path.relpath(dirpath, src_dir))
+        for dirname in dirnames:
+            src = os.path.join(dirpath, dirname)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), os.path.join(dest, dirname))
+            else:
+                os.mkdir(os.path.join(dest, dirname))
+                dirs.append((src, os.path.join(dest, dirname)))
+        for filename in filenames:
+            src = os.path.join(dirpath, filename)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), os.path.join(dest, filename))
+            else:
+                os.link(src, os.path.join(dest, filename))
+    # set the permissions after all files have been linked. A directory may
+    # not be writable.
+    for (src, dest) in reversed(dirs):
+        shutil.copystat(src, dest)
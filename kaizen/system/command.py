@@ -106,8 +106,8 @@ class Configure(BuildSystem):
     def run(self):
         cmd = [os.path.join(self.src_dir, "configure")]
         cmd.extend(self.args)
-        self.log.debug("Configure run '%s' in '%s' with env '%s'" % (cmd,
-                        self.cwd_dir, self.env))
+        self.log.debug("Configure run '%s' in '%s' with env '%s'", cmd,
+                        self.cwd_dir, self.env)
         process = Process(cmd)
         process.run(not self.verbose, extra_env=self.env, cwd=self.cwd_dir)
 
@@ -118,8 +118,8 @@ class CMake(BuildSystem):
         cmd = ["cmake"]
         cmd.extend(self.args)
         cmd.append(real_path(self.src_dir))
-        self.log.debug("CMake run '%s' in '%s' with env '%s'" % (cmd,
-                       self.cwd_dir, self.env))
+        self.log.debug("CMake run '%s' in '%s' with env '%s'", cmd,
+                       self.cwd_dir, self.env)
         process = Process(cmd)
         process.run(not self.verbose, extra_env=self.env, cwd=self.cwd_dir)
 
@@ -136,8 +136,8 @@ class Make(BuildCommand):
     def run(self, args=[]):
         cmd = ["make"]
         cmd.extend(args)
-        self.log.debug("Make run '%s' in '%s' with env '%s'" % (cmd,
-                       self.cwd_dir, self.env))
+        self.log.debug("Make run '%s' in '%s' with env '%s'", cmd,
+                       self.cwd_dir, self.env)
         process = Process(cmd)
         process.run(not self.verbose, extra_env=self.env, cwd=self.cwd_dir)
 
@@ -170,8 +170,8 @@ class Command(BaseCommand):
         for arg in self.args:
             new_arg = arg.split()
             cmd.extend(new_arg)
-        self.log.debug("Running command '%s' in '%s' with env %s" % (cmd,
-            self.cwd_dir, self.env))
+        self.log.debug("Running command '%s' in '%s' with env %s", cmd,
+            self.cwd_dir, self.env)
         process = Process(cmd)
         process.run(not self.verbose, extra_env=self.env, cwd=self.cwd_dir)
 
@@ -210,11 +210,11 @@ class Copy(BaseCommand):
                     # only copy to an emtpy dir
                     if os.listdir(dest):
                         self.log.debug("Skipping copy. Destination '%s'"
-                                       " already exists" % dest)
+                                       " already exists", dest)
                         return
                     else:
                         os.rmdir(dest)
-                self.log.debug("Copy directory '%s' to '%s'" % (src, dest))
+                self.log.debug("Copy directory '%s' to '%s'", src, dest)
                 shutil.copytree(src, dest)
             else:
                 if os.path.isdir(self.dest):
@@ -223,7 +223,7 @@ class Copy(BaseCommand):
                     dest_dir = os.path.dirname(self.dest)
                 if not os.path.exists(dest_dir):
                     os.makedirs(dest_dir)
-                self.log.debug("Copy file '%s' to '%s'" % (src, self.dest))
+                self.log.debug("Copy file '%s' to '%s'", src, self.dest)
                 shutil.copy(src, self.dest)
 
 
@@ -236,7 +236,7 @@ class Move(BaseCommand):
 
     def run(self):
         for src in glob.glob(self.src):
-            self.log.debug("Moving '%s' to '%s'" % (src, self.dest))
+            self.log.debug("Moving '%s' to '%s'", src, self.dest)
             shutil.move(src, self.dest)
 
 
@@ -255,11 +255,11 @@ class Replace(BaseCommand):
         if not os.path.isfile(self.source):
             #TODO raise exception
             self.log.error("Can't replace '%s' in file '%s'. File does not " \
-                           "exist." % (self.pattern, self.source))
+                           "exist.", self.pattern, self.source)
             return
-        self.log.debug("Replacing '%s' with '%s' in file '%s'." % (self.pattern,
-                                                                   self.replace,
-                                                                   self.source))
+        self.log.debug("Replacing '%s' with '%s' in file '%s'.", self.pattern,
+                                                                 self.replace,
+                                                                 self.source)
         f = open(self.source, "r")
         content = f.read()
         f.close()
@@ -281,14 +281,14 @@ class Delete(BaseCommand):
         #       symlinks
         #       add parameter fail_if_not_exists and raise an exception
         if os.path.isdir(self.dir):
-            self.log.debug("deleting directory '%s' recursively" % self.dir)
+            self.log.debug("deleting directory '%s' recursively", self.dir)
             shutil.rmtree(self.dir)
         elif os.path.isfile(self.dir):
-            self.log.debug("deleting file '%s'" % self.dir)
+            self.log.debug("deleting file '%s'", self.dir)
             os.remove(self.dir)
         else:
-            self.log.error("Could not delete '%s'. It's not a file or directory"
-                    % self.dir)
+            self.log.error("Could not delete '%s'. It's not a file or "
+                           "directory", self.dir)
 
 class Mkdirs(BaseCommand):
 
@@ -298,8 +298,8 @@ class Mkdirs(BaseCommand):
 
     def run(self):
         if os.path.exists(self.path):
-            self.log.debug("directory '%s' already exists. Skipping" %
+            self.log.debug("directory '%s' already exists. Skipping",
                     self.path)
             return
-        self.log.debug("creating directory '%s'." % self.path)
+        self.log.debug("creating directory '%s'.", self.path)
         os.makedirs(self.path)
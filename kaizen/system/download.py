@@ -28,9 +28,12 @@ import kaizen.logging
 
 from urlparse import urlparse
 
-from kaizen.utils import Hash
+from kaizen.utils import Hash, HashStream
 from kaizen.error import KaizenError
 
+# used if no rules are available e.g. while creating new rules
+CHUNK_SIZE = 1024 * 1024
+
 class DownloaderError(KaizenError):
     pass
 
@@ -68,6 +71,11 @@ class Downloader(object):
         self.urlstr = urlstr
         self.log = kaizen.logging.getLogger(self)
 
+    def get_chunk_size(self):
+        if not self.rules:
+            return CHUNK_SIZE
+        return self.rules.config.get("downloadchunksize")
+
     def copy(self, destination, overwrite=False):
         raise NotImplementedError()
 
@@ -76,27 +84,65 @@ class Downloader(object):
 
 
 class FileDownloader(Downloader):
+    """
+    Base class for downloaders of a single file
+
+    The hashes of the rules are calculated from the received data while the
+    file is written. Therefore verify doesn't need to read the file again
+    after a download.
+    """
+
+    def __init__(self, rules, urlstr):
+        super(FileDownloader, self).__init__(rules, urlstr)
+        self.values = dict()
+
+    def get_hashes(self):
+        return getattr(self.rules, "hash", None) or {}
+
+    def new_hash_stream(self):
+        return HashStream(self.get_hashes().keys())
+
+    def check_hash_stream(self, stream, filename):
+        """
+        Verifies the hashes calculated while downloading
+
+        filename is removed if a hash doesn't match.
+        """
+        self.values = stream.hexdigests()
+        try:
+            self._check_hashes(self.get_hashes(), self.values)
+        except DownloaderHashError:
+            self.log.debug("Removing invalid download '%s'", filename)
+            os.remove(filename)
+            self.values = dict()
+            raise
 
     def verify(self, hashes):
-        hashcalc = Hash(self.filename)
-        # TODO support more hash algorithms and calculate all hashes with the
-        # same filedesriptor. Currently the file is opened several times
-        # hashcalc.set_hashes(['hasha', 'hashb'])
-        # calc_hash_dict = hashcalc.calculate_hashes()
+        if not hashes:
+            return
+        values = dict(self.values)
+        missing = [type for type in hashes if type not in values]
+        if missing:
+            # file wasn't downloaded in this run. All missing hashes are
+            # calculated while reading the file only once
+            values.update(Hash(self.filename).calculate(missing))
+        self._check_hashes(hashes, values)
+
+    def _check_hashes(self, hashes, values):
+        errors = []
         for (type, value) in hashes.items():
-            if type == 'md5':
-                calc_value = hashcalc.md5()
-            elif type == 'sha1':
-                calc_value = hashcalc.sha1()
-            else:
-                DownloaderError("Hash type '%s' for '%s' is not supported" %
-                        (type, this.filename))
+            calc_value = values[type]
             if calc_value != value:
-                # TODO calc all hashes and raise error afterwards
-                raise DownloaderHashError(self.filename, value, calc_value, type)
+                errors.append(DownloaderHashError(self.filename, value,
+                                                  calc_value, type))
             else:
-                self.log.debug("%s hash '%s' is valid for '%s'" % (type, value,
-                                                           self.filename))
+                self.log.debug("%s hash '%s' is valid for '%s'", type, value,
+                               self.filename)
+        if errors:
+            for error in errors[1:]:
+                self.log.error(str(error))
+            raise errors[0]
+
     def get_filename(self, destination):
         filename = os.path.basename(self.urlstr)
         if os.path.isdir(destination):
@@ -105,6 +151,13 @@ class FileDownloader(Downloader):
 
 
 class FtpDownloader(FileDownloader):
+    """
+    Downloads a file via ftp
+
+    Like with http the data is written to a .part file first which is renamed
+    to the final filename after the download has been completed. An
+    interrupted download is started again.
+    """
 
     def __init__(self, rules, urlstr):
         super(FtpDownloader, self).__init__(rules, urlstr)
@@ -115,60 +168,138 @@ class FtpDownloader(FileDownloader):
         self.filename = filename
 
         if os.path.exists(filename) and not overwrite:
-            self.log.info("'%s' has been downloaded already" % filename)
+            self.log.info("'%s' has been downloaded already", filename)
             return filename
 
+        partfilename = filename + ".part"
+
         ftp = ftplib.FTP(self.url.netloc)
         ftp.login()
 
-        with open(filename, 'w') as f:
+        stream = self.new_hash_stream()
+        sizes = [0]
+
+        def write(data):
+            f.write(data)
+            stream.update(data)
+            sizes[0] += len(data)
+
+        with open(partfilename, 'wb') as f:
             try:
                 filesize = ftp.size(self.url.path)
             except ftplib.all_errors:
                 filesize = 0
             if filesize:
-                self.log.info("downloading %s to %s (%.2f KiB)" % \
-                            (self.url.geturl(), filename, filesize / 1024))
+                self.log.info("downloading %s to %s (%.2f KiB)",
+                            self.url.geturl(), filename, filesize / 1024)
             else:
-                self.log.info("downloading %s to %s" % \
-                             (self.url.geturl(), filename))
-            ftp.retrbinary("RETR " + self.url.path, f.write)
+                self.log.info("downloading %s to %s",
+                             self.url.geturl(), filename)
+            ftp.retrbinary("RETR " + self.url.path, write)
             ftp.quit()
+
+        if filesize and sizes[0] != filesize:
+            raise DownloaderError("Download of '%s' is incomplete. Got %d of "
+                                  "%d bytes." % (self.urlstr, sizes[0],
+                                                 filesize))
+
+        self.check_hash_stream(stream, partfilename)
+        os.rename(partfilename, filename)
         return filename
 
 
 class HttpDownloader(FileDownloader):
+    """
+    Downloads a file via http(s)
+
+    The data is written to a .part file first which is renamed to the final
+    filename after the download has been completed. If a .part file exists
+    already the download is resumed with a range request if the server
+    supports it. If a hash of the received data doesn't match the .part file
+    is removed.
+    """
+
+    def _open(self, offset):
+        request = urllib2.Request(self.urlstr)
+        if offset:
+            request.add_header("Range", "bytes=%d-" % offset)
+        return urllib2.urlopen(request)
 
     def copy(self, destination, overwrite=False):
         filename = self.get_filename(destination)
         self.filename = filename
 
         if os.path.exists(filename) and not overwrite:
-            self.log.info("'%s' has been downloaded already" % filename)
+            self.log.info("'%s' has been downloaded already", filename)
             return filename
 
-        u = urllib2.urlopen(self.urlstr)
-        f = open(filename, 'w')
+        partfilename = filename + ".part"
+        if overwrite and os.path.exists(partfilename):
+            os.remove(partfilename)
+
+        offset = 0
+        if os.path.exists(partfilename):
+            offset = os.path.getsize(partfilename)
+
+        try:
+            u = self._open(offset)
+        except urllib2.HTTPError, e:
+            if e.code != 416 or not offset:
+                raise
+            # range not satisfiable. The .part file doesn't belong to the
+            # file on the server anymore.
+            self.log.debug("Can't resume download of '%s'. Restarting.",
+                           filename)
+            offset = 0
+            u = self._open(offset)
+
+        if offset and u.getcode() == 206:
+            self.log.info("resuming download of %s at %.2f KiB",
+                          self.urlstr, offset / 1024.)
+            mode = "ab"
+        else:
+            # server doesn't support range requests. Start from the beginning
+            offset = 0
+            mode = "wb"
+
         meta = u.info()
         content_length_header = meta.getheaders("Content-Length")
+        filesize = None
         if content_length_header:
-            filesize = int(content_length_header[0])
-            self.log.info("downloading %s to %s (%.2f KiB)" % (self.urlstr,
-                                                               filename,
-                                                               filesize / 1024))
+            filesize = offset + int(content_length_header[0])
+            self.log.info("downloading %s to %s (%.2f KiB)", self.urlstr,
+                                                             filename,
+                                                             filesize / 1024.)
         else:
-            self.log.info("downloading %s to %s" % (self.url, filename))
-        filesizedl = 0
-        while True:
-            buffer = u.read(8192)
-            if not buffer:
-                break
-            filesizedl += len(buffer)
-            f.write(buffer)
-            #status = r"[%3.2f%%]" % (filesizedl * 100. / filesize)
-            #print status
-        f.close()
-
+            self.log.info("downloading %s to %s", self.urlstr, filename)
+
+        stream = self.new_hash_stream()
+        if offset:
+            # the already downloaded data must be hashed too
+            Hash(partfilename).feed(stream)
+
+        chunk_size = self.get_chunk_size()
+        filesizedl = offset
+        f = open(partfilename, mode)
+        try:
+            while True:
+                buffer = u.read(chunk_size)
+                if not buffer:
+                    break
+                filesizedl += len(buffer)
+                f.write(buffer)
+                stream.update(buffer)
+        finally:
+            f.close()
+            u.close()
+
+        if filesize is not None and filesizedl != filesize:
+            raise DownloaderError("Download of '%s' is incomplete. Got %d of "
+                                  "%d bytes. Run download again to resume." %
+                                  (self.urlstr, filesizedl, filesize))
+
+        self.check_hash_stream(stream, partfilename)
+        os.rename(partfilename, filename)
         return filename
 
 
@@ -183,7 +314,7 @@ class LocalFileDownloader(Downloader):
         path = self.url.path
         if not self.url.scheme and self.root_dir:
             path = os.path.join(self.root_dir, path)
-        self.log.debug("copying '%s' to '%s'" % (path, filename))
+        self.log.debug("copying '%s' to '%s'", path, filename)
         shutil.copy(path, filename)
 
 
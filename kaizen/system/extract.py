@@ -25,6 +25,7 @@ import kaizen.logging
 
 from kaizen.error import KaizenError
 from kaizen.utils import extract_file
+from kaizen.utils.extract import AUTO
 
 class FileExtractError(KaizenError):
     pass
@@ -33,6 +34,10 @@ class FileExtractError(KaizenError):
 class FileExtract(object):
 
     depends = []
+    # whether the extracted files can be stored in the source cache
+    cacheable = False
+    # set by the rules handler after construction
+    config = None
 
     def __init__(self, url):
         self.url = url
@@ -44,20 +49,29 @@ class FileExtract(object):
 
 class ArchiveFile(FileExtract):
 
+    # the extracted files only depend on the downloaded archive. Therefore
+    # they can be stored in the source cache.
+    cacheable = True
+
     def extract(self, src_dir, dest_dir):
         filename = self._get_filename()
         archive_file = os.path.join(src_dir, filename)
         if os.path.isfile(archive_file):
             if not os.path.exists(dest_dir):
-                self.log.debug("Creating destination dir '%s'" % dest_dir)
+                self.log.debug("Creating destination dir '%s'", dest_dir)
                 os.makedirs(dest_dir)
-            self.log.info("Extract '%s' to '%s'" % (archive_file, dest_dir))
-            extract_file(archive_file, dest_dir)
+            self.log.info("Extract '%s' to '%s'", archive_file, dest_dir)
+            extract_file(archive_file, dest_dir, self._get_backend())
 
         else:
             raise FileExtractError("Could not extract '%s' to '%s'. File does "
                                      "not exist." % (archive_file, dest_dir))
 
+    def _get_backend(self):
+        if not self.config:
+            return AUTO
+        return self.config.get("extractbackend")
+
     def _get_filename(self):
         file = self.url
         if isinstance(file, list):
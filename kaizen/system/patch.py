@@ -80,7 +80,7 @@ class Simple(PatchSystem):
             return
         patch_name = self.patches[self.next_patch]
         patch = os.path.join(self.patch_dir, patch_name)
-        self.log.info("Applying patch '%s' from '%s'" % (patch_name, patch))
+        self.log.info("Applying patch '%s' from '%s'", patch_name, patch)
         Patch(patch, self.work_dir, self.verbose).run()
         self.next_patch += 1
 
@@ -94,7 +94,7 @@ class Simple(PatchSystem):
             return
         patch_name = self.patches[current_patch]
         patch = os.path.join(self.patch_dir, patch_name)
-        self.log.info("Unapplying patch '%s' from '%s'" % (patch_name, patch))
+        self.log.info("Unapplying patch '%s' from '%s'", patch_name, patch)
         Patch(patch, self.work_dir,
                 self.verbose, reverse=True).run()
         self.next_patch += 1
@@ -147,8 +147,8 @@ class Quilt(PatchSystem):
         from quilt.push import Push
         from quilt.error import NoPatchesInSeries, AllPatchesApplied
 
-        self.log.debug("applying patches of %s in %s" % (self.patch_dir,
-                                                         self.work_dir))
+        self.log.debug("applying patches of %s in %s", self.patch_dir,
+                                                       self.work_dir)
 
         push = Push(self.work_dir, os.path.join(self.work_dir, ".pc"),
                     self.patch_dir)
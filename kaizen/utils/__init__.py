@@ -22,8 +22,8 @@
 from kaizen.utils.template import Template
 
 from kaizen.utils.helpers import real_path, list_contents, list_dir, list_subdir, \
-                              extract_file, get_number_of_cpus
+                              extract_file, get_number_of_cpus, run_parallel
 
-from kaizen.utils.hash import Hash
+from kaizen.utils.hash import Hash, HashStream
 
 from kaizen.utils.loader import Loader
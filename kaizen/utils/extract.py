@@ -0,0 +1,156 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continuously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import subprocess
+import tarfile
+import tempfile
+
+import kaizen.logging
+
+from kaizen.error import KaizenRuntimeError
+
+log = kaizen.logging.getLogger(__name__)
+
+AUTO = "auto"
+PYTHON = "python"
+
+BACKENDS = [AUTO, PYTHON]
+
+# external (multi-threaded) decompressors for tar archives. For each suffix
+# the first program found in PATH is used. The decompressed data must be
+# written to stdout.
+DECOMPRESSORS = [
+    ((".tar.gz", ".tgz"), [["pigz", "-dc"]]),
+    ((".tar.bz2", ".tbz2", ".tbz"), [["lbzip2", "-dc"], ["pbzip2", "-dc"]]),
+    ((".tar.xz", ".txz"), [["xz", "-dc", "-T0"]]),
+    ((".tar.zst", ".tzst"), [["zstd", "-dcq"]]),
+]
+
+_programs = {}
+
+
+class ExtractError(KaizenRuntimeError):
+    pass
+
+
+def find_program(name):
+    """ Returns the path of the program name in PATH or None """
+    if name not in _programs:
+        _programs[name] = None
+        for path in os.environ.get("PATH", "").split(os.pathsep):
+            program = os.path.join(path, name)
+            if os.path.isfile(program) and os.access(program, os.X_OK):
+                _programs[name] = program
+                break
+    return _programs[name]
+
+def get_decompressor(file_name):
+    """ Returns the command of an external decompressor for file_name
+
+    Returns None if file_name isn't a compressed tar archive or if no suitable
+    program is available.
+    """
+    for (suffixes, commands) in DECOMPRESSORS:
+        if file_name.endswith(suffixes):
+            for command in commands:
+                program = find_program(command[0])
+                if program:
+                    return [program] + command[1:]
+            return None
+    return None
+
+
+class PipeFile(object):
+    """
+    Extracts a tar archive that is decompressed by an external program
+
+    The output of the program is read by tarfile as a stream.
+    """
+
+    def __init__(self, filename, command):
+        self.filename = filename
+        self.command = command
+
+    def extractall(self, dest_dir):
+        infile = open(self.filename, "rb")
+        # stderr is written to a file to avoid blocking the program if the
+        # pipe buffer is full
+        errfile = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(self.command, stdin=infile,
+                                       stdout=subprocess.PIPE, stderr=errfile)
+        except OSError, e:
+            infile.close()
+            errfile.close()
+            raise ExtractError("Could not run '%s': %s" %
+                               (" ".join(self.command), e))
+        infile.close()
+        try:
+            try:
+                tar = tarfile.open(fileobj=process.stdout, mode="r|")
+                try:
+                    tar.extractall(dest_dir)
+                finally:
+                    tar.close()
+            except tarfile.TarError, e:
+                process.stdout.close()
+                process.wait()
+                errfile.seek(0)
+                raise ExtractError("Could not extract '%s' with '%s': %s %s" %
+                                   (self.filename, " ".join(self.command), e,
+                                    errfile.read().strip()))
+            process.stdout.close()
+            if process.wait() != 0:
+                errfile.seek(0)
+                raise ExtractError("'%s' failed to decompress '%s': %s" %
+                                   (" ".join(self.command), self.filename,
+                                    errfile.read().strip()))
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            errfile.close()
+
+
+class ZstdFile(object):
+    """ Extracts a .tar.zst archive with the zstandard module """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def extractall(self, dest_dir):
+        try:
+            import zstandard
+        except ImportError:
+            raise ExtractError("Unable to extract '%s'. zstd or the python "
+                               "zstandard module is required." % self.filename)
+        infile = open(self.filename, "rb")
+        try:
+            stream = zstandard.ZstdDecompressor().stream_reader(infile)
+            tar = tarfile.open(fileobj=stream, mode="r|")
+            try:
+                tar.extractall(dest_dir)
+            finally:
+                tar.close()
+        finally:
+            infile.close()
@@ -19,45 +19,122 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
 # 02110-1301 USA
 
+import mmap
 import os.path
 
 from kaizen.error import KaizenRuntimeError
 
 try:
-    from hashlib import md5 # requires python 2.5
-    from hashlib import sha1 # requires python 2.5
+    import hashlib # requires python 2.5
+    new_hash = hashlib.new
 except ImportError:
-    from md5 import new as md5
-    from sha import new as sha1
+    import md5
+    import sha
+
+    def new_hash(name):
+        if name == "md5":
+            return md5.new()
+        if name == "sha1":
+            return sha.new()
+        raise ValueError("unsupported hash type %s" % name)
+
+# read in multiples of the mmap allocation granularity (at least 1 MiB)
+BLOCK_SIZE = max(1, (1024 * 1024) // mmap.ALLOCATIONGRANULARITY) * \
+             mmap.ALLOCATIONGRANULARITY
+
+
+class HashStream(object):
+    """
+    Calculates several hashes of a stream of data
+
+    All data passed to update is fed into each hash object. Can be used to
+    calculate hashes while the data is written e.g. during a download.
+    """
+
+    def __init__(self, algorithms):
+        self.hashes = dict()
+        for algorithm in algorithms:
+            try:
+                self.hashes[algorithm] = new_hash(algorithm)
+            except ValueError:
+                raise KaizenRuntimeError("Hash type '%s' is not supported" %
+                                         algorithm)
+
+    def update(self, data):
+        for m in self.hashes.itervalues():
+            m.update(data)
+
+    def hexdigests(self):
+        """ Returns a dict with the hex digest for each algorithm """
+        return dict([(algorithm, m.hexdigest()) for (algorithm, m) in
+                     self.hashes.iteritems()])
+
 
 class Hash(object):
+    """
+    Calculates hashes of a file
+
+    All requested hash algorithms are calculated while reading the file only
+    once. Every algorithm provided by hashlib can be used e.g. md5, sha1,
+    sha256, sha512 and blake2b. The calculated values are cached.
+    """
 
-    def __init__(self, filename):
+    def __init__(self, filename, block_size=BLOCK_SIZE, use_mmap=False):
         self.filename = filename
-        self.md5_value = None
-        self.sha1_value = None
+        self.block_size = block_size
+        self.use_mmap = use_mmap
+        self.values = dict()
 
     def md5(self):
-        if not self.md5_value:
-            self.md5_value = self._calculate_hash(md5)
-        return self.md5_value
+        return self.hexdigest("md5")
 
     def sha1(self):
-        if not self.sha1_value:
-            self.sha1_value = self._calculate_hash(sha1)
-        return self.sha1_value
+        return self.hexdigest("sha1")
 
-    def _calculate_hash(self, hashalgorithm):
-        """ calculates a hash of a file """
-        if not os.path.isfile(self.filename):
-            raise KaizenRuntimeError("Could not calculate hash. File not found: %s"
-                                % self.filename)
-        f = file(self.filename, 'rb')
-        m = hashalgorithm()
+    def hexdigest(self, algorithm):
+        return self.calculate([algorithm])[algorithm]
+
+    def calculate(self, algorithms):
+        """ Returns a dict with the hex digest for each algorithm """
+        missing = [algorithm for algorithm in algorithms if algorithm not in
+                   self.values]
+        if missing:
+            self.values.update(self._calculate_hashes(missing))
+        return dict([(algorithm, self.values[algorithm]) for algorithm in
+                     algorithms])
+
+    def _read_blocks(self, f):
+        if self.use_mmap:
+            size = os.fstat(f.fileno()).st_size
+            # empty files can't be mapped
+            if size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for offset in xrange(0, size, self.block_size):
+                        yield data[offset:offset + self.block_size]
+                finally:
+                    data.close()
+                return
         while True:
-            d = f.read(8096)
+            d = f.read(self.block_size)
             if not d:
                break
-            m.update(d)
-        f.close()
-        return m.hexdigest()
+            yield d
+
+    def feed(self, stream):
+        """ Passes the content of the file to a HashStream """
+        if not os.path.isfile(self.filename):
+            raise KaizenRuntimeError("Could not calculate hash. File not found: %s"
+                                % self.filename)
+        f = open(self.filename, 'rb')
+        try:
+            for d in self._read_blocks(f):
+                stream.update(d)
+        finally:
+            f.close()
+
+    def _calculate_hashes(self, algorithms):
+        """ calculates several hashes of a file in one pass """
+        stream = HashStream(algorithms)
+        self.feed(stream)
+        return stream.hexdigests()
@@ -21,11 +21,16 @@
 
 import os.path
 import tarfile
+import threading
 import zipfile
 
+from Queue import Queue, Empty
+
 import kaizen.logging
 
 from kaizen.error import KaizenRuntimeError
+from kaizen.utils.extract import AUTO, BACKENDS, ExtractError, PipeFile, \
+                                 ZstdFile, get_decompressor
 
 log = kaizen.logging.getLogger(__name__)
 
@@ -33,61 +38,87 @@ log = kaizen.logging.getLogger(__name__)
 def list_contents(dir):
     files = []
     dirs = []
-    cwd = os.getcwd()
-    os.chdir(dir)
-    contents = os.listdir(dir)
-    for content in contents:
-        if os.path.isdir(content):
-            dirs.append(content)
+    for (name, is_dir) in _scan_dir(dir):
+        if is_dir:
+            dirs.append(name)
         else:
-            files.append(content)
-    os.chdir(cwd)
+            files.append(name)
     return (dirs, files)
 
+def _scan_dir(dir):
+    """ Returns a list of (name, is_dir) tuples for the entries of dir """
+    return [(name, os.path.isdir(os.path.join(dir, name))) for name in
+            os.listdir(dir)]
+
+def _walk_dir(dir, prefix, all_dirs, dirs, files):
+    """ Walks dir and appends the found directories and files prefixed with
+    prefix to dirs and files
+
+    Returns True if dir contains a subdirectory.
+    """
+    has_subdirs = False
+    for (name, is_dir) in _scan_dir(dir):
+        path = os.path.join(prefix, name)
+        if is_dir:
+            has_subdirs = True
+            index = len(dirs)
+            dirs.append(path)
+            if _walk_dir(os.path.join(dir, name), path, all_dirs, dirs,
+                         files) and not all_dirs:
+                del dirs[index]
+        else:
+            files.append(path)
+    return has_subdirs
+
 def list_dir(dir, all_dirs=False):
+    """ Returns all directories and files below dir joined with dir
+
+    Only the leaf directories are returned unless all_dirs is True. The
+    directory tree is walked once and the working directory is not changed.
+    """
     files = []
     dirs = []
-    contents = os.listdir(dir)
-    for content in contents:
-        path = os.path.join(dir, content)
-        if os.path.isdir(path):
-            (newdirs, newfiles) = list_dir(path, all_dirs)
-            if not newdirs or all_dirs:
-                dirs.append(path)
-            files.extend(newfiles)
-            dirs.extend(newdirs)
-        else:
-            files.append(path)
+    _walk_dir(dir, dir, all_dirs, dirs, files)
     return (dirs, files)
 
 def list_subdir(dir, all_dirs=False):
+    """ Like list_dir but returns the paths relative to dir """
     files = []
     dirs = []
-    cwd = os.getcwd()
-    os.chdir(dir)
-    contents = os.listdir(dir)
-    for content in contents:
-        if os.path.isdir(content):
-            (newdirs, newfiles) = list_dir(content, all_dirs)
-            if not newdirs or all_dirs:
-                dirs.append(content)
-            files.extend(newfiles)
-            dirs.extend(newdirs)
-        else:
-            files.append(content)
-    os.chdir(cwd)
+    _walk_dir(dir, "", all_dirs, dirs, files)
     return (dirs, files)
 
 def real_path(path):
     return os.path.abspath(os.path.expanduser(path))
 
-def extract_file(file_name, dest_dir):
+def extract_file(file_name, dest_dir, backend=AUTO):
+    """ Extracts the archive file_name to dest_dir
+
+    With the auto backend compressed tar archives are decompressed by an
+    external multi-threaded program like pigz, lbzip2, pbzip2, xz or zstd if
+    available. Otherwise and with the python backend the python modules are
+    used.
+    """
     if not os.path.isfile(file_name):
         raise KaizenRuntimeError("Unable to extract file. '%s' is does not exit or \
                            is not a file." % file_name)
+    if backend not in BACKENDS:
+        raise KaizenRuntimeError("Unknown extract backend '%s'. Valid backends "
+                                 "are %s." % (backend, ", ".join(BACKENDS)))
+    if backend == AUTO:
+        command = get_decompressor(file_name)
+        if command:
+            log.debug("Extracting '%s' to '%s' using '%s'",
+                      file_name, dest_dir, kaizen.logging.Lazy(" ".join,
+                                                               command))
+            try:
+                PipeFile(file_name, command).extractall(dest_dir)
+                return
+            except ExtractError, e:
+                log.warning("%s. Falling back to python extraction.", e)
     if file_name.endswith(".bz2") or file_name.endswith(".tbz2"):
-        log.debug("Extracting tar.bz2 file '%s' to '%s'" %
-                      (file_name, dest_dir))
+        log.debug("Extracting tar.bz2 file '%s' to '%s'",
+                      file_name, dest_dir)
         # bz2 doesn't support multiple streams therefore use bz2file module
         try:
             import bz2file
@@ -98,19 +129,58 @@ def extract_file(file_name, dest_dir):
             file = tarfile.open(file_name)
     elif file_name.endswith(".xz"):
         from kaizen.utils.xz import XZFile
-        log.debug("Extracting xz file '%s' to '%s'" % (file_name, dest_dir))
+        log.debug("Extracting xz file '%s' to '%s'", file_name, dest_dir)
         file = XZFile(file_name)
+    elif file_name.endswith(".zst") or file_name.endswith(".tzst"):
+        log.debug("Extracting zstd file '%s' to '%s'", file_name, dest_dir)
+        file = ZstdFile(file_name)
     elif tarfile.is_tarfile(file_name):
-        log.debug("Extracting tar file '%s' to '%s'" % (file_name, dest_dir))
+        log.debug("Extracting tar file '%s' to '%s'", file_name, dest_dir)
         file = tarfile.open(file_name)
     elif zipfile.is_zipfile(file_name):
-        log.debug("Extracting zip file '%s' to '%s'" % (file_name, dest_dir))
+        log.debug("Extracting zip file '%s' to '%s'", file_name, dest_dir)
         file = zipfile.ZipFile(file_name)
     else:
         raise KaizenRuntimeError("Unable to extract file. '%s' can not be recognized " \
                            "as a valid source archive." % file_name)
     file.extractall(dest_dir)
 
+def run_parallel(func, items, jobs):
+    """ Calls func for each item with up to jobs threads
+
+    Returns the results in the order of items. func must handle its own
+    errors. An exception raised by func is re-raised after all threads have
+    finished.
+    """
+    results = [None] * len(items)
+    errors = []
+    queue = Queue()
+    for i, item in enumerate(items):
+        queue.put((i, item))
+
+    def worker():
+        while True:
+            try:
+                i, item = queue.get_nowait()
+            except Empty:
+                return
+            try:
+                results[i] = func(item)
+            except Exception, e:
+                errors.append(e)
+
+    threads = []
+    for i in range(max(1, min(jobs, len(items)))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
 def get_number_of_cpus():
     try:
         import multiprocessing
@@ -51,7 +51,7 @@ class Loader(object):
 
     def module(self, name, as_module=None):
         if not as_module:
-            as_module = module
+            as_module = name
         if "." in name:
             paths = []
             index = name.rfind(".")
@@ -68,14 +68,14 @@ class Loader(object):
         try:
             if as_module in sys.modules:
                 self.log.warn("Reloading '%s' module. This overwrites the " \
-                        "previous loaded module with the same name." % \
+                        "previous loaded module with the same name.",
                         as_module)
                 del sys.modules[as_module]
             module = self.find_module(module_name, paths, as_module)
-            self.log.debug("Imported module '%s'" % module)
+            self.log.debug("Imported module '%s'", module)
             return module
         except ImportError, error:
-            self.log.warn("Could not import module '%s'. %s" % (name, error))
+            self.log.warn("Could not import module '%s'. %s", name, error)
             return None
 
 
@@ -88,23 +88,23 @@ class Loader(object):
                         continue
                 # only load classes from module
                 if not all and value.__module__ != module.__name__:
-                    self.log.debug("Skipping class '%s'" % value)
+                    self.log.debug("Skipping class '%s'", value)
                     continue
-                self.log.debug("Found class '%s'" % value)
+                self.log.debug("Found class '%s'", value)
                 classes.append(value)
         return classes
 
     def load(self, modulename, classname):
         classes = self.classes(modulename)
         if not classes:
-            self.log.warn("Could not load any class with name '%s'" %
+            self.log.warn("Could not load any class with name '%s'",
                           classname)
             return None
         for loadedclass in classes:
             if loadedclass.__name__ == classname:
-                self.log.info("Loaded class '%s'" % classname)
+                self.log.info("Loaded class '%s'", classname)
                 return loadedclass
-        self.log.warn("Could not load any class with name '%s'" %
+        self.log.warn("Could not load any class with name '%s'",
                       classname)
         return None
 
@@ -21,9 +21,61 @@
 
 import tarfile
 
-from cStringIO import StringIO as IO
+try:
+    import lzma
+except ImportError:
+    # python 2 backport of the python 3 lzma module
+    from backports import lzma
 
-import lzma
+# size of the compressed blocks read at once
+BLOCK_SIZE = 64 * 1024
+
+
+class XZStream(object):
+    """
+    File-like object that decompresses a xz file while it is read
+
+    Only the data required for the current read call is decompressed.
+    Therefore memory usage doesn't depend on the size of the file.
+    """
+
+    def __init__(self, fileobj, block_size=BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.decompressor = lzma.LZMADecompressor()
+        self.buffer = ""
+        self.offset = 0
+        self.eof = False
+
+    def _fill(self, size):
+        available = len(self.buffer) - self.offset
+        if self.eof or (size >= 0 and available >= size):
+            return
+        chunks = [self.buffer[self.offset:]]
+        while size < 0 or available < size:
+            data = self.fileobj.read(self.block_size)
+            if not data:
+                self.eof = True
+                break
+            data = self.decompressor.decompress(data)
+            available += len(data)
+            chunks.append(data)
+        self.buffer = "".join(chunks)
+        self.offset = 0
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0:
+            end = len(self.buffer)
+        else:
+            end = self.offset + size
+        data = self.buffer[self.offset:end]
+        self.offset += len(data)
+        return data
+
+    def close(self):
+        self.buffer = ""
+        self.fileobj.close()
 
 
 class XZFile(object):
@@ -32,12 +84,14 @@ class XZFile(object):
         self.filename = filename
 
     def extractall(self, dest_dir):
-        xz = lzma.LZMADecompressor()
-        infile = open(self.filename, "r")
-        data = xz.decompress(infile.read())
-        infile.close()
-
-        outfile = IO(data)
-        tar = tarfile.open(fileobj=outfile, mode="r")
-        tar.extractall(dest_dir)
-        outfile.close()
+        stream = XZStream(open(self.filename, "rb"))
+        try:
+            # read the tar file as a stream. Only the tar header and data of
+            # the current member are kept in memory.
+            tar = tarfile.open(fileobj=stream, mode="r|")
+            try:
+                tar.extractall(dest_dir)
+            finally:
+                tar.close()
+        finally:
+            stream.close()
@@ -0,0 +1,129 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+import kaizen.logging
+
+from kaizen.command import COMMANDS, load_command
+from kaizen.console.main import Main
+from kaizen.db.db import Db
+from kaizen.rules.loader import RulesLoader
+
+RULES = """
+from kaizen.rules import Rules
+
+class FooRules(Rules):
+
+    name = "foo"
+    version = "1.0"
+"""
+
+
+class CommandRegistryTest(unittest.TestCase):
+
+    def test_commands(self):
+        for (name, path, description) in COMMANDS:
+            command = load_command(path)()
+            self.assertEqual(command.name, name)
+            self.assertEqual(command.description, description)
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rules_dir = os.path.join(self.tmp_dir, "rules")
+        os.makedirs(os.path.join(self.rules_dir, "foo"))
+        open(os.path.join(self.rules_dir, "foo", "__init__.py"), "w").close()
+        f = open(os.path.join(self.rules_dir, "foo", "rules.py"), "w")
+        f.write(RULES)
+        f.close()
+        self.rcfile = os.path.join(self.tmp_dir, "kaizenrc")
+        f = open(self.rcfile, "w")
+        f.write("[kaizen]\nprefix = %s\n" % os.path.join(self.tmp_dir,
+                                                          "prefix"))
+        f.close()
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.argv = sys.argv
+        self.stdout = sys.stdout
+        self.handlers = kaizen.logging.getRootLogger().handlers[:]
+
+    def tearDown(self):
+        sys.argv = self.argv
+        sys.stdout = self.stdout
+        kaizen.logging.getRootLogger().handlers = self.handlers
+        if "_instance" in Db.__dict__:
+            Db._instance.session.close()
+            del Db._instance
+        clear_mappers()
+        shutil.rmtree(self.tmp_dir)
+
+    def run_main(self, args):
+        sys.argv = ["kaizen"] + args
+        sys.stdout = StringIO()
+        main = Main()
+        main.main()
+        output = sys.stdout.getvalue()
+        sys.stdout = self.stdout
+        RulesLoader(main.config).invalidate()
+        return (main.config, output)
+
+    def test_global_options_before_command(self):
+        (config, output) = self.run_main(["--config", self.rcfile, "--rules",
+                                          self.rules_dir, "-v", "depends",
+                                          "foo"])
+        self.assertEqual(config.get("prefix"),
+                         os.path.join(self.tmp_dir, "prefix"))
+        self.assertEqual(config.get("rules"), [self.rules_dir])
+        self.assertTrue(config.get("verbose"))
+
+    def test_global_options_after_command(self):
+        (config, output) = self.run_main(["depends", "foo", "--config",
+                                          self.rcfile, "--rules",
+                                          self.rules_dir])
+        self.assertEqual(config.get("prefix"),
+                         os.path.join(self.tmp_dir, "prefix"))
+        self.assertFalse(config.get("verbose"))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  CommandRegistryTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(MainTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,104 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.db.db import Db, SqlitePragmas
+from kaizen.error import KaizenRuntimeError
+
+
+class DummyConfig(object):
+
+    def __init__(self):
+        self.dict = dict()
+        self.dict["rootdir"] = tempfile.mkdtemp()
+        self.dict["debugdb"] = False
+        self.dict["dbjournalmode"] = "wal"
+        self.dict["dbsynchronous"] = "normal"
+        self.dict["dbmmapsize"] = 0
+        self.dict["dbcachesize"] = -2000
+        self.dict["dbtempstore"] = "memory"
+
+    def get(self, value):
+        return self.dict[value]
+
+    def delete(self):
+        shutil.rmtree(self.dict["rootdir"])
+
+
+class SqlitePragmasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = DummyConfig()
+
+    def tearDown(self):
+        self.config.delete()
+
+    def test_applied(self):
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        db = Db(self.config)
+        try:
+            connection = db.session.connection()
+            self.assertEqual(connection.execute(
+                             "PRAGMA journal_mode").scalar(), "wal")
+            # 1 is normal
+            self.assertEqual(connection.execute(
+                             "PRAGMA synchronous").scalar(), 1)
+            self.assertEqual(connection.execute(
+                             "PRAGMA cache_size").scalar(), -2000)
+        finally:
+            db.session.close()
+            del Db._instance
+            clear_mappers()
+
+    def test_values(self):
+        self.config.dict["dbjournalmode"] = "WAL"
+        self.config.dict["dbmmapsize"] = ""
+        pragmas = SqlitePragmas(self.config).pragmas
+        self.assertTrue(("journal_mode", "wal") in pragmas)
+        self.assertFalse("mmap_size" in [name for (name, value) in pragmas])
+
+    def test_invalid_value(self):
+        self.config.dict["dbsynchronous"] = "always"
+        self.assertRaises(KaizenRuntimeError, SqlitePragmas, self.config)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  SqlitePragmasTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,130 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.db.db import Db
+from kaizen.db.objects import UpdateVersion, RulesPhase, InstallDirectories
+from kaizen.db.update.upgrade import Upgrade
+from kaizen.phase.phase import phases_list
+
+class DummyConfig(object):
+
+    def __init__(self):
+        root_dir = os.path.join(test_dir, "temp")
+        if not os.path.exists(root_dir):
+            os.makedirs(root_dir)
+        self.dict = dict()
+        self.dict["rootdir"] = root_dir
+        self.dict["debugdb"] = False
+        self.dict["dbjournalmode"] = "wal"
+        self.dict["dbsynchronous"] = "normal"
+        self.dict["dbmmapsize"] = 0
+        self.dict["dbcachesize"] = -2000
+        self.dict["dbtempstore"] = "memory"
+        self.dict["rules"] = [os.path.join(root_dir, "rules")]
+
+    def get(self, value):
+        return self.dict[value]
+
+    def delete(self):
+        shutil.rmtree(self.dict["rootdir"])
+
+
+class UpgradeTest(unittest.TestCase):
+
+    def setUp(self):
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.config = DummyConfig()
+        self.db = Db(self.config)
+
+    def tearDown(self):
+        self.db.session.close()
+        del Db._instance
+        clear_mappers()
+        self.config.delete()
+
+    def get_index_names(self):
+        inspector = Inspector.from_engine(self.db.get_engine())
+        names = []
+        for table in ["files", "directories", "phases"]:
+            names.extend([index["name"] for index in
+                          inspector.get_indexes(table)])
+        return names
+
+    def test_indexes_for_existing_db(self):
+        # simulate a database created before the indexes were added
+        for index in self.db.tables.indexes:
+            self.db.session.execute("DROP INDEX %s" % index.name)
+        self.db.session.query(UpdateVersion).delete()
+        self.db.session.commit()
+        self.assertFalse("ix_files_rules" in self.get_index_names())
+
+        Upgrade(self.config).run()
+
+        names = self.get_index_names()
+        for index in self.db.tables.indexes:
+            self.assertTrue(index.name in names)
+        self.assertTrue(self.db.session.query(UpdateVersion).filter(
+                        UpdateVersion.update == "indexes").first())
+
+    def test_indexes_for_new_db(self):
+        names = self.get_index_names()
+        for index in self.db.tables.indexes:
+            self.assertTrue(index.name in names)
+        # running the update for an already indexed database is a no-op
+        Upgrade(self.config).run()
+
+    def test_install_dirs_for_removed_rules(self):
+        self.db.session.query(UpdateVersion).delete()
+        self.db.session.add(RulesPhase("removed", "1.0-0",
+                                       phases_list.get("Downloaded")))
+        self.db.session.commit()
+
+        Upgrade(self.config).run()
+
+        # the failed update isn't recorded. Other updates are still applied.
+        applied = [update.update for update in
+                   self.db.session.query(UpdateVersion)]
+        self.assertEqual(applied, ["indexes"])
+        self.assertEqual(self.db.session.query(InstallDirectories).count(), 0)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(UpgradeTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
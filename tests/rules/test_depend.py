@@ -0,0 +1,156 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.rules.depend import DependencyResolver, DependencyAnalyser, \
+                               RuntimeDependencyAnalyser, SystemProvider
+from kaizen.rules.handler import RulesHandler
+from kaizen.rules.loader import RulesLoader
+
+RULES = """
+from kaizen.rules import Rules
+
+class %(classname)s(Rules):
+
+    name = "%(name)s"
+    version = "1.0"
+    depends = %(depends)r
+    runtime_depends = %(runtime_depends)r
+"""
+
+
+class CountingSystemProvider(SystemProvider):
+
+    loaded = 0
+
+    def load(self, filename=None):
+        CountingSystemProvider.loaded += 1
+        super(CountingSystemProvider, self).load(filename)
+
+
+class DependencyResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rules_dir = os.path.join(self.tmp_dir, "rules")
+        os.mkdir(self.rules_dir)
+        rcfile = os.path.join(self.tmp_dir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nprefix = %s\nrules = %s\n" % (
+                os.path.join(self.tmp_dir, "prefix"), self.rules_dir))
+        f.close()
+        self.config = Config([rcfile])
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.db = Db(self.config)
+        self.add_rules("app", ["lib", "tool"], ["data", "missing"])
+        self.add_rules("lib", ["base"])
+        self.add_rules("tool", ["base", "app"])
+        self.add_rules("base")
+        self.add_rules("data", [], ["base"])
+        self.systemprovider = CountingSystemProvider(self.config)
+        self.systemprovider.load()
+        self.systemprovider.add("system", "1.0")
+        self.add_rules("withsystem", ["system"])
+
+    def tearDown(self):
+        RulesLoader(self.config).invalidate()
+        self.db.session.close()
+        del Db._instance
+        clear_mappers()
+        shutil.rmtree(self.tmp_dir)
+
+    def add_rules(self, name, depends=[], runtime_depends=[]):
+        path = os.path.join(self.rules_dir, name)
+        os.mkdir(path)
+        open(os.path.join(path, "__init__.py"), "w").close()
+        f = open(os.path.join(path, "rules.py"), "w")
+        f.write(RULES % {"classname": name.capitalize(), "name": name,
+                         "depends": depends,
+                         "runtime_depends": runtime_depends})
+        f.close()
+
+    def names(self, dependencies):
+        return sorted([dependency.get_name() for dependency in dependencies])
+
+    def test_build_and_runtime(self):
+        handler = RulesHandler(self.config, "app")
+        resolver = DependencyResolver(self.config, handler,
+                                      self.systemprovider)
+        analyser = DependencyAnalyser(self.config, handler, resolver)
+        build = analyser.analyse()
+        self.assertEqual(self.names(build), ["lib", "tool"])
+        self.assertEqual(analyser.get_missing(), {})
+        lib = [dep for dep in build if dep.get_name() == "lib"][0]
+        tool = [dep for dep in build if dep.get_name() == "tool"][0]
+        self.assertEqual(self.names(lib.get_dependencies()), ["base"])
+        # the dependency on app itself is skipped
+        self.assertEqual(self.names(tool.get_dependencies()), ["base"])
+
+        analyser = RuntimeDependencyAnalyser(self.config, handler, resolver)
+        runtime = analyser.analyse()
+        self.assertEqual(self.names(runtime), ["data", "missing"])
+        self.assertEqual(analyser.get_missing().keys(), ["missing"])
+        data = [dep for dep in runtime if dep.get_name() == "data"][0]
+        base = data.get_dependencies()[0]
+        # both graphs share the handlers
+        self.assertTrue(base.rules is lib.get_dependencies()[0].rules)
+        self.assertTrue(resolver.get_handler("base") is base.rules)
+
+        # the results are reused
+        self.assertTrue(DependencyAnalyser(self.config, handler,
+                        resolver).analyse() is build)
+
+    def test_system_provider(self):
+        CountingSystemProvider.loaded = 0
+        handler = RulesHandler(self.config, "withsystem")
+        resolver = DependencyResolver(self.config, handler,
+                                      self.systemprovider)
+        build = DependencyAnalyser(self.config, handler, resolver).analyse()
+        RuntimeDependencyAnalyser(self.config, handler, resolver).analyse()
+        self.assertEqual(build[0].get_name(), "system")
+        self.assertEqual(build[0].get_version(), "1.0")
+        self.assertEqual(CountingSystemProvider.loaded, 0)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  DependencyResolverTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,94 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import sys
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.rules.depend import Dependency, DependencyEvaluator, \
+                               CyclicDependencies
+
+
+class DependencyEvaluatorTest(unittest.TestCase):
+
+    def create(self, graph):
+        """ graph is a dict of name -> list of names """
+        dependencies = dict([(name, Dependency(name)) for name in graph])
+        for (name, names) in graph.items():
+            dependencies[name].add_dependencies([dependencies[dep] for dep in
+                                                 names])
+        return dependencies
+
+    def names(self, dependencies):
+        return [dependency.get_name() for dependency in dependencies]
+
+    def test_order(self):
+        deps = self.create({"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": [],
+                            "e": ["a", "d"]})
+        evaluator = DependencyEvaluator([deps["e"], deps["c"]])
+        self.assertEqual(self.names(evaluator.list()),
+                         ["d", "b", "c", "a", "e"])
+        self.assertEqual(self.names(DependencyEvaluator([deps["c"],
+                         deps["e"]]).list()), ["d", "c", "b", "a", "e"])
+        self.assertEqual([self.names(level) for level in
+                          evaluator.get_levels()],
+                         [["d"], ["b", "c"], ["a"], ["e"]])
+
+    def test_empty(self):
+        self.assertEqual(DependencyEvaluator([]).list(), [])
+
+    def test_same_name(self):
+        first = Dependency("a")
+        second = Dependency("a")
+        second.add_dependency(Dependency("b"))
+        self.assertEqual(DependencyEvaluator([first, second]).list(),
+                         [first])
+
+    def test_cycle(self):
+        deps = self.create({"a": ["b"], "b": ["c"], "c": ["d", "b"],
+                            "d": []})
+        try:
+            DependencyEvaluator([deps["a"]]).list()
+            self.fail("CyclicDependencies not raised")
+        except CyclicDependencies, e:
+            self.assertEqual(e.cycle, ["b", "c", "b"])
+
+    def test_deep(self):
+        dependencies = [Dependency("dep%d" % i) for i in range(5000)]
+        for i in range(1, len(dependencies)):
+            dependencies[i].add_dependency(dependencies[i - 1])
+        self.assertEqual(len(DependencyEvaluator(
+                         [dependencies[-1]]).get_levels()), 5000)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  DependencyEvaluatorTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
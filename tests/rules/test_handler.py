@@ -0,0 +1,392 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.db.objects import InstallDirectories, Activation, DirectoryLink, \
+                              File, Directory, RulesPhase
+from kaizen.phase.phase import phases_list
+from kaizen.rules.handler import RulesHandler
+from kaizen.rules.index import RulesIndex
+from kaizen.rules.loader import RulesLoader
+from kaizen.rules.manager import RulesManager
+
+RULES = """
+import os
+
+from kaizen.rules import Rules
+
+class TestRules(Rules):
+
+    name = "%s"
+    version = "1.0"
+"""
+
+EXTRACT_RULES = """
+    class extract_cmd(object):
+
+        def __init__(self, url):
+            self.url = url
+
+        def extract(self, src_dir, dest_dir):
+            os.makedirs(dest_dir)
+            open(os.path.join(dest_dir, "extracted"), "w").close()
+"""
+
+
+class RulesHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rules_dir = os.path.join(self.tmp_dir, "rules")
+        for name in ["foo", "bar", "baz"]:
+            os.makedirs(os.path.join(self.rules_dir, name))
+            open(os.path.join(self.rules_dir, name, "__init__.py"),
+                 "w").close()
+            f = open(os.path.join(self.rules_dir, name, "rules.py"), "w")
+            f.write(RULES % name)
+            f.close()
+        rcfile = os.path.join(self.tmp_dir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nprefix = %s\nrules = %s\n" % (
+                os.path.join(self.tmp_dir, "prefix"), self.rules_dir))
+        f.close()
+        self.config = Config([rcfile])
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.db = Db(self.config)
+        RulesLoader(self.config).invalidate()
+        RulesIndex(self.config).update()
+
+    def tearDown(self):
+        RulesLoader(self.config).invalidate()
+        self.db.session.close()
+        del Db._instance
+        clear_mappers()
+        shutil.rmtree(self.tmp_dir)
+
+    def count_install_directories(self):
+        return self.db.session.query(InstallDirectories).count()
+
+    def create_files(self, handler, files):
+        for file in files:
+            filename = handler.dest_dir + self.config.get("prefix") + "/" + \
+                       file
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            open(filename, "w").close()
+
+    def test_lazy(self):
+        manager = RulesManager(self.config, "foo")
+        handler = manager.handler
+        self.assertEqual(manager.get_installed_files(), [])
+        self.assertEqual(manager.get_rules_phases(), [])
+        self.assertEqual(handler.get_version(), "1.0-0")
+        self.assertEqual(handler.get_download_file(), None)
+        self.assertEqual(handler._rules_class, None)
+        self.assertFalse("download_seq" in handler.__dict__)
+        self.assertEqual(self.count_install_directories(), 0)
+
+    def test_init_on_use(self):
+        handler = RulesHandler(self.config, "foo")
+        self.assertEqual(handler.src_dir, os.path.join(
+                         self.config.get("buildroot"), "foo", "1.0-0",
+                         "source"))
+        self.assertTrue(handler.extract_seq.pre_sequence is
+                        handler.download_seq)
+        self.assertEqual(handler.install_directories.version, "1.0-0")
+        self.assertEqual(self.count_install_directories(), 1)
+        self.assertRaises(AttributeError, getattr, handler, "missing")
+
+    def test_set_phase(self):
+        handler = RulesHandler(self.config, "foo")
+        downloaded = phases_list.get("Downloaded")
+        handler.set_phase(downloaded)
+        handler.set_phase(downloaded)
+        self.assertEqual(handler.get_phases(), [downloaded])
+        self.assertEqual(self.db.session.query(RulesPhase).count(), 1)
+
+        # a fresh handler loads the persisted phases
+        self.assertEqual(RulesHandler(self.config, "foo").get_phases(),
+                         [downloaded])
+
+    def test_unset_phase(self):
+        handler = RulesHandler(self.config, "foo")
+        downloaded = phases_list.get("Downloaded")
+        handler.set_phase(downloaded)
+        handler.unset_phase(phases_list.get("Extracted"))
+        self.assertEqual(handler.get_phases(), [downloaded])
+        self.assertEqual(self.db.session.query(RulesPhase).count(), 1)
+        handler.unset_phase(downloaded)
+        self.assertEqual(handler.get_phases(), [])
+        self.assertEqual(RulesHandler(self.config, "foo").get_phases(), [])
+
+    def test_check_phases(self):
+        downloaded = phases_list.get("Downloaded")
+        extracted = phases_list.get("Extracted")
+        patched = phases_list.get("Patched")
+        handler = RulesHandler(self.config, "foo")
+        self.assertEqual(handler.get_phases(), [])
+        # another handler changes the phases behind the cache of handler
+        RulesHandler(self.config, "foo").set_phase(downloaded)
+        handler.set_phase(extracted)
+        self.assertEqual(handler.get_phases(), [extracted])
+
+        self.config.config["checkphases"] = True
+        handler.set_phase(patched)
+        self.assertEqual(sorted(handler.get_phases()),
+                         [downloaded, extracted, patched])
+
+    def test_extract_cmd(self):
+        f = open(os.path.join(self.rules_dir, "foo", "rules.py"), "a")
+        f.write(EXTRACT_RULES)
+        f.close()
+        RulesLoader(self.config).invalidate()
+        handler = RulesHandler(self.config, "foo")
+        handler.extract()
+        self.assertTrue(os.path.exists(os.path.join(handler.src_dir,
+                                                    "extracted")))
+
+    def test_activation_strategy(self):
+        self.config.config["activation"] = "hardlink"
+        handler = RulesHandler(self.config, "foo")
+        filename = handler.dest_dir + self.config.get("prefix") + "/bin/foo"
+        os.makedirs(os.path.dirname(filename))
+        open(filename, "w").close()
+        handler.activate()
+        path = os.path.join(self.config.get("prefix"), "bin", "foo")
+        self.assertFalse(os.path.islink(path))
+        self.assertTrue(os.path.samefile(path, filename))
+        self.assertEqual(self.db.session.query(Activation).get("foo").strategy,
+                         "hardlink")
+
+        # deactivation uses the recorded strategy
+        self.config.config["activation"] = "symlink"
+        handler.deactivate()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.db.session.query(Activation).count(), 0)
+
+    def test_deactivate_modified_clone(self):
+        self.config.config["activation"] = "reflink"
+        prefix = self.config.get("prefix")
+        handler = RulesHandler(self.config, "foo")
+        self.create_files(handler, ["bin/foo", "etc/foo.conf"])
+        handler.activate()
+        modified = os.path.join(prefix, "etc", "foo.conf")
+        f = open(modified, "w")
+        f.write("changed")
+        f.close()
+        handler.deactivate()
+        self.assertFalse(os.path.exists(os.path.join(prefix, "bin", "foo")))
+        self.assertTrue(os.path.exists(modified))
+        self.assertEqual(open(modified).read(), "changed")
+
+    def test_deactivate_after_version_bump(self):
+        self.config.config["activation"] = "hardlink"
+        prefix = self.config.get("prefix")
+        handler = RulesHandler(self.config, "foo")
+        self.create_files(handler, ["bin/foo", "etc/foo.conf"])
+        handler.activate()
+        modified = os.path.join(prefix, "etc", "foo.conf")
+        os.remove(modified)
+        f = open(modified, "w")
+        f.write("changed")
+        f.close()
+
+        rules_file = os.path.join(self.rules_dir, "foo", "rules.py")
+        f = open(rules_file, "w")
+        f.write(RULES.replace("1.0", "2.0") % "foo")
+        f.close()
+        mtime = os.path.getmtime(rules_file) + 10
+        os.utime(rules_file, (mtime, mtime))
+        RulesLoader(self.config).invalidate()
+        RulesIndex(self.config).update()
+        handler = RulesHandler(self.config, "foo")
+        self.assertEqual(handler.get_version(), "2.0-0")
+        handler.deactivate()
+        self.assertFalse(os.path.exists(os.path.join(prefix, "bin", "foo")))
+        self.assertEqual(open(modified).read(), "changed")
+
+    def test_shared_file(self):
+        path = os.path.join(self.config.get("prefix"), "bin", "tool")
+        foo = RulesHandler(self.config, "foo")
+        self.create_files(foo, ["bin/tool"])
+        foo.activate()
+        bar = RulesHandler(self.config, "bar")
+        self.create_files(bar, ["bin/tool"])
+        self.assertEqual(bar._check_installed_files([path]), [(path, "foo")])
+        self.assertEqual(foo._check_installed_files([path]), [])
+
+        # the second activation replaces the file and takes over its row
+        bar.activate()
+        self.assertEqual(os.readlink(path), os.path.join(
+                         bar.destroot_dir, "current", path[1:]))
+        self.assertEqual([(file.filename, file.rules) for file in
+                          self.db.session.query(File)], [(path, "bar")])
+        self.assertEqual(foo._check_installed_files([path]), [(path, "bar")])
+
+    def test_deactivate_nested_directories(self):
+        prefix = self.config.get("prefix")
+        foo = RulesHandler(self.config, "foo")
+        # more files than fetched in one batch by get_installed_filenames
+        files = ["lib/plugins/%d/%d/plugin%d.so" % (i % 3, i % 7, i) for i in
+                 range(1100)]
+        self.create_files(foo, files + ["share/foo/data",
+                                        "share/icons/foo.png"])
+        foo.activate()
+        self.assertEqual(len(list(foo.get_installed_filenames(100))), 1102)
+        # a file of someone else keeps its directory
+        foreign = os.path.join(prefix, "lib", "plugins", "0", "0", "foreign")
+        open(foreign, "w").close()
+
+        foo.deactivate()
+        self.assertEqual(list(foo.get_installed_filenames()), [])
+        self.assertEqual(self.db.session.query(File).count(), 0)
+        self.assertEqual(self.db.session.query(Directory).count(), 0)
+        self.assertEqual(os.listdir(os.path.join(prefix, "lib", "plugins",
+                                                 "0")), ["0"])
+        self.assertEqual(os.listdir(os.path.join(prefix, "lib", "plugins",
+                                                 "0", "0")), ["foreign"])
+        self.assertEqual(os.listdir(os.path.join(prefix, "lib", "plugins",
+                                                 "1")), [])
+        # share is recorded as the parent of the linked directory share/foo
+        # and is empty after share/icons has been removed
+        self.assertFalse(os.path.exists(os.path.join(prefix, "share")))
+
+    def test_link_directories(self):
+        prefix = self.config.get("prefix")
+        foo = RulesHandler(self.config, "foo")
+        self.create_files(foo, ["bin/foo", "share/doc/foo/README"])
+        foo.activate()
+        doc_dir = os.path.join(prefix, "share", "doc")
+        foo_dir = os.path.join(doc_dir, "foo")
+        self.assertFalse(os.path.islink(doc_dir))
+        self.assertTrue(os.path.islink(foo_dir))
+        self.assertEqual(sorted([file.filename for file in
+                                 foo.get_installed_files()]),
+                         [os.path.join(prefix, "bin", "foo"), foo_dir])
+
+        # bar installs into the linked directory of foo
+        bar = RulesHandler(self.config, "bar")
+        self.create_files(bar, ["share/doc/bar/README",
+                                "share/doc/foo/bar.txt"])
+        bar.activate()
+        self.assertFalse(os.path.islink(foo_dir))
+        self.assertTrue(os.path.islink(os.path.join(foo_dir, "README")))
+        self.assertTrue(os.path.islink(os.path.join(foo_dir, "bar.txt")))
+        self.assertTrue(os.path.islink(os.path.join(doc_dir, "bar")))
+        self.assertEqual([link.directory for link in
+                          self.db.session.query(DirectoryLink)],
+                         [os.path.join(doc_dir, "bar")])
+
+        foo.deactivate()
+        self.assertFalse(os.path.lexists(os.path.join(foo_dir, "README")))
+        bar.deactivate()
+        self.assertFalse(os.path.exists(doc_dir))
+        self.assertEqual(self.db.session.query(DirectoryLink).count(), 0)
+
+    def test_unfold_directory_once(self):
+        prefix = self.config.get("prefix")
+        foo_dir = os.path.join(prefix, "share", "foo")
+        foo = RulesHandler(self.config, "foo")
+        self.create_files(foo, ["share/foo/README"])
+        foo.activate()
+        self.assertEqual([(link.directory, link.rules) for link in
+                          self.db.session.query(DirectoryLink)],
+                         [(foo_dir, "foo")])
+
+        # bar unfolds the linked directory of foo. baz installs into the
+        # unfolded directory and finds no link to unfold anymore.
+        bar = RulesHandler(self.config, "bar")
+        self.create_files(bar, ["share/foo/bar.txt"])
+        bar.activate()
+        self.assertEqual(self.db.session.query(DirectoryLink).count(), 0)
+        baz = RulesHandler(self.config, "baz")
+        self.create_files(baz, ["share/foo/baz.txt"])
+        unfolded = []
+        baz._unfold_directory = lambda link, rollback_log: \
+                                unfolded.append(link.directory)
+        baz.activate()
+        self.assertEqual(unfolded, [])
+        self.assertEqual(sorted(os.listdir(foo_dir)),
+                         ["README", "bar.txt", "baz.txt"])
+        self.assertEqual(sorted([(file.filename, file.rules) for file in
+                                 self.db.session.query(File)]),
+                         [(os.path.join(foo_dir, "README"), "foo"),
+                          (os.path.join(foo_dir, "bar.txt"), "bar"),
+                          (os.path.join(foo_dir, "baz.txt"), "baz")])
+
+        foo.deactivate()
+        bar.deactivate()
+        baz.deactivate()
+        self.assertFalse(os.path.exists(foo_dir))
+
+    def test_write_into_linked_directory(self):
+        prefix = self.config.get("prefix")
+        foo = RulesHandler(self.config, "foo")
+        self.create_files(foo, ["share/info/foo.info",
+                                "lib/pkgconfig/foo.pc",
+                                "lib/python2.7/foo.py",
+                                "share/foo/data"])
+        foo.activate()
+        self.assertEqual([link.directory for link in
+                          self.db.session.query(DirectoryLink)],
+                         [os.path.join(prefix, "share", "foo")])
+        # shared directories are real directories. Files written into them
+        # later don't end up in the destroot of foo.
+        for subdir in ["share/info", "lib/pkgconfig", "lib/python2.7"]:
+            directory = os.path.join(prefix, subdir)
+            self.assertFalse(os.path.islink(directory))
+            open(os.path.join(directory, "other"), "w").close()
+            self.assertFalse(os.path.exists(os.path.join(
+                             foo.dest_dir + prefix, subdir, "other")))
+        foo.deactivate()
+        for subdir in ["share/info", "lib/pkgconfig", "lib/python2.7"]:
+            self.assertTrue(os.path.exists(os.path.join(prefix, subdir,
+                                                        "other")))
+        self.assertFalse(os.path.lexists(os.path.join(prefix, "share",
+                                                      "foo")))
+
+    def test_manager_sequences(self):
+        manager = RulesManager(self.config, "foo")
+        self.assertTrue(manager.install_seq is manager.handler.activate_seq)
+        self.assertRaises(AttributeError, getattr, manager, "missing_seq")
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(RulesHandlerTest)
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,151 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.rules.index import RulesIndex
+from kaizen.rules.loader import RulesLoader
+
+RULES = """
+from kaizen.rules import Rules
+
+class %(classname)s(Rules):
+
+    name = "%(name)s"
+    version = "%(version)s"
+    revision = "2"
+    depends = %(depends)r
+    url = "http://example.org/%%(name)s-%%(version)s.tar.gz?%%(prefix)s"
+    hash = {"md5": "abc"}
+"""
+
+
+class RulesIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rules_dir = os.path.join(self.tmp_dir, "rules")
+        os.mkdir(self.rules_dir)
+        rcfile = os.path.join(self.tmp_dir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nprefix = %s\nrules = %s\n" % (
+                os.path.join(self.tmp_dir, "prefix"), self.rules_dir))
+        f.close()
+        self.config = Config([rcfile])
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.db = Db(self.config)
+        self.add_rules("foo", "1.0", ["bar", ("baz", "2.0")])
+        self.add_rules("bar", "0.1")
+
+    def tearDown(self):
+        RulesLoader(self.config).invalidate()
+        self.db.session.close()
+        del Db._instance
+        clear_mappers()
+        shutil.rmtree(self.tmp_dir)
+
+    def add_rules(self, name, version, depends=[]):
+        path = os.path.join(self.rules_dir, name)
+        if not os.path.exists(path):
+            os.mkdir(path)
+            open(os.path.join(path, "__init__.py"), "w").close()
+        filename = os.path.join(path, "rules.py")
+        f = open(filename, "w")
+        f.write(RULES % {"classname": name.capitalize(), "name": name,
+                         "version": version, "depends": depends})
+        f.close()
+        return filename
+
+    def test_update(self):
+        index = RulesIndex(self.config)
+        self.assertEqual(index.get("foo"), None)
+        self.assertEqual(index.update(), (["bar", "foo"], []))
+        values = index.get("foo")
+        self.assertEqual(values["version"], "1.0")
+        self.assertEqual(values["url"], "http://example.org/foo-1.0.tar.gz?" +
+                         self.config.get("prefix"))
+        self.assertEqual(values["hash"], {"md5": "abc"})
+        self.assertEqual(index.get_dist_version("bar"), "0.1-2")
+        self.assertEqual(set(index.get_depends("foo", ["depends",
+                             "runtime_depends"])), set(["bar", ("baz", "2.0")]))
+        # nothing changed
+        self.assertEqual(index.update(), ([], []))
+        self.assertEqual(index.update(True), (["bar", "foo"], []))
+
+    def test_modified(self):
+        index = RulesIndex(self.config)
+        index.update()
+        filename = self.add_rules("bar", "0.2")
+        mtime = os.path.getmtime(filename) + 10
+        os.utime(filename, (mtime, mtime))
+        self.assertEqual(index.get("bar"), None)
+        self.assertEqual(index.update(), (["bar"], []))
+        self.assertEqual(index.get_dist_version("bar"), "0.2-2")
+
+    def test_modified_module(self):
+        index = RulesIndex(self.config)
+        index.update()
+        filename = os.path.join(self.rules_dir, "bar", "helpers.py")
+        open(filename, "w").close()
+        mtime = os.path.getmtime(filename) + 10
+        os.utime(filename, (mtime, mtime))
+        self.assertEqual(index.get("bar"), None)
+        self.assertEqual(index.update(), (["bar"], []))
+        self.assertNotEqual(index.get("bar"), None)
+
+    def test_changed_config(self):
+        index = RulesIndex(self.config)
+        index.update()
+        self.config.config["prefix"] = "/opt/other"
+        self.assertEqual(index.get("foo")["url"],
+                         "http://example.org/foo-1.0.tar.gz?/opt/other")
+
+    def test_removed(self):
+        index = RulesIndex(self.config)
+        index.update()
+        shutil.rmtree(os.path.join(self.rules_dir, "bar"))
+        self.assertEqual(index.get("bar"), None)
+        self.assertEqual(index.update(), ([], ["bar"]))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  RulesIndexTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
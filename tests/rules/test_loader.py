@@ -0,0 +1,90 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.rules.loader import RulesLoader
+
+RULES = """
+from kaizen.rules import Rules
+
+class TestRules(Rules):
+
+    name = "test"
+    version = "1.0"
+"""
+
+
+class RulesLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rules_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.rules_dir, "test"))
+        open(os.path.join(self.rules_dir, "test", "__init__.py"), "w").close()
+        self.rules_file = os.path.join(self.rules_dir, "test", "rules.py")
+        f = open(self.rules_file, "w")
+        f.write(RULES)
+        f.close()
+        self.config = {"rules": [self.rules_dir]}
+        RulesLoader(self.config).invalidate()
+
+    def tearDown(self):
+        RulesLoader(self.config).invalidate()
+        shutil.rmtree(self.rules_dir)
+
+    def test_cached(self):
+        rules = RulesLoader(self.config).load("test")
+        self.assertEqual(rules.version, "1.0")
+        self.assertTrue(RulesLoader(self.config).load("test") is rules)
+
+    def test_modified(self):
+        rules = RulesLoader(self.config).load("test")
+        mtime = os.path.getmtime(self.rules_file) + 10
+        os.utime(self.rules_file, (mtime, mtime))
+        self.assertFalse(RulesLoader(self.config).load("test") is rules)
+
+    def test_invalidate(self):
+        loader = RulesLoader(self.config)
+        rules = loader.load("test")
+        loader.invalidate("test")
+        self.assertFalse(loader.load("test") is rules)
+
+    def test_not_found(self):
+        self.assertEqual(RulesLoader(self.config).load("missing"), None)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  RulesLoaderTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
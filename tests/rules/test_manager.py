@@ -0,0 +1,152 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import hashlib
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from sqlalchemy.orm import clear_mappers
+
+from kaizen.cli.console import Console
+from kaizen.config import Config
+from kaizen.db.db import Db
+from kaizen.error import KaizenRuntimeError
+from kaizen.rules.index import RulesIndex
+from kaizen.rules.loader import RulesLoader
+from kaizen.rules.manager import RulesManager, DownloadResult
+from kaizen.system.download import DownloaderHashError
+
+RULES = """
+from kaizen.rules import Rules
+
+class TestRules(Rules):
+
+    name = "%s"
+    version = "1.0"
+    depends = %r
+    url = "http://127.0.0.1:%d/%s-1.0.tar.gz"
+    hash = {"md5": "%s"}
+"""
+
+
+class SourceRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        data = "source of %s" % self.path[1:].split("-")[0]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rules_dir = os.path.join(self.tmp_dir, "rules")
+        rcfile = os.path.join(self.tmp_dir, "kaizenrc")
+        f = open(rcfile, "w")
+        f.write("[kaizen]\nprefix = %s\nrules = %s\n" % (
+                os.path.join(self.tmp_dir, "prefix"), self.rules_dir))
+        f.close()
+        self.config = Config([rcfile])
+        # Db is a singleton. Use a new instance for the temporary database.
+        if "_instance" in Db.__dict__:
+            del Db._instance
+        self.db = Db(self.config)
+        self.server = HTTPServer(("127.0.0.1", 0), SourceRequestHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        RulesLoader(self.config).invalidate()
+        self.db.session.close()
+        del Db._instance
+        clear_mappers()
+        shutil.rmtree(self.tmp_dir)
+
+    def create_rules(self, name, depends=[], valid=True):
+        rules_dir = os.path.join(self.rules_dir, name)
+        os.makedirs(rules_dir)
+        open(os.path.join(rules_dir, "__init__.py"), "w").close()
+        hash = hashlib.md5("source of %s" % name).hexdigest()
+        if not valid:
+            hash = "0" * 32
+        f = open(os.path.join(rules_dir, "rules.py"), "w")
+        f.write(RULES % (name, depends, self.server.server_address[1], name,
+                         hash))
+        f.close()
+
+    def init_rules(self):
+        RulesLoader(self.config).invalidate()
+        RulesIndex(self.config).update()
+
+    def test_download(self):
+        self.create_rules("foo")
+        self.init_rules()
+        manager = RulesManager(self.config, "foo")
+        self.assertEqual(manager.download()[0].status,
+                         DownloadResult.DOWNLOADED)
+        manager = RulesManager(self.config, "foo")
+        self.assertEqual(manager.download()[0].status,
+                         DownloadResult.PRESENT)
+
+    def test_failed_dependency(self):
+        self.create_rules("foo", ["bar"])
+        self.create_rules("bar", valid=False)
+        self.init_rules()
+        results = RulesManager(self.config, "foo").download(True)
+        self.assertEqual([(result.name, result.status) for result in
+                          results], [("bar", DownloadResult.FAILED),
+                                     ("foo", DownloadResult.DOWNLOADED)])
+        self.assertRaises(KaizenRuntimeError, Console(self.config)
+                          .download_rules, "foo", True)
+
+    def test_failed_rules(self):
+        self.create_rules("foo", ["bar"], valid=False)
+        self.create_rules("bar")
+        self.init_rules()
+        self.assertRaises(DownloaderHashError, Console(self.config)
+                          .download_rules, "foo", True)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(DownloadTest)
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
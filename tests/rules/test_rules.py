@@ -0,0 +1,118 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.rules.loader import RulesLoader
+
+RULES = """
+from kaizen.rules import Rules
+
+class TestRules(Rules):
+
+    name = "test"
+    version = "1.0"
+    url = "http://example.org/%(name)s-%(version)s.tar.gz"
+    configure_args = ["--prefix=%(prefix)s"]
+    depends = ["a"]
+"""
+
+
+class RulesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rules_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.rules_dir, "test"))
+        open(os.path.join(self.rules_dir, "test", "__init__.py"), "w").close()
+        f = open(os.path.join(self.rules_dir, "test", "rules.py"), "w")
+        f.write(RULES)
+        f.close()
+        self.config = {"rules": [self.rules_dir], "prefix": "/usr",
+                       "rootdir": self.rules_dir,
+                       "destroot": os.path.join(self.rules_dir, "destroot")}
+        RulesLoader(self.config).invalidate()
+        rules_class = RulesLoader(self.config).load("test")
+        self.rules = rules_class(self.config, self.rules_dir,
+                                 self.rules_dir, self.rules_dir)
+
+    def tearDown(self):
+        RulesLoader(self.config).invalidate()
+        shutil.rmtree(self.rules_dir)
+
+    def test_substitution(self):
+        self.assertEqual(self.rules.url,
+                         "http://example.org/test-1.0.tar.gz")
+        self.assertEqual(self.rules.configure_args, ["--prefix=/usr"])
+        self.assertTrue(self.rules.url is self.rules.url)
+
+    def test_vars_changed(self):
+        self.assertEqual(self.rules.url,
+                         "http://example.org/test-1.0.tar.gz")
+        self.rules.vars["version"] = "2.0"
+        self.assertEqual(self.rules.url,
+                         "http://example.org/test-2.0.tar.gz")
+
+    def test_attribute_changed(self):
+        self.assertEqual(self.rules.url,
+                         "http://example.org/test-1.0.tar.gz")
+        self.rules.url = "http://example.com/%(name)s.tar.gz"
+        self.assertEqual(self.rules.url, "http://example.com/test.tar.gz")
+
+    def test_depends(self):
+        depends = self.rules.depends
+        self.assertEqual(depends, ["a"])
+        depends.append("b")
+        self.assertEqual(self.rules.depends, ["a"])
+        self.rules.depends = ["c"]
+        self.assertEqual(self.rules.depends, ["c"])
+
+    def test_list_copy(self):
+        configure_args = self.rules.configure_args
+        configure_args.append("--enable-foo")
+        self.assertEqual(self.rules.configure_args, ["--prefix=/usr"])
+
+    def test_vars_changes(self):
+        vars = self.rules.vars
+        changes = vars.changes
+        self.assertEqual(vars.pop("missing", None), None)
+        self.assertRaises(KeyError, vars.pop, "missing")
+        self.assertEqual(vars.setdefault("prefix"), "/usr")
+        self.assertEqual(vars.changes, changes)
+        vars.pop("prefix")
+        self.assertEqual(vars.changes, changes + 1)
+        vars.setdefault("prefix", "/opt")
+        self.assertEqual(vars.changes, changes + 2)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(RulesTest)
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
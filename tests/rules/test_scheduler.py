@@ -0,0 +1,124 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os.path
+import sys
+import threading
+import time
+import traceback
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.rules.depend import Dependency, SystemDependency
+from kaizen.rules.scheduler import DependencyScheduler
+
+
+class DummyConfig(object):
+
+    def __init__(self, buildjobs, installjobs):
+        self.dict = dict()
+        self.dict["buildjobs"] = buildjobs
+        self.dict["installjobs"] = installjobs
+
+    def get(self, value):
+        return self.dict[value]
+
+
+class DummyDependency(Dependency):
+
+    def __init__(self, name, dependencies=[]):
+        super(DummyDependency, self).__init__(name, None, Dependency.SESSION)
+        self.add_dependencies(dependencies)
+
+
+class DependencySchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        # a <- c, b <- c, c <- d and a system dependency for a
+        self.a = DummyDependency("a", [SystemDependency("zlib")])
+        self.b = DummyDependency("b")
+        self.c = DummyDependency("c", [self.a, self.b])
+        self.d = DummyDependency("d", [self.c])
+        self.lock = threading.Lock()
+        self.started = []
+        self.finished = []
+
+    def install(self, dependency):
+        with self.lock:
+            self.started.append(dependency.get_name())
+        time.sleep(0.05)
+        with self.lock:
+            self.finished.append(dependency.get_name())
+
+    def test_serial(self):
+        scheduler = DependencyScheduler(DummyConfig(4, 1), [self.d])
+        scheduler.run(self.install)
+        self.assertEqual(self.started, ["a", "b", "c", "d"])
+        self.assertEqual(scheduler.get_buildjobs(), 4)
+
+    def test_parallel(self):
+        scheduler = DependencyScheduler(DummyConfig(4, 2), [self.d])
+        scheduler.run(self.install)
+        self.assertEqual(scheduler.get_buildjobs(), 2)
+        self.assertEqual(sorted(self.started[:2]), ["a", "b"])
+        self.assertEqual(self.finished[2:], ["c", "d"])
+
+    def test_jobs_limited_by_buildjobs(self):
+        scheduler = DependencyScheduler(DummyConfig(2, 8), [self.d])
+        self.assertEqual(scheduler.jobs, 2)
+        self.assertEqual(scheduler.get_buildjobs(), 1)
+
+    def test_error(self):
+        def install(dependency):
+            self.install(dependency)
+            if dependency.get_name() == "b":
+                raise ValueError("b failed")
+        scheduler = DependencyScheduler(DummyConfig(4, 2), [self.d])
+        self.assertRaises(ValueError, scheduler.run, install)
+        self.assertFalse("c" in self.started)
+        self.assertFalse("d" in self.started)
+
+    def test_error_traceback(self):
+        def fail_b(dependency):
+            if dependency.get_name() == "b":
+                raise ValueError("b failed")
+        scheduler = DependencyScheduler(DummyConfig(4, 2), [self.d])
+        try:
+            scheduler.run(fail_b)
+        except ValueError:
+            functions = [entry[2] for entry in
+                         traceback.extract_tb(sys.exc_info()[2])]
+            self.assertEqual(functions[-1], "fail_b")
+        else:
+            self.fail("ValueError not raised")
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  DependencySchedulerTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,129 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+import kaizen.system.activate
+
+from kaizen.system.activate import ActivationPlan, RollbackLog, \
+                                   ActivationError, HARDLINK, REFLINK
+
+
+class ActivationPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.tmp_dir, "prefix")
+        os.makedirs(os.path.join(self.prefix, "bin"))
+        self.log_file = os.path.join(self.tmp_dir, "activate.log")
+        self.files = [(os.path.join(self.prefix, "bin", "foo"), "/dest/foo"),
+                      (os.path.join(self.prefix, "share", "foo", "a"),
+                       "/dest/a"),
+                      (os.path.join(self.prefix, "share", "foo", "b"),
+                       "/dest/b")]
+        os.symlink("/other/foo", self.files[0][0])
+        self.libc = kaizen.system.activate._libc
+
+    def tearDown(self):
+        kaizen.system.activate._libc = self.libc
+        shutil.rmtree(self.tmp_dir)
+
+    def test_batches(self):
+        plan = ActivationPlan(self.files)
+        self.assertEqual(plan.get_directories(), [
+                         os.path.join(self.prefix, "bin"),
+                         os.path.join(self.prefix, "share", "foo")])
+        self.assertEqual(len(plan.get_batches()), 2)
+
+    def run_plan(self):
+        rollback_log = RollbackLog(self.log_file)
+        ActivationPlan(self.files).run(rollback_log, 2)
+        rollback_log.close()
+        for (path, target) in self.files:
+            self.assertEqual(os.readlink(path), target)
+
+        # undo with a new log like after an interrupted activation
+        RollbackLog(self.log_file).rollback()
+        self.assertEqual(os.readlink(self.files[0][0]), "/other/foo")
+        self.assertFalse(os.path.exists(os.path.join(self.prefix, "share")))
+        self.assertFalse(os.path.exists(self.log_file))
+
+    def test_run(self):
+        self.run_plan()
+
+    def test_run_without_symlinkat(self):
+        kaizen.system.activate._libc = None
+        self.run_plan()
+
+    def run_clone_plan(self, strategy):
+        dest_dir = os.path.join(self.tmp_dir, "dest")
+        os.makedirs(dest_dir)
+        files = []
+        for (path, target) in self.files:
+            source = os.path.join(dest_dir, os.path.basename(target))
+            f = open(source, "w")
+            f.write(path)
+            f.close()
+            files.append((path, source))
+        os.symlink("a", os.path.join(dest_dir, "liba.so"))
+        files.append((os.path.join(self.prefix, "lib", "liba.so"),
+                      os.path.join(dest_dir, "liba.so")))
+
+        rollback_log = RollbackLog(self.log_file)
+        ActivationPlan(files, strategy).run(rollback_log, 2)
+        rollback_log.close()
+        for (path, source) in files[:-1]:
+            self.assertFalse(os.path.islink(path))
+            self.assertEqual(open(path).read(), path)
+        self.assertEqual(os.readlink(files[-1][0]), "a")
+        if strategy == HARDLINK:
+            self.assertTrue(os.path.samefile(files[1][0], files[1][1]))
+
+        RollbackLog(self.log_file).rollback()
+        self.assertEqual(os.readlink(self.files[0][0]), "/other/foo")
+        self.assertFalse(os.path.exists(os.path.join(self.prefix, "share")))
+        self.assertFalse(os.path.exists(os.path.join(self.prefix, "lib")))
+
+    def test_run_hardlink(self):
+        self.run_clone_plan(HARDLINK)
+
+    def test_run_reflink(self):
+        # copies the files if the filesystem doesn't support reflinks
+        self.run_clone_plan(REFLINK)
+
+    def test_invalid_strategy(self):
+        self.assertRaises(ActivationError, ActivationPlan, self.files, "copy")
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(ActivationPlanTest)
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
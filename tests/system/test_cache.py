@@ -0,0 +1,135 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.system.cache import SourceCache, SourceCacheError
+
+
+class SourceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = {"sourcecache": os.path.join(self.tmp_dir, "cache"),
+                       "sourcecachesize": 1000,
+                       "sourcecacheclone": "copy"}
+        self.src_dir = os.path.join(self.tmp_dir, "src")
+        os.makedirs(os.path.join(self.src_dir, "source", "include"))
+        self.write(os.path.join(self.src_dir, "source", "include", "a.h"),
+                   "a" * 100)
+        os.symlink("include/a.h", os.path.join(self.src_dir, "source", "b.h"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, filename, data):
+        f = open(filename, "w")
+        f.write(data)
+        f.close()
+
+    def assertRestored(self, dest_dir):
+        f = open(os.path.join(dest_dir, "source", "b.h"))
+        self.assertEqual(f.read(), "a" * 100)
+        f.close()
+        self.assertTrue(os.path.islink(os.path.join(dest_dir, "source",
+                                                    "b.h")))
+
+    def test_get_key(self):
+        cache = SourceCache(self.config)
+        self.assertEqual(cache.get_key({}), None)
+        self.assertEqual(cache.get_key({"md5": "AB12", "sha256": "cd34"}),
+                         "sha256-cd34")
+        self.assertEqual(cache.get_key({"md5": "../ab"}), None)
+
+    def test_invalid_clone_method(self):
+        self.config["sourcecacheclone"] = "move"
+        self.assertRaises(SourceCacheError, SourceCache, self.config)
+
+    def test_store_restore(self):
+        for method in ["copy", "hardlink", "auto"]:
+            self.config["sourcecacheclone"] = method
+            cache = SourceCache(self.config)
+            dest_dir = os.path.join(self.tmp_dir, method)
+            self.assertFalse(cache.restore(method, dest_dir))
+            cache.store(method, self.src_dir)
+            self.assertTrue(cache.restore(method, dest_dir))
+            self.assertRestored(dest_dir)
+            # dest_dir isn't empty anymore
+            self.assertFalse(cache.restore(method, dest_dir))
+            shutil.rmtree(self.config["sourcecache"])
+
+    def test_hardlink(self):
+        self.config["sourcecacheclone"] = "hardlink"
+        cache = SourceCache(self.config)
+        cache.store("key", self.src_dir)
+        dest_dir = os.path.join(self.tmp_dir, "dest")
+        cache.restore("key", dest_dir)
+        filename = os.path.join("source", "include", "a.h")
+        self.assertTrue(os.path.samefile(os.path.join(self.src_dir, filename),
+                                         os.path.join(dest_dir, filename)))
+
+    def test_evict(self):
+        cache = SourceCache(self.config)
+        for key in ["a", "b", "c"]:
+            cache.store(key, self.src_dir)
+            # modification times must differ
+            os.utime(os.path.join(self.config["sourcecache"], key, "size"),
+                     (time.time() - 100, time.time() - 100))
+        self.assertTrue(cache.restore("a", os.path.join(self.tmp_dir, "a")))
+
+        self.config["sourcecachesize"] = 250
+        cache = SourceCache(self.config)
+        cache.evict()
+        # b is the least recently used
+        self.assertEqual(sorted([key for (used, size, key) in
+                                 cache.get_entries()]), ["a", "c"])
+
+    def test_too_large(self):
+        self.config["sourcecachesize"] = 10
+        cache = SourceCache(self.config)
+        cache.store("key", self.src_dir)
+        self.assertEqual(cache.get_entries(), [])
+
+    def test_disabled(self):
+        self.config["sourcecachesize"] = 0
+        cache = SourceCache(self.config)
+        cache.store("key", self.src_dir)
+        self.assertFalse(os.path.exists(self.config["sourcecache"]))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  SourceCacheTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,246 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import ftplib
+import hashlib
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+import kaizen.system.download
+
+from kaizen.system.download import HttpDownloader, FtpDownloader, \
+                                   DownloaderError, DownloaderHashError
+
+DATA = "".join([chr(i % 256) for i in range(100000)])
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+
+    # set by the tests
+    support_range = True
+    # number of bytes to send before the connection is dropped
+    drop_after = None
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get("Range"))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.support_range:
+            start = int(range_header[len("bytes="):].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start,
+                             len(DATA) - 1, len(DATA)))
+        else:
+            self.send_response(200)
+        data = DATA[start:]
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.drop_after is not None:
+            data = data[:self.drop_after]
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DummyFtp(object):
+
+    # number of bytes to send before the connection is dropped
+    drop_after = None
+
+    def __init__(self, host):
+        self.host = host
+
+    def login(self):
+        pass
+
+    def size(self, path):
+        return len(DATA)
+
+    def retrbinary(self, command, callback):
+        data = DATA
+        if self.drop_after is not None:
+            data = data[:self.drop_after]
+        for i in range(0, len(data), 4096):
+            callback(data[i:i + 4096])
+        if self.drop_after is not None:
+            raise ftplib.error_temp("426 Connection closed")
+
+    def quit(self):
+        pass
+
+
+class DummyConfig(object):
+
+    def get(self, value):
+        if value == "downloadchunksize":
+            return 4096
+        raise KeyError(value)
+
+
+class DummyRules(object):
+
+    def __init__(self, hash=None):
+        self.config = DummyConfig()
+        self.hash = hash or {}
+
+
+class HttpDownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        RangeRequestHandler.support_range = True
+        RangeRequestHandler.drop_after = None
+        RangeRequestHandler.requests = []
+        self.server = HTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d/source.tar.gz" % \
+                   self.server.server_address[1]
+        self.dest_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dest_dir, "source.tar.gz")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dest_dir)
+
+    def download(self, hash=None):
+        return HttpDownloader(DummyRules(hash), self.url).copy(self.dest_dir)
+
+    def read(self, filename):
+        f = open(filename, "rb")
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def test_download(self):
+        self.assertEqual(self.download(), self.filename)
+        self.assertEqual(self.read(self.filename), DATA)
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+    def test_resume(self):
+        RangeRequestHandler.drop_after = 30000
+        self.assertRaises(DownloaderError, self.download)
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertEqual(os.path.getsize(self.filename + ".part"), 30000)
+
+        RangeRequestHandler.drop_after = None
+        self.download()
+        self.assertEqual(RangeRequestHandler.requests[-1], "bytes=30000-")
+        self.assertEqual(self.read(self.filename), DATA)
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+    def test_resume_without_range_support(self):
+        RangeRequestHandler.support_range = False
+        f = open(self.filename + ".part", "wb")
+        f.write("garbage")
+        f.close()
+        self.download()
+        self.assertEqual(self.read(self.filename), DATA)
+
+    def test_hash(self):
+        hash = {"md5": hashlib.md5(DATA).hexdigest(),
+                "sha256": hashlib.sha256(DATA).hexdigest()}
+        downloader = HttpDownloader(DummyRules(hash), self.url)
+        downloader.copy(self.dest_dir)
+        self.assertEqual(downloader.values, hash)
+        # verifying doesn't read the file again
+        os.remove(self.filename)
+        downloader.verify(hash)
+
+    def test_resume_hash(self):
+        hash = {"sha1": hashlib.sha1(DATA).hexdigest()}
+        RangeRequestHandler.drop_after = 30000
+        self.assertRaises(DownloaderError, self.download, hash)
+        RangeRequestHandler.drop_after = None
+        self.download(hash)
+        self.assertEqual(self.read(self.filename), DATA)
+
+    def test_hash_mismatch(self):
+        self.assertRaises(DownloaderHashError, self.download, {"md5": "bad"})
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+
+class FtpDownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        DummyFtp.drop_after = None
+        self.ftp = kaizen.system.download.ftplib.FTP
+        kaizen.system.download.ftplib.FTP = DummyFtp
+        self.url = "ftp://127.0.0.1/source.tar.gz"
+        self.dest_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dest_dir, "source.tar.gz")
+
+    def tearDown(self):
+        kaizen.system.download.ftplib.FTP = self.ftp
+        shutil.rmtree(self.dest_dir)
+
+    def download(self, hash=None):
+        return FtpDownloader(DummyRules(hash), self.url).copy(self.dest_dir)
+
+    def test_download(self):
+        self.assertEqual(self.download(), self.filename)
+        f = open(self.filename, "rb")
+        self.assertEqual(f.read(), DATA)
+        f.close()
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+    def test_interrupted(self):
+        DummyFtp.drop_after = 10000
+        self.assertRaises(ftplib.error_temp, self.download)
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertEqual(os.path.getsize(self.filename + ".part"), 10000)
+        DummyFtp.drop_after = None
+        self.download()
+        self.assertEqual(os.path.getsize(self.filename), len(DATA))
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+    def test_hash_mismatch(self):
+        self.assertRaises(DownloaderHashError, self.download, {"md5": "bad"})
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertFalse(os.path.exists(self.filename + ".part"))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  HttpDownloaderTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  FtpDownloaderTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,117 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.error import KaizenRuntimeError
+from kaizen.utils import extract_file
+from kaizen.utils.extract import PipeFile, ExtractError, find_program, \
+                                 get_decompressor
+
+DATA = "".join([chr(i % 251) for i in range(100000)])
+
+
+class ExtractTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dest_dir = os.path.join(self.tmp_dir, "dest")
+        src = os.path.join(self.tmp_dir, "data")
+        f = open(src, "wb")
+        f.write(DATA)
+        f.close()
+        self.tarname = os.path.join(self.tmp_dir, "source.tar")
+        tar = tarfile.open(self.tarname, "w")
+        tar.add(src, "source/data")
+        tar.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def compress(self, program, suffix):
+        filename = self.tarname + suffix
+        outfile = open(filename, "wb")
+        subprocess.check_call([program, "-c", self.tarname], stdout=outfile)
+        outfile.close()
+        return filename
+
+    def assertExtracted(self):
+        f = open(os.path.join(self.dest_dir, "source", "data"), "rb")
+        self.assertEqual(f.read(), DATA)
+        f.close()
+
+    def test_gz(self):
+        filename = self.tarname + ".gz"
+        tar = tarfile.open(filename, "w:gz")
+        tar.add(self.tarname, "source.tar")
+        tar.close()
+        for backend in ["auto", "python"]:
+            extract_file(filename, self.dest_dir, backend)
+            self.assertTrue(os.path.isfile(os.path.join(self.dest_dir,
+                                                        "source.tar")))
+
+    @unittest.skipUnless(find_program("xz"), "xz is not available")
+    def test_xz(self):
+        filename = self.compress("xz", ".xz")
+        self.assertTrue(get_decompressor(filename))
+        extract_file(filename, self.dest_dir)
+        self.assertExtracted()
+
+    @unittest.skipUnless(find_program("zstd"), "zstd is not available")
+    def test_zstd(self):
+        filename = self.compress("zstd", ".zst")
+        self.assertTrue(get_decompressor(filename))
+        extract_file(filename, self.dest_dir)
+        self.assertExtracted()
+
+    def test_no_decompressor(self):
+        self.assertEqual(get_decompressor("source.zip"), None)
+
+    def test_pipe_error(self):
+        filename = self.tarname + ".gz"
+        open(filename, "wb").close()
+        self.assertRaises(ExtractError, PipeFile(filename,
+                          ["false"]).extractall, self.dest_dir)
+
+    def test_unknown_backend(self):
+        self.assertRaises(KaizenRuntimeError, extract_file, self.tarname,
+                          self.dest_dir, "unknown")
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  ExtractTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,99 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import hashlib
+import os
+import os.path
+import sys
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.error import KaizenRuntimeError
+from kaizen.utils.hash import Hash
+
+
+class HashTest(unittest.TestCase):
+
+    def setUp(self):
+        # not a multiple of the block size
+        self.data = os.urandom(3 * 65536 + 123)
+        fd, self.filename = tempfile.mkstemp()
+        os.write(fd, self.data)
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def expected(self, algorithm):
+        return hashlib.new(algorithm, self.data).hexdigest()
+
+    def test_md5_sha1(self):
+        hashcalc = Hash(self.filename)
+        self.assertEqual(hashcalc.md5(), self.expected("md5"))
+        self.assertEqual(hashcalc.sha1(), self.expected("sha1"))
+
+    def test_calculate(self):
+        algorithms = ["md5", "sha1", "sha256", "sha512"]
+        values = Hash(self.filename, block_size=65536).calculate(algorithms)
+        for algorithm in algorithms:
+            self.assertEqual(values[algorithm], self.expected(algorithm))
+
+    def test_mmap(self):
+        values = Hash(self.filename, block_size=65536,
+                      use_mmap=True).calculate(["md5", "sha256"])
+        self.assertEqual(values["md5"], self.expected("md5"))
+        self.assertEqual(values["sha256"], self.expected("sha256"))
+
+    def test_mmap_empty_file(self):
+        f = open(self.filename, "wb")
+        f.close()
+        self.data = ""
+        self.assertEqual(Hash(self.filename, use_mmap=True).md5(),
+                         self.expected("md5"))
+
+    def test_single_pass(self):
+        hashcalc = Hash(self.filename)
+        hashcalc.calculate(["md5", "sha1"])
+        os.remove(self.filename)
+        # cached values don't read the file again
+        self.assertEqual(hashcalc.sha1(), self.expected("sha1"))
+        open(self.filename, "wb").close()
+
+    def test_unsupported(self):
+        self.assertRaises(KaizenRuntimeError,
+                          Hash(self.filename).calculate, ["nohash"])
+
+    def test_file_not_found(self):
+        self.assertRaises(KaizenRuntimeError,
+                          Hash(self.filename + ".missing").md5)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(HashTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,107 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os.path
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.utils.helpers import list_dir, list_subdir, run_parallel
+
+
+class ListDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for path in ["bin/foo", "share/doc/foo/README", "share/foo"]:
+            path = os.path.join(self.dir, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, "w").close()
+        os.makedirs(os.path.join(self.dir, "lib", "empty"))
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_list_subdir(self):
+        (dirs, files) = list_subdir(self.dir)
+        self.assertEqual(sorted(dirs), ["bin", "lib/empty", "share/doc/foo"])
+        self.assertEqual(sorted(files), ["bin/foo", "share/doc/foo/README",
+                                         "share/foo"])
+        (dirs, files) = list_subdir(self.dir, True)
+        self.assertEqual(sorted(dirs), ["bin", "lib", "lib/empty", "share",
+                                        "share/doc", "share/doc/foo"])
+        self.assertEqual(os.getcwd(), self.cwd)
+
+    def test_list_dir(self):
+        (dirs, files) = list_dir(self.dir)
+        self.assertEqual(sorted(dirs), [os.path.join(self.dir, dir) for dir in
+                                        ["bin", "lib/empty", "share/doc/foo"]])
+        self.assertEqual(len(files), 3)
+
+
+class RunParallelTest(unittest.TestCase):
+
+    def test_results_in_order(self):
+        def square(value):
+            time.sleep(0.01 * (5 - value))
+            return value * value
+        self.assertEqual(run_parallel(square, range(5), 3), [0, 1, 4, 9, 16])
+
+    def test_jobs(self):
+        lock = threading.Lock()
+        running = [0, 0]
+        def func(value):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+        run_parallel(func, range(10), 2)
+        self.assertEqual(running[1], 2)
+
+    def test_error(self):
+        def func(value):
+            if value == 3:
+                raise ValueError(value)
+            return value
+        self.assertRaises(ValueError, run_parallel, func, range(5), 2)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  ListDirTest))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+                  RunParallelTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,96 @@
+# vim: fileencoding=utf-8 et sw=4 ts=4 tw=80:
+
+# kaizen - Continously improve, build and manage free software
+#
+# Copyright (C) 2011  Björn Ricks <bjoern.ricks@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 
+# 02110-1301 USA
+
+import os
+import os.path
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+
+test_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(test_dir, os.pardir, os.pardir))
+
+from kaizen.utils.xz import XZFile, XZStream, lzma
+
+DATA = "".join([chr(i % 251) for i in range(300000)])
+
+
+class XZTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "source.tar.xz")
+
+        src = os.path.join(self.tmp_dir, "data")
+        f = open(src, "wb")
+        f.write(DATA)
+        f.close()
+        tarname = os.path.join(self.tmp_dir, "source.tar")
+        tar = tarfile.open(tarname, "w")
+        tar.add(src, "source/data")
+        tar.close()
+
+        f = open(tarname, "rb")
+        self.tardata = f.read()
+        f.close()
+        f = open(self.filename, "wb")
+        f.write(lzma.compress(self.tardata))
+        f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_stream_read(self):
+        stream = XZStream(open(self.filename, "rb"), block_size=1024)
+        data = [stream.read(10000)]
+        while True:
+            d = stream.read(7777)
+            if not d:
+                break
+            data.append(d)
+        stream.close()
+        self.assertEqual(len(data[0]), 10000)
+        self.assertEqual("".join(data), self.tardata)
+
+    def test_stream_read_all(self):
+        stream = XZStream(open(self.filename, "rb"), block_size=1024)
+        self.assertEqual(stream.read(100), self.tardata[:100])
+        self.assertEqual(stream.read(), self.tardata[100:])
+        stream.close()
+
+    def test_extractall(self):
+        dest_dir = os.path.join(self.tmp_dir, "dest")
+        XZFile(self.filename).extractall(dest_dir)
+        f = open(os.path.join(dest_dir, "source", "data"), "rb")
+        self.assertEqual(f.read(), DATA)
+        f.close()
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(XZTest))
+    return suite
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite())